@@ -0,0 +1,306 @@
+"""
+Admin Area Module
+
+Renders the admin-only views of the Streamlit application. app.py only calls
+render_admin_page() for users listed in ADMIN_USERS (see Auth.is_admin).
+"""
+
+import hashlib
+import os
+import socket
+import time
+from datetime import date, datetime, timedelta
+
+import streamlit as st
+
+import metrics
+import profiling
+import search_index
+import shared_cache
+from storage_backend import CONVERSATIONS, FEEDBACK
+
+
+def render_search():
+    """
+    Render the full-text search over logged questions and answers.
+
+    Provides a search field with filters on date range, user, feedback score
+    and entry type, and shows the matching turns with highlighted snippets.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    index = search_index.get_index()
+    if index is None:
+        st.info("Der Suchindex ist deaktiviert (SEARCH_INDEX_PATH ist leer).")
+        return
+
+    text = st.text_input("Suchbegriff", placeholder="z.B. OptiView oder Offroad-ABS", key="admin_search_text")
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        period = st.date_input(
+            "Zeitraum",
+            value=(date.today() - timedelta(days=30), date.today()),
+            key="admin_search_period"
+        )
+    with col2:
+        user = st.text_input("Benutzer (E-Mail oder User-ID)", key="admin_search_user")
+    with col3:
+        min_score = st.slider("Min. Bewertung", min_value=0, max_value=5, value=0, key="admin_search_score")
+    with col4:
+        kind_label = st.selectbox("Typ", ["Alle", "Konversationen", "Feedback"], key="admin_search_kind")
+
+    if not text:
+        st.caption(f"{index.count()} Einträge im Index.")
+        return
+
+    since = until = None
+    if isinstance(period, (list, tuple)) and period:
+        since = period[0].isoformat()
+        until = (period[-1] + timedelta(days=1)).isoformat()
+    kind = {"Konversationen": CONVERSATIONS, "Feedback": FEEDBACK}.get(kind_label)
+
+    start = time.perf_counter()
+    results = index.search(
+        text,
+        since=since,
+        until=until,
+        user=user.strip() or None,
+        min_score=min_score or None,
+        kind=kind,
+        limit=100
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+
+    st.caption(f"{len(results)} Treffer in {elapsed:.1f} ms")
+    for result in results:
+        score = "–" if result["score"] is None else f"{result['score']:.1f}"
+        with st.expander(f"{result['timestamp']} · {result['username'] or result['userId']} · Bewertung {score}"):
+            st.markdown(f"**Frage:** {result['question']}")
+            st.markdown(f"**Antwort:** {result['snippet']}")
+            st.caption(f"Session: {result['sessionId']} · Typ: {result['kind']}")
+
+
+def _format_rate(value):
+    return f"{value * 100:.1f} %"
+
+
+@st.fragment(run_every=5)
+def _render_live_metrics(minutes):
+    """Render the metric tiles and charts; refreshed every 5 seconds."""
+    api = metrics.registry.summary("query_api", minutes=minutes)
+    try:
+        cache = shared_cache.get_cache().stats()
+    except Exception:
+        cache = None
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Anfragen / Minute", f"{api['per_minute']:.1f}")
+    col2.metric("Fehlerrate", _format_rate(api["error_rate"]))
+    col3.metric("Timeout-Rate", _format_rate(api["timeout_rate"]))
+    col4.metric("Aktive Sessions", metrics.registry.active_sessions())
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("query_api p50", f"{api['p50']:.0f} ms")
+    col2.metric("query_api p95", f"{api['p95']:.0f} ms")
+    col3.metric("query_api p99", f"{api['p99']:.0f} ms")
+    col4.metric("Cache-Trefferquote", _format_rate(cache["hit_rate"]) if cache else "–")
+
+    st.markdown("**Latenzverteilung query_api**")
+    buckets = metrics.registry.histogram("query_api", minutes=minutes).buckets()
+    if buckets:
+        st.bar_chart(
+            {"Latenz (ms)": [bound for bound, _ in buckets], "Anfragen": [count for _, count in buckets]},
+            x="Latenz (ms)",
+            y="Anfragen"
+        )
+    else:
+        st.caption("Noch keine Anfragen in diesem Zeitraum.")
+
+    st.markdown("**Anfragen pro Minute**")
+    st.line_chart({"Anfragen": metrics.registry.counts("query_api.calls", minutes=minutes)})
+
+    st.markdown("**Speicher-Schreibvorgänge**")
+    rows = []
+    for name in metrics.registry.names():
+        if name.startswith("storage."):
+            summary = metrics.registry.summary(name, minutes=minutes)
+            rows.append({
+                "Operation": name,
+                "Anzahl": summary["count"],
+                "p50 (ms)": round(summary["p50"], 1),
+                "p95 (ms)": round(summary["p95"], 1),
+                "p99 (ms)": round(summary["p99"], 1),
+                "Fehlerrate": _format_rate(summary["error_rate"]),
+            })
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("Noch keine Schreibvorgänge in diesem Zeitraum.")
+
+    if cache:
+        st.caption(
+            f"Cache: {cache['l1_hits']} L1-Treffer, {cache['l2_hits']} L2-Treffer, "
+            f"{cache['misses']} Fehlzugriffe, {cache['errors']} Fehler"
+        )
+
+    hedges = sum(metrics.registry.counts("api.hedges", minutes=minutes))
+    if hedges:
+        wins = sum(metrics.registry.counts("api.hedge_wins", minutes=minutes))
+        saved = metrics.registry.histogram("api.hedge_saved", minutes=minutes)
+        st.markdown("**Hedging**")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hedge-Rate", _format_rate(hedges / api["count"] if api["count"] else 0.0))
+        col2.metric("Hedge gewinnt", _format_rate(wins / hedges))
+        col3.metric("Ersparnis p50", f"{saved.percentile(50):.0f} ms" if saved.count else "–")
+        col4.metric("Ersparnis p95", f"{saved.percentile(95):.0f} ms" if saved.count else "–")
+
+
+def render_performance():
+    """
+    Render the live latency and throughput dashboard.
+
+    Shows requests per minute, error and timeout rates, query_api latency
+    percentiles and histogram, storage write latencies, cache hit rates and
+    active sessions, read from the in-process metrics registry of this
+    worker. No storage is scanned.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    minutes = st.selectbox(
+        "Zeitraum",
+        [5, 15, 60],
+        index=1,
+        format_func=lambda value: f"Letzte {value} Minuten",
+        key="admin_metrics_window"
+    )
+    st.caption("Werte dieses Worker-Prozesses, automatisch alle 5 Sekunden aktualisiert.")
+    _render_live_metrics(minutes)
+
+
+def render_profiling():
+    """
+    Render the profiling controls and the list of recorded profiles.
+
+    Admins can profile all reruns of a user or session for a limited time,
+    or a sampled fraction of all reruns, and inspect or download the
+    resulting wall-clock and CPU profiles (folded stacks for flame graphs).
+    Settings apply to all workers sharing the cache; profiles are listed
+    per host.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    st.markdown("**Profiling aktivieren**")
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        target = st.text_input("Benutzer (E-Mail oder User-ID) oder Session-ID", key="admin_profile_target")
+    with col2:
+        minutes = st.selectbox("Dauer", [5, 15, 60], index=1, format_func=lambda value: f"{value} Minuten",
+                               key="admin_profile_minutes")
+    with col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("Aktivieren", key="admin_profile_enable", disabled=not target.strip()):
+            target = target.strip()
+            if "@" in target:
+                # Same 8-character user id as in app.py
+                target = hashlib.sha256(target.encode()).hexdigest()[:8]
+            profiling.enable(target, minutes)
+
+    for target, expiry in sorted(profiling.targets().items()):
+        col1, col2 = st.columns([4, 1])
+        col1.caption(f"Aktiv für {target} bis {datetime.fromtimestamp(expiry).strftime('%H:%M:%S')}")
+        if col2.button("Beenden", key=f"admin_profile_disable_{target}"):
+            profiling.disable(target)
+            st.rerun()
+
+    st.slider(
+        "Zufällig profilierte Reruns (%)",
+        min_value=0.0,
+        max_value=10.0,
+        step=0.5,
+        value=profiling.sample_rate() * 100,
+        key="admin_profile_rate",
+        on_change=lambda: profiling.set_sample_rate(st.session_state.admin_profile_rate / 100)
+    )
+
+    st.markdown("**Profile**")
+    st.caption(
+        "Die Einstellungen gelten für alle Worker. Profile werden vom jeweiligen Worker lokal gespeichert; "
+        f"hier erscheinen nur die Profile dieses Hosts ({socket.gethostname()})."
+    )
+    profiles = profiling.list_profiles()
+    if not profiles:
+        st.caption(f"Noch keine Profile in {os.path.abspath(profiling.PROFILE_DIR)}.")
+        return
+    st.dataframe(
+        [
+            {
+                "Zeit": profile["timestamp"],
+                "Benutzer": profile.get("user"),
+                "Session": profile.get("session"),
+                "Grund": profile.get("reason"),
+                "Wall (ms)": profile.get("wall_ms"),
+                "CPU (ms)": profile.get("cpu_ms"),
+                "Samples": profile.get("samples"),
+            }
+            for profile in profiles
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+
+    profile_id = st.selectbox("Profil", [profile["id"] for profile in profiles], key="admin_profile_selected")
+    for kind, label in (("wall", "Wall-Clock"), ("cpu", "CPU")):
+        path = profiling.profile_path(profile_id, kind)
+        if not os.path.exists(path):
+            continue
+        st.markdown(f"**{label}: Funktionen nach Gesamtzeit**")
+        st.dataframe(
+            [
+                {"Funktion": name, "Eigen (ms)": round(own / 1000, 1), "Gesamt (ms)": round(total / 1000, 1)}
+                for name, own, total in profiling.top_functions(path)
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        with open(path, "rb") as f:
+            st.download_button(
+                f"⬇️ {label}-Profil (folded)",
+                f.read(),
+                os.path.basename(path),
+                "text/plain",
+                key=f"admin_profile_download_{kind}"
+            )
+
+
+def render_admin_page():
+    """
+    Render the admin area.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    st.markdown("<h2 class='accent'>🛠️ Admin-Bereich</h2>", unsafe_allow_html=True)
+
+    search_tab, performance_tab, profiling_tab = st.tabs(["🔎 Suche", "📈 Performance", "🔬 Profiling"])
+    with search_tab:
+        render_search()
+    with performance_tab:
+        render_performance()
+    with profiling_tab:
+        render_profiling()
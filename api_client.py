@@ -0,0 +1,582 @@
+"""
+API Client Module
+
+Client for the chatbot backend (AWS API Gateway). Provides query_api, used by
+app.py, with:
+
+1. Optional shared caching of first-turn answers (ANSWER_CACHE_TTL > 0, see
+   shared_cache). Cached answers are served to all users, so it is off by
+   default.
+2. Optional request hedging (API_HEDGING=1): if the first request has not
+   answered after an adaptive delay (the observed p95 attempt latency), a
+   duplicate is sent and whichever answers first wins; the other is
+   cancelled. A budget limits hedges to a fraction of all requests.
+3. Optional incremental context protocol (API_CONTEXT_MODE=incremental): the
+   client sends the conversation id and only the new turn, and the backend
+   keeps the context. If the backend reports an unknown or expired context,
+   the request is repeated with the full history, which re-seeds it.
+4. Deadlines and cancellation: every query has a Deadline (REQUEST_TIMEOUT
+   seconds by default). Each HTTP attempt uses the remaining budget as its
+   timeout and sends it in the X-Request-Timeout-Ms header so the backend
+   can stop work nobody waits for. submit_query() runs a query in the
+   background and returns a handle whose cancel() aborts the in-flight
+   request and releases the worker thread.
+"""
+
+import contextvars
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+import profiling
+from app_logging import get_logger
+from shared_cache import cached
+
+logger = get_logger("api_client")
+
+API_URL = os.getenv("API_URL", "https://an4zcmir30.execute-api.eu-west-1.amazonaws.com/dev/v1")
+API_HEADERS = {
+    "Content-Type": "application/json",
+    "authorizationToken": "testStreamlit"
+}
+REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", 60))
+# Remaining time budget of a request in milliseconds, for the backend to honour.
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+ERROR_MESSAGE = "Es ist ein Fehler aufgetreten. Können Sie es erneut versuchen?"
+
+# Seconds first-turn answers (no history) are shared across sessions, users and
+# workers. 0 (default) disables the answer cache.
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 0))
+
+# --- context protocol configuration ---
+# "full" resends the whole history each turn, "incremental" sends only the new turn.
+CONTEXT_MODE = os.getenv("API_CONTEXT_MODE", "full")
+# Error codes with which the backend reports that it has no usable context.
+CONTEXT_ERRORS = {"unknown_context", "context_expired", "context_mismatch"}
+
+# --- hedging configuration ---
+HEDGING_ENABLED = os.getenv("API_HEDGING", "0") == "1"
+# Fraction of requests that may be hedged, and the burst allowance.
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", 0.1))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", 5))
+# Hedge after the p95 attempt latency, bounded below by HEDGE_MIN_DELAY and
+# replaced by HEDGE_DEFAULT_DELAY until HEDGE_MIN_SAMPLES attempts were seen.
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 2.0))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", 10.0))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW_MINUTES = 15
+# Fraction of hedge wins where the primary is left running to measure the
+# latency the hedge saved.
+HEDGE_SHADOW_RATE = float(os.getenv("HEDGE_SHADOW_RATE", 0.1))
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(name="api"):
+    """
+    Return a shared thread pool.
+
+    "api" runs HTTP attempts (hedging), "query" runs whole queries for
+    submit_query; separate pools keep queries from starving their own
+    attempts.
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(max_workers=32, thread_name_prefix=name)
+    return executor
+
+
+class Cancelled(Exception):
+    """The request was cancelled by the user."""
+
+
+class Deadline:
+    """
+    Time budget and cancellation token of one query.
+
+    HTTP attempts register with the deadline, take their timeout from the
+    remaining budget, and are aborted by cancel().
+
+    Args:
+        seconds (float): Time budget.
+
+    Example:
+        >>> deadline = Deadline(30)
+        >>> deadline.remaining() <= 30
+        True
+    """
+
+    def __init__(self, seconds=REQUEST_TIMEOUT):
+        self.expires = time.monotonic() + seconds
+        self.cancelled = False
+        self._attempts = []
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Return the remaining budget in seconds (may be negative)."""
+        return self.expires - time.monotonic()
+
+    def check(self):
+        """
+        Return the remaining budget, or raise if there is none.
+
+        Raises:
+            Cancelled: If the query was cancelled.
+            TimeoutError: If the budget is used up.
+        """
+        if self.cancelled:
+            raise Cancelled("Request cancelled")
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise TimeoutError("Request deadline exceeded")
+        return remaining
+
+    def register(self, attempt):
+        """Track an attempt so cancel() can abort it."""
+        with self._lock:
+            if self.cancelled:
+                attempt.cancel()
+            self._attempts.append(attempt)
+
+    def cancel(self):
+        """Cancel the query and abort its in-flight attempts."""
+        with self._lock:
+            self.cancelled = True
+            attempts = list(self._attempts)
+        for attempt in attempts:
+            attempt.cancel()
+
+
+# Deadline of the query running in the current context (see query_api).
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of all requests.
+
+    Every request earns `ratio` tokens (up to `burst`); a hedge spends one.
+    The bucket starts full.
+
+    Args:
+        ratio (float): Hedges allowed per request, e.g. 0.1 for 10%.
+        burst (float): Maximum number of saved-up hedges.
+
+    Example:
+        >>> budget = HedgeBudget(ratio=0.5, burst=1)
+        >>> budget.try_spend(), budget.try_spend()
+        (True, False)
+    """
+
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def earn(self):
+        """Credit the budget for one request."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self):
+        """Spend one token for a hedge; return False if the budget is exhausted."""
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+hedge_budget = HedgeBudget()
+
+
+def hedge_delay():
+    """
+    Return the adaptive delay (seconds) after which a request is hedged.
+
+    Returns:
+        float: The observed p95 latency of successful attempts over the last
+               15 minutes, at least HEDGE_MIN_DELAY, or HEDGE_DEFAULT_DELAY
+               while fewer than HEDGE_MIN_SAMPLES attempts were recorded.
+    """
+    histogram = metrics.registry.histogram("api.attempt", minutes=HEDGE_WINDOW_MINUTES)
+    if histogram.count < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, histogram.percentile(HEDGE_PERCENTILE) / 1000)
+
+
+def _cancellable_session():
+    """
+    Return a requests Session whose in-flight connections can be aborted.
+
+    Closing a Session only closes idle pooled connections, so the adapter
+    records every connection it opens; abort() shuts their sockets down,
+    which makes a blocked read in another thread fail immediately.
+
+    Returns:
+        tuple: (requests.Session, adapter with an abort() method).
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class CancellableAdapter(HTTPAdapter):
+        def __init__(self):
+            self.connections = []
+            super().__init__()
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            connections = self.connections
+
+            def tracking(pool_cls):
+                class TrackingPool(pool_cls):
+                    def _new_conn(self):
+                        conn = super()._new_conn()
+                        connections.append(conn)
+                        return conn
+                return TrackingPool
+
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: tracking(pool_cls) for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+            }
+
+        def abort(self):
+            for conn in self.connections:
+                sock = getattr(conn, "sock", None)
+                if sock is not None:
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+
+    session = requests.Session()
+    adapter = CancellableAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session, adapter
+
+
+class ContextUnavailable(Exception):
+    """The backend has no usable context for an incremental request."""
+
+
+class _Attempt:
+    """One HTTP request to the backend, cancellable from another thread."""
+
+    def __init__(self, payload, deadline):
+        self.payload = payload
+        self.deadline = deadline
+        self.session, self.adapter = _cancellable_session()
+        self.started = time.perf_counter()
+        self.cancelled = False
+        deadline.register(self)
+
+    def run(self):
+        try:
+            timeout = self.deadline.check()
+            headers = dict(API_HEADERS)
+            headers[DEADLINE_HEADER] = str(int(timeout * 1000))
+            response = self.session.post(API_URL, json=self.payload, headers=headers, timeout=timeout)
+            if response.status_code in (404, 409, 410) and _context_error(response) in CONTEXT_ERRORS:
+                raise ContextUnavailable(_context_error(response))
+            response.raise_for_status()
+            body = response.json().get("body", "No response from API.")
+        except Exception:
+            if self.deadline.cancelled:
+                raise Cancelled("Request cancelled") from None
+            raise
+        finally:
+            self.session.close()
+        metrics.record_latency("api.attempt", time.perf_counter() - self.started)
+        return body
+
+    def cancel(self):
+        """Abort the request and release its worker thread."""
+        self.cancelled = True
+        self.adapter.abort()
+        self.session.close()
+
+
+def _context_error(response):
+    """Return the 'error' code of a JSON error response, or None."""
+    try:
+        return response.json().get("error")
+    except ValueError:
+        return None
+
+
+def _post(payload, deadline):
+    """Post a payload without hedging and return the reply body."""
+    return _Attempt(payload, deadline).run()
+
+
+def _post_hedged(payload, deadline, delay=None):
+    """
+    Post a payload, hedging with a duplicate request if it is slow.
+
+    Args:
+        payload (dict): Request body.
+        deadline (Deadline): Time budget of the query.
+        delay (float, optional): Hedge delay in seconds. Defaults to hedge_delay().
+
+    Returns:
+        str: The reply body of the first successful attempt.
+
+    Raises:
+        Exception: The error of the last attempt if all attempts fail, or
+            TimeoutError if no attempt answers before the deadline.
+    """
+    executor = _get_executor()
+    delay = hedge_delay() if delay is None else delay
+    hedge_budget.earn()
+
+    primary = _Attempt(payload, deadline)
+    futures = {executor.submit(profiling.propagate(primary.run)): primary}
+    done, _ = wait(futures, timeout=min(delay, max(0.0, deadline.remaining())))
+
+    hedge = None
+    if not done and not deadline.cancelled and hedge_budget.try_spend():
+        hedge = _Attempt(payload, deadline)
+        futures[executor.submit(profiling.propagate(hedge.run))] = hedge
+        metrics.increment("api.hedges")
+        logger.info("Hedging slow request", extra={"event": "api.hedge", "delay_ms": round(delay * 1000)})
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline.remaining()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            winner = futures[future]
+            losers = [futures[other] for other in pending]
+            if winner is hedge:
+                metrics.increment("api.hedge_wins")
+                if random.random() < HEDGE_SHADOW_RATE:
+                    # Let the primary finish to measure the latency saved.
+                    hedge_won_at = time.perf_counter()
+                    for other in pending:
+                        other.add_done_callback(
+                            lambda f: f.exception() is None and metrics.record_latency(
+                                "api.hedge_saved", time.perf_counter() - hedge_won_at
+                            )
+                        )
+                    losers = []
+            for loser in losers:
+                loser.cancel()
+            return future.result()
+
+    for attempt in futures.values():
+        attempt.cancel()
+    if error is not None:
+        raise error
+    deadline.check()
+    raise TimeoutError("Request deadline exceeded")
+
+
+@cached(
+    "answers",
+    ttl=ANSWER_CACHE_TTL,
+    unless=lambda prompt, history, conversation_id=None: bool(history),
+    key=lambda prompt, history, conversation_id=None: (prompt, history)
+)
+def fetch_answer(prompt: str, history, conversation_id=None) -> str:
+    """
+    Post the prompt and history to the backend API and return the reply body.
+
+    With ANSWER_CACHE_TTL > 0, answers to prompts without history are cached
+    in the shared cache tier for that many seconds; failed requests raise
+    and are not cached.
+    The conversation id is not part of the cache key. With API_HEDGING=1,
+    slow requests are hedged (see _post_hedged).
+
+    Args:
+        prompt (str): The user prompt to send to the API.
+        history (list): Conversation history as a list of tuples or records.
+        conversation_id (str, optional): Sent along so the backend seeds the
+            context of an incremental conversation.
+
+    Returns:
+        str: The assistant's reply text.
+
+    Raises:
+        requests.exceptions.RequestException: If the HTTP request fails.
+    """
+    payload = {"prompt": prompt, "history": history}
+    if conversation_id:
+        payload["conversation_id"] = conversation_id
+    return _send(payload)
+
+
+def _send(payload):
+    """Post a payload within the current deadline, hedged if API_HEDGING is enabled."""
+    deadline = _deadline.get() or Deadline()
+    if HEDGING_ENABLED:
+        return _post_hedged(payload, deadline)
+    return _post(payload, deadline)
+
+
+def fetch_answer_incremental(prompt, history, conversation_id, turn_index):
+    """
+    Fetch an answer sending only the new turn, falling back to the full history.
+
+    The backend is expected to keep the context of `conversation_id` and to
+    answer 404/409/410 with {"error": "unknown_context" | "context_expired" |
+    "context_mismatch"} if it cannot continue at `turn_index`. In that case
+    the request is repeated with the full history and the conversation id,
+    so the backend can re-seed its context.
+
+    Args:
+        prompt (str): The user prompt.
+        history (callable): Returns the full history; only called on fallback.
+        conversation_id (str): The session id identifying the conversation.
+        turn_index (int): Number of turns that precede this prompt.
+
+    Returns:
+        str: The assistant's reply text.
+
+    Raises:
+        requests.exceptions.RequestException: If the HTTP request fails.
+    """
+    if turn_index == 0:
+        # A cache miss seeds the backend context. First turns are shared via
+        # the answer cache, though, and a cache hit leaves the backend
+        # without context, which the fallback below repairs on turn 1.
+        return fetch_answer(prompt, [], conversation_id)
+    try:
+        return _send({"prompt": prompt, "conversation_id": conversation_id, "turn_index": turn_index})
+    except ContextUnavailable as e:
+        metrics.increment("api.context_fallbacks")
+        logger.info("Context unavailable, resending full history", extra={
+            "event": "api.context_fallback", "reason": str(e), "turn_index": turn_index,
+        })
+        return _send({"prompt": prompt, "history": history(), "conversation_id": conversation_id})
+
+
+def query_api(prompt: str, history, conversation_id=None, turn_index=None, deadline=None) -> str:
+    """
+    Send the prompt and history to the backend API and return the assistant reply.
+
+    Fetches the answer via fetch_answer (which may serve it from the shared
+    cache). With API_CONTEXT_MODE=incremental and a conversation id, only the
+    new turn is sent (see fetch_answer_incremental). On failure, returns a
+    user-facing German error message.
+
+    Args:
+        prompt (str): The user prompt to send to the API.
+        history (list or callable): Conversation history as a list of tuples
+            or records, or a callable returning it. A callable is only invoked
+            when the full history has to be sent.
+        conversation_id (str, optional): Session id used by the incremental
+            context protocol.
+        turn_index (int, optional): Number of preceding turns. Defaults to
+            the length of the history.
+        deadline (Deadline, optional): Time budget and cancellation token.
+            Defaults to a new Deadline of REQUEST_TIMEOUT seconds.
+
+    Returns:
+        str: The assistant's reply text. If the API request fails or is
+             cancelled, returns a localized error string suitable for display.
+
+    Example:
+        >>> query_api("Was ist MAN?", [])
+        "MAN ist ein Hersteller von Nutzfahrzeugen und ... "
+    """
+    deadline = deadline or Deadline()
+    token = _deadline.set(deadline)
+    try:
+        with metrics.timed("query_api"):
+            try:
+                if CONTEXT_MODE == "incremental" and conversation_id:
+                    history_fn = history if callable(history) else (lambda: history)
+                    if turn_index is None:
+                        turn_index = len(history_fn())
+                    return fetch_answer_incremental(prompt, history_fn, conversation_id, turn_index)
+                return fetch_answer(prompt, history() if callable(history) else history)
+            except Exception:
+                if not deadline.cancelled:
+                    raise
+                # Cancelled by the user: not an API error.
+                metrics.increment("api.cancelled")
+                logger.info("API request cancelled", extra={"event": "api.cancelled"})
+                return ERROR_MESSAGE
+    except Exception as e:
+        logger.error("API error", extra={"event": "api.error", "error_class": type(e).__name__, "error": str(e)})
+        return ERROR_MESSAGE
+    finally:
+        _deadline.reset(token)
+
+
+class PendingAnswer:
+    """
+    A query running in the background; see submit_query.
+
+    Args:
+        future (Future): Future of the query_api call.
+        deadline (Deadline): Deadline of the query.
+    """
+
+    def __init__(self, future, deadline):
+        self.future = future
+        self.deadline = deadline
+        self.started = time.perf_counter()
+
+    def done(self):
+        """Whether the answer (or an error message) is available."""
+        return self.future.done()
+
+    def wait(self, timeout):
+        """Wait up to `timeout` seconds; return whether the query is done."""
+        return bool(wait([self.future], timeout=timeout).done)
+
+    def result(self):
+        """Return the reply text; blocks until the query is done."""
+        return self.future.result()
+
+    def elapsed(self):
+        """Return the seconds since the query was submitted."""
+        return time.perf_counter() - self.started
+
+    def cancel(self):
+        """Abort the in-flight request; the worker returns as soon as its connection is closed."""
+        self.deadline.cancel()
+
+
+def submit_query(prompt, history, conversation_id=None, turn_index=None, timeout=None):
+    """
+    Run query_api in a background worker so the caller can wait in short steps.
+
+    Args:
+        prompt (str): The user prompt.
+        history (list or callable): See query_api.
+        conversation_id (str, optional): See query_api.
+        turn_index (int, optional): See query_api.
+        timeout (float, optional): Time budget in seconds. Defaults to
+            REQUEST_TIMEOUT.
+
+    Returns:
+        PendingAnswer: Handle to wait for or cancel the answer.
+
+    Example:
+        >>> pending = submit_query("Was ist MAN?", [])
+        >>> pending.cancel()
+    """
+    deadline = Deadline(REQUEST_TIMEOUT if timeout is None else timeout)
+    future = _get_executor("query").submit(
+        contextvars.copy_context().run, profiling.propagate(query_api),
+        prompt, history, conversation_id, turn_index, deadline
+    )
+    return PendingAnswer(future, deadline)
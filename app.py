@@ -11,13 +11,18 @@ It handles:
 """
 
 import streamlit as st
-import requests
+from streamlit.runtime.scriptrunner import RerunException, StopException
 import time
 import os
 import json
 from datetime import datetime
 from feedback_storage import save_feedback
 from conversation_storage import save_conversation
+from conversation_model import Conversation
+from api_client import submit_query
+import metrics
+import profiling
+from app_logging import bind as bind_log_context
 
 import hashlib
 import uuid
@@ -34,6 +39,9 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 st._show_deprecation_warning = lambda *args, **kwargs: None
 st.set_page_config(page_title="Sales Argumentation",  page_icon="logo.png", layout="wide")
 
+# Profile this rerun if an admin enabled it for this user/session or it is sampled (see profiling).
+profiling.maybe_start(st.session_state.get("session_id"), st.session_state.get("user_id"))
+
 
 warnings.filterwarnings(
     "ignore",
@@ -128,15 +136,12 @@ if "code" in query_params and not st.session_state.authenticated:
 # Initialize all necessary session state variables with defaults.
 for key, default in {
     "awaiting_feedback": False,
-    "last_user_prompt": "",
-    "last_assistant_answer": "",
     "fb_correct": 0,
     "fb_coverage": 0,    
     "fb_tone_style": 0,
     "fb_notes_correct": "",
     "fb_notes_coverage": "",
     "fb_notes_tone_style": "",
-    "history": [],
     "trigger_new_chat_toast": False
 }.items():
     if key not in st.session_state:
@@ -163,6 +168,9 @@ if not st.session_state.authenticated:
             auth.redirect_to_login()
 
     st.stop()
+
+metrics.touch_session(st.session_state.session_id)
+bind_log_context(session_id=st.session_state.session_id, user_id=st.session_state.user_id)
 # ============================================
 # SIDEBAR
 # ============================================
@@ -208,20 +216,16 @@ if st.sidebar.button("➕ Neue Konversation", type="primary", use_container_widt
     # 1. Generate a new Session ID so S3 logs treat this as a new thread
     st.session_state.session_id = str(uuid.uuid4())
     
-    # 2. Clear Chat History
-    st.session_state.messages = []
-    st.session_state.history = [] # Clear API context
+    # 2. Clear Chat History and API context
+    st.session_state.conversation = Conversation(st.session_state.session_id)
+    st.session_state.show_older_turns = False
     
     # 3. Reset UI Flags
     st.session_state.welcome_shown = False # Will trigger the welcome message again
     st.session_state.show_suggestions = True # Show suggested questions again
     st.session_state.awaiting_feedback = False # Hide any pending feedback forms
-    
-    # 4. Clear last prompt/answer buffers
-    st.session_state.last_user_prompt = ""
-    st.session_state.last_assistant_answer = ""    
     st.session_state.trigger_new_chat_toast = True
-    # 5. Rerun the app to refresh the view
+    # 4. Rerun the app to refresh the view
     st.rerun()
 
 # Logout
@@ -229,6 +233,12 @@ if st.sidebar.button("Abmelden"):
     auth.logout()
     st.stop()
 
+# Admin area (only for users listed in ADMIN_USERS)
+admin_mode = auth.is_admin(st.session_state.user) and st.sidebar.toggle("🛠️ Admin-Bereich", key="admin_mode")
+
+# Bulk question mode (upload a list of questions)
+bulk_mode = st.sidebar.toggle("📋 Sammelanfrage", key="bulk_mode")
+
 st.sidebar.markdown(
     """
     <style>
@@ -261,49 +271,27 @@ st.sidebar.markdown(
     unsafe_allow_html=True
 )
 
-
 # ============================================
-# API HANDLER
+# ADMIN AREA
 # ============================================
-st.markdown("<h1 class='accent center'Ftod>💬 MAN Sales Argumentation Chatbot</h1>", unsafe_allow_html=True)
-
-def query_api(prompt: str, history) -> str:
-    """
-    Send the prompt and history to the backend API and return the assistant reply.
-
-    Builds a JSON payload containing the user prompt and conversation history,
-    posts it to the configured API Gateway endpoint, and returns the parsed
-    response body. On failure, returns a user-facing German error message.
-
-    Args:
-        prompt (str): The user prompt to send to the API.
-        history (list): Conversation history as a list of tuples or records.
-
-    Returns:
-        str: The assistant's reply text. If the API request fails, returns a
-             localized error string suitable for display.
+if admin_mode:
+    from admin import render_admin_page
+    render_admin_page()
+    st.stop()
 
-    Raises:
-        requests.exceptions.RequestException: If the HTTP request fails.
+# ============================================
+# BULK QUESTION MODE
+# ============================================
+if bulk_mode:
+    from bulk_questions import render_bulk_page
+    render_bulk_page(st.session_state.username, st.session_state.user_id, st.session_state.session_id)
+    st.stop()
 
-    Example:
-        >>> query_api("Was ist MAN?", [])
-        "MAN ist ein Hersteller von Nutzfahrzeugen und ... "
-    """
-    url = "https://an4zcmir30.execute-api.eu-west-1.amazonaws.com/dev/v1"
-    payload = {"prompt": prompt, "history": history}
-    headers = {
-        "Content-Type": "application/json",
-        "authorizationToken": "testStreamlit"
-    }
 
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=60)
-        response.raise_for_status()
-        return response.json().get("body", "No response from API.")
-    except Exception as e:
-        print("API error:", e)
-        return "Es ist ein Fehler aufgetreten. Können Sie es erneut versuchen?"
+# ============================================
+# API HANDLER
+# ============================================
+st.markdown("<h1 class='accent center'Ftod>💬 MAN Sales Argumentation Chatbot</h1>", unsafe_allow_html=True)
 
 # Chat Container
 # st.markdown("<div class='chat-container'>", unsafe_allow_html=True)
@@ -312,31 +300,136 @@ def query_api(prompt: str, history) -> str:
 # MAIN CHAT UI
 # ============================================
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# All turns of the session live in a single Conversation (see conversation_model).
+if "conversation" not in st.session_state:
+    st.session_state.conversation = Conversation(st.session_state.session_id)
+conversation = st.session_state.conversation
+
+welcome_text = (
+    "Hallo! Ich bin Ihr MAN Sales-Assistent.\n\n"
+    "Ich unterstütze Sie dabei, die Fahrzeugmerkmale und Verkaufsargumente von MAN einfach und übersichtlich zu entdecken."
+)
 
 # Initial Assistant Message
 if not st.session_state.get("welcome_shown", False):
-    welcome_text = (
-        "Hallo! Ich bin Ihr MAN Sales-Assistent.\n\n"
-	    "Ich unterstütze Sie dabei, die Fahrzeugmerkmale und Verkaufsargumente von MAN einfach und übersichtlich zu entdecken."
-
-    )
-    st.session_state.messages.append({"role": "assistant", "content": welcome_text})
     st.session_state.welcome_shown = True
     st.session_state.show_suggestions = True
 
-# Display Messages
+def render_bubble(role_class, content):
+    """
+    Render a single chat bubble.
 
-st.markdown("<div class='message-area'>", unsafe_allow_html=True)
-for message in st.session_state.messages:
-    role_class = "user" if message["role"] == "user" else "assistant"
+    Args:
+        role_class (str): "user" or "assistant".
+        content (str): Message text.
+
+    Returns:
+        None
+    """
     st.markdown(
-        f"<div class='chat-bubble {role_class}'>{message['content']}</div><div class='clear'></div>",
+        f"<div class='chat-bubble {role_class}'>{content}</div><div class='clear'></div>",
         unsafe_allow_html=True
     )
+
+def answer_prompt(prompt):
+    """
+    Answer a user prompt and record the turn.
+
+    Queries the API with the conversation history, appends the turn to the
+    session's Conversation, flags the feedback form and saves the exchange
+    via save_conversation.
+
+    The query runs in a background worker while this rerun waits in short
+    steps, so a click on "Stop" (or a new prompt) interrupts the rerun. The
+    in-flight request is then cancelled and the turn is saved with
+    "status": "cancelled" instead of being added to the conversation.
+
+    Args:
+        prompt (str): The user prompt.
+
+    Returns:
+        None
+    """
+    # Get assistant response
+    pending = submit_query(
+        prompt,
+        conversation.history,
+        conversation_id=conversation.session_id,
+        turn_index=len(conversation)
+    )
+    try:
+        with st.spinner("Die Antwort wird generiert..."):
+            st.button("⏹️ Stop", key="stop_answer")
+            elapsed = st.empty()
+            while not pending.wait(0.25):
+                # Each update lets Streamlit interrupt this rerun.
+                elapsed.caption(f"{pending.elapsed():.0f} s")
+    except (RerunException, StopException):
+        # Stop button, new prompt or closed session: release the worker.
+        pending.cancel()
+        save_conversation({
+            "username": st.session_state.username,
+            "userId": st.session_state.user_id,
+            "sessionId": st.session_state.session_id,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "question": prompt,
+            "answer": "",
+            "status": "cancelled",
+            "seconds": round(pending.elapsed(), 1)
+        })
+        st.session_state.cancelled_prompt = prompt
+        raise
+    except BaseException:
+        # Any other error fails the rerun as usual; only free the worker.
+        pending.cancel()
+        raise
+    answer = pending.result()
+
+    # Update session state
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    turn = conversation.add(prompt, answer, timestamp)
+    st.session_state.awaiting_feedback = True
+    st.session_state.show_suggestions = False
+
+    # ✅ Save conversation to storage
+    conversation_entry = {
+        "username": st.session_state.username,
+        "userId": st.session_state.user_id,
+        "sessionId": st.session_state.session_id,
+        "timestamp": timestamp,
+        "question": prompt,
+        "answer": answer,
+        "turn": turn.index
+    }
+    save_conversation(conversation_entry)
+    conversation.mark_saved(turn)
+
+# Display Messages
+
+st.markdown("<div class='message-area'>", unsafe_allow_html=True)
+render_bubble("assistant", welcome_text)
+
+# Older turns are not kept in memory; reload them from storage on request.
+if conversation.spilled:
+    if st.session_state.get("show_older_turns", False):
+        older_turns = conversation.load_spilled()
+    else:
+        older_turns = []
+        if st.button(f"⬆️ {conversation.spilled} ältere Nachrichten anzeigen"):
+            st.session_state.show_older_turns = True
+            st.rerun()
+    for turn in older_turns:
+        render_bubble("user", turn.question)
+        render_bubble("assistant", turn.answer)
+
+for turn in conversation.recent():
+    render_bubble("user", turn.question)
+    render_bubble("assistant", turn.answer)
 st.markdown("</div>", unsafe_allow_html=True)
 
+if cancelled_prompt := st.session_state.pop("cancelled_prompt", None):
+    st.caption(f"⏹️ Die Anfrage „{cancelled_prompt}“ wurde abgebrochen.")
+
 # ============================================
 # FEEDBACK UI BELOW THE LAST ANSWER
 # ============================================
@@ -435,8 +528,8 @@ if st.session_state.awaiting_feedback:
                 "userId": st.session_state.user_id,
                 "sessionId": st.session_state.session_id,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "user_prompt": st.session_state.last_user_prompt,
-                "assistant_answer": st.session_state.last_assistant_answer,
+                "user_prompt": conversation.last.question,
+                "assistant_answer": conversation.last.answer,
                 "correctness_score": correctness,
                 "correctness_notes": notes_correct,
                 "coverage_score": coverage,
@@ -467,37 +560,7 @@ if st.session_state.get("show_suggestions", False):
     for i, q in enumerate(suggestions):
         with cols[i]:
             if st.button(q, key=f"sugg{i}"):
-                # Add user message
-                st.session_state.messages.append({"role": "user", "content": q})
-
-                # Get assistant response
-                with st.spinner("Die Antwort wird generiert..."):
-                    answer = query_api(q, st.session_state.history)
-
-                # Add assistant message
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-
-                # Update session state
-                st.session_state.last_user_prompt = q
-                st.session_state.last_assistant_answer = answer
-                st.session_state.awaiting_feedback = True
-                st.session_state.show_suggestions = False
-                st.session_state.history.append((q, answer))
-
-                # ✅ Save conversation to S3
-                from conversation_storage import save_conversation
-                from datetime import datetime
-
-                conversation_entry = {
-                    "username": st.session_state.username,
-                    "userId": st.session_state.user_id,
-                    "sessionId": st.session_state.session_id,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "question": q,
-                    "answer": answer
-                }
-                save_conversation(conversation_entry)
-                
+                answer_prompt(q)
 
                 # Refresh UI
                 st.rerun()
@@ -506,40 +569,7 @@ if st.session_state.get("show_suggestions", False):
 # USER CHAT INPUT
 # ============================================
 if prompt := st.chat_input("Geben Sie Ihre Nachricht hier ein."):
-    # Add user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
-
-    # Get assistant response
-    with st.spinner("Die Antwort wird generiert..."):
-        
-        answer = query_api(prompt, st.session_state.history)
-
-    # Add assistant message
-    st.session_state.messages.append({"role": "assistant", "content": answer})
-    # st.session_state.messages.append({"role": "assistant", "content": st.session_state.history}) #TODO
-
-    # Update session state
-    st.session_state.last_user_prompt = prompt
-    st.session_state.last_assistant_answer = answer
-    st.session_state.awaiting_feedback = True
-    st.session_state.show_suggestions = False
-    st.session_state.history.append((prompt, answer))
-
-
-    # ✅ Save conversation to S3
-    from conversation_storage import save_conversation
-    from datetime import datetime
-
-    conversation_entry = {
-        "username": st.session_state.username,
-        "userId": st.session_state.user_id,
-        "sessionId": st.session_state.session_id,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "question": prompt,
-        "answer": answer
-    }
-    save_conversation(conversation_entry)
-    
+    answer_prompt(prompt)
 
     # Refresh UI
     st.rerun()
@@ -0,0 +1,301 @@
+"""
+Logging Module
+
+Structured, non-blocking logging for the application modules.
+
+Records are formatted as JSON lines carrying the event name, hashed session
+id, user id, timing and error class. The calling (Streamlit script) thread
+only enqueues the record; a QueueListener thread writes it to the sinks, so
+log I/O never blocks a rerun. If the queue is full, records are dropped and
+counted instead of blocking.
+
+Environment:
+    LOG_LEVEL: Minimum level (default "INFO").
+    LOG_FILE: Optional path of a rotating JSON log file.
+    LOG_MAX_BYTES / LOG_BACKUP_COUNT: Rotation settings for LOG_FILE.
+    LOG_SAMPLE_RATES: Per-event sampling for high-volume INFO/DEBUG events,
+        e.g. "storage.conversation_saved=0.1,cache.hit=0.01". Call sites of
+        such events use log_sampled(), which decides before the record is
+        built; other records are sampled by a handler filter.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "chatbot"
+QUEUE_SIZE = 10000
+
+# Event name to the fraction of INFO/DEBUG records kept (LOG_SAMPLE_RATES).
+_sample_rates = {}
+
+_session_id = contextvars.ContextVar("session_id", default=None)
+_user_id = contextvars.ContextVar("user_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra`.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def hash_id(value):
+    """
+    Return a short, non-reversible hash of an identifier for log records.
+
+    Args:
+        value (str): Identifier such as a session id.
+
+    Returns:
+        str: First 12 hex characters of its SHA-256, or None.
+
+    Example:
+        >>> len(hash_id("4f1c2d..."))
+        12
+    """
+    if not value:
+        return None
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:12]
+
+
+def bind(session_id=None, user_id=None):
+    """
+    Attach session and user to all records logged from the current context.
+
+    Call once per Streamlit rerun after authentication. The session id is
+    hashed; user_id is expected to already be the 8-character user hash.
+
+    Args:
+        session_id (str, optional): Chat session id.
+        user_id (str, optional): Hashed user id.
+
+    Returns:
+        None
+    """
+    _session_id.set(hash_id(session_id))
+    _user_id.set(user_id)
+
+
+class ContextFilter(logging.Filter):
+    """Adds the bound session and user hashes to each record."""
+
+    def filter(self, record):
+        if not hasattr(record, "session"):
+            record.session = _session_id.get()
+        if not hasattr(record, "user"):
+            record.user = _user_id.get()
+        # exc_info is flattened to exc_text before the record is queued.
+        if record.exc_info and not hasattr(record, "error_class"):
+            record.error_class = record.exc_info[0].__name__
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of INFO/DEBUG records of selected events.
+
+    Warnings and errors are never sampled out.
+
+    Args:
+        rates (dict): Mapping of event name to the fraction (0-1) to keep.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        # Records from log_sampled() were already sampled.
+        if record.levelno >= logging.WARNING or hasattr(record, "sample_rate"):
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                data[key] = value
+        if record.exc_info:
+            data.setdefault("error_class", record.exc_info[0].__name__)
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._traceback_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Only make the record picklable/thread-safe; JSON formatting is left
+        # to the listener thread. The record is not copied as this is the
+        # only handler on the chatbot logger.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec):
+    """
+    Parse a LOG_SAMPLE_RATES specification.
+
+    Args:
+        spec (str): Comma-separated "event=rate" pairs.
+
+    Returns:
+        dict: Event name to rate.
+
+    Example:
+        >>> parse_sample_rates("cache.hit=0.01, storage.conversation_saved=0.1")
+        {'cache.hit': 0.01, 'storage.conversation_saved': 0.1}
+    """
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            event, rate = part.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+def create_sinks():
+    """
+    Return the output handlers configured by the environment.
+
+    Returns:
+        list: A stdout handler and, if LOG_FILE is set, a rotating file handler.
+    """
+    formatter = JsonFormatter()
+    sinks = [logging.StreamHandler(sys.stdout)]
+    log_file = os.getenv("LOG_FILE")
+    if log_file:
+        sinks.append(logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+            encoding="utf-8"
+        ))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+    return sinks
+
+
+def setup_logging(sinks=None):
+    """
+    Configure the "chatbot" logger with a queue handler and listener thread.
+
+    Safe to call repeatedly; only the first call has an effect.
+
+    Args:
+        sinks (list, optional): Output handlers. Defaults to create_sinks().
+
+    Returns:
+        NonBlockingQueueHandler: The handler attached to the logger.
+    """
+    global _listener, _handler
+    with _setup_lock:
+        if _handler is not None:
+            return _handler
+        log_queue = queue.Queue(QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        _sample_rates.update(parse_sample_rates(os.getenv("LOG_SAMPLE_RATES")))
+        handler.addFilter(SamplingFilter(_sample_rates))
+        handler.addFilter(ContextFilter())
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, *(sinks or create_sinks()))
+        _listener.start()
+        atexit.register(_listener.stop)
+        _handler = handler
+        return handler
+
+
+def get_logger(name):
+    """
+    Return a logger below the "chatbot" logger, configuring logging on first use.
+
+    Args:
+        name (str): Module name, e.g. "conversation_storage".
+
+    Returns:
+        logging.Logger: The logger.
+
+    Example:
+        >>> logger = get_logger("app")
+        >>> logger.info("Conversation saved", extra={"event": "storage.conversation_saved", "duration_ms": 12.5})
+    """
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_sampled(logger, event, msg, level=logging.INFO, **fields):
+    """
+    Log a high-volume event, applying its LOG_SAMPLE_RATES rate first.
+
+    The sampling decision is made before the record is created, so a
+    sampled-out call costs a dictionary lookup and a random number.
+
+    Args:
+        logger (logging.Logger): Logger from get_logger().
+        event (str): Event name, e.g. "storage.conversation_saved".
+        msg (str): Log message.
+        level (int): Log level; WARNING and above are never sampled out.
+        **fields: Additional record fields (as for `extra`).
+
+    Returns:
+        None
+
+    Example:
+        >>> log_sampled(logger, "storage.conversation_saved", "Conversation saved", duration_ms=12.5)
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sample_rates.get(event)
+    if rate is not None and level < logging.WARNING:
+        if random.random() >= rate:
+            return
+        fields["sample_rate"] = rate
+    logger.log(level, msg, extra={"event": event, **fields})
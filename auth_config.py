@@ -6,10 +6,14 @@ from AWS Secrets Manager. It manages environment-specific URLs for Cognito
 and retrieves client secrets required for the OAuth flow.
 """
 
-import boto3
 import json
 import os
 
+from shared_cache import cached
+
+# Secrets are cached in process memory only, never in the shared cache tier.
+SECRET_CACHE_TTL = int(os.getenv("SECRET_CACHE_TTL", 3600))
+
 
 class AuthConfig:
     """
@@ -21,6 +25,8 @@ class AuthConfig:
         authorize_url (str): Cognito authorize endpoint for the configured environment.
         token_url (str): Cognito token endpoint for the configured environment.
         callback_url (str): OAuth callback URL used by the application.
+        admin_users (set): Lower-cased e-mail addresses allowed to open the admin area,
+            read from the comma-separated ADMIN_USERS env var.
 
     Example:
         >>> cfg = AuthConfig()
@@ -50,6 +56,9 @@ class AuthConfig:
         self.authorize_url = f"https://man-salesfunnel-leadseek-{self.env}-userpool-domain.auth.eu-west-1.amazoncognito.com/oauth2/authorize"
         self.token_url = f"https://man-salesfunnel-leadseek-{self.env}-userpool-domain.auth.eu-west-1.amazoncognito.com/oauth2/token"
         self.callback_url = "https://sa-chatbot.salesfunnel-dev.rio.cloud"
+        self.admin_users = {
+            email.strip().lower() for email in os.getenv("ADMIN_USERS", "").split(",") if email.strip()
+        }
 
     def get_client_secret(self, key: str) -> str:
         """
@@ -81,11 +90,41 @@ class AuthConfig:
             secretid = self.secret_name
         elif key == "B2C_CLIENT_SECRET":
             secretid = self.sso_client_id_secret
-        client = boto3.client("secretsmanager", region_name="eu-west-1")
-        response = client.get_secret_value(SecretId=secretid)
-        if "SecretString" in response:
-            secret_string = response["SecretString"]
-            secret = json.loads(secret_string)
-            return secret
-        else:
-            raise Exception("Secret not found in response.")
\ No newline at end of file
+        return fetch_secret(secretid)
+
+
+@cached("secrets", ttl=SECRET_CACHE_TTL, shared=False)
+def fetch_secret(secret_id: str):
+    """
+    Fetch and parse a secret from AWS Secrets Manager.
+
+    boto3 is imported on the first call only, so importing this module does
+    not load botocore. Results are kept in the in-process L1 cache for
+    SECRET_CACHE_TTL seconds because app.py re-creates Auth on every
+    Streamlit rerun; they are never written to the shared cache file or
+    server.
+
+    Args:
+        secret_id (str): Secrets Manager secret id.
+
+    Returns:
+        dict: Parsed JSON content of the secret string.
+
+    Raises:
+        Exception: If the secret is not present in the Secrets Manager response.
+        botocore.exceptions.ClientError: If the AWS Secrets Manager call fails.
+
+    Example:
+        >>> fetch_secret("dev/sso/id")
+        {'client_id': '...'}
+    """
+    import boto3
+
+    client = boto3.client("secretsmanager", region_name="eu-west-1")
+    response = client.get_secret_value(SecretId=secret_id)
+    if "SecretString" in response:
+        secret_string = response["SecretString"]
+        secret = json.loads(secret_string)
+        return secret
+    else:
+        raise Exception("Secret not found in response.")
\ No newline at end of file
@@ -1,9 +1,10 @@
 import streamlit as st
-import requests
 import urllib.parse
-import jwt
 import warnings
 from auth_config import AuthConfig
+from app_logging import get_logger
+
+logger = get_logger("auth_streamlit")
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
@@ -32,8 +33,9 @@ class Auth:
         """
         Initialize Auth instance with configuration and client credentials.
 
-        Reads environment and secrets via AuthConfig, sets OAuth endpoints and
-        logout URL.
+        Reads environment via AuthConfig, sets OAuth endpoints and logout URL.
+        The client id is fetched from Secrets Manager on first use (see
+        client_id), so constructing Auth does not touch AWS.
 
         Args:
             None
@@ -41,16 +43,12 @@ class Auth:
         Returns:
             None
 
-        Raises:
-            botocore.exceptions.ClientError: If retrieving client secret fails.
-
         Example:
             >>> auth = Auth()
             >>> auth.client_id is not None
             True
         """
         self.setts = AuthConfig()  
-        self.client_id=self.setts.get_client_secret("B2C_CLIENT_SECRET")["client_id"]
         self.redirect_uri = self.setts.callback_url
         # Azure B2C endpoints
         self.authorization = self.setts.authorize_url
@@ -64,6 +62,19 @@ class Auth:
         )
 
 
+    @property
+    def client_id(self):
+        """
+        OAuth client id, retrieved from Secrets Manager on first access.
+
+        Returns:
+            str: The OAuth client id.
+
+        Raises:
+            botocore.exceptions.ClientError: If retrieving client secret fails.
+        """
+        return self.setts.get_client_secret("B2C_CLIENT_SECRET")["client_id"]
+
     def redirect_to_login(self):
         """
         Constructs the Azure B2C authorization URL and redirects the user 
@@ -112,6 +123,9 @@ class Auth:
             >>> auth.handle_callback("auth_code")
             {'email': 'user@example.com', 'name': 'User Name', 'sub': '...'}
         """
+        import jwt
+        import requests
+
         data = {
             "grant_type": "authorization_code",
             "client_id": self.client_id,
@@ -124,19 +138,23 @@ class Auth:
         #execute POST request to token endpoint
         resp = requests.post(self.token_url, data=data, headers=headers)
         if resp.status_code != 200:
-            print("Token exchange failed:", resp.text)
+            logger.warning("Token exchange failed", extra={
+                "event": "auth.token_exchange_failed",
+                "status_code": resp.status_code,
+                "response": resp.text[:500],
+            })
             return None
 
         tokens = resp.json()
         id_token = tokens.get("id_token")
         if not id_token:
-            print("No ID token returned")
+            logger.warning("No ID token returned", extra={"event": "auth.no_id_token"})
             return None
 
         try:
             decoded = jwt.decode(id_token, options={"verify_signature": False})
-        except Exception as e:
-            print("JWT decode failed:", e)
+        except Exception:
+            logger.warning("JWT decode failed", exc_info=True, extra={"event": "auth.jwt_decode_failed"})
             return None
 
         return {
@@ -145,6 +163,24 @@ class Auth:
             "sub": decoded.get("sub"),
         }
 
+    def is_admin(self, user_info):
+        """
+        Checks whether the authenticated user may open the admin area.
+
+        Args:
+            user_info (dict): User information returned by handle_callback.
+
+        Returns:
+            bool: True if the user's e-mail is listed in ADMIN_USERS.
+
+        Example:
+            >>> auth = Auth()
+            >>> auth.is_admin({"email": "admin@man.eu"})
+            True
+        """
+        email = (user_info or {}).get("email") or ""
+        return email.lower() in self.setts.admin_users
+
     # Logout
     def logout(self):
         """
@@ -0,0 +1,102 @@
+"""
+Shared cache benchmark.
+
+Measures get/set throughput of the L1 (in-process), L2 SQLite and L2 Redis
+tiers, and verifies that a value written by one worker process is served to
+another one from the shared L2. The Redis tier uses an in-process stand-in
+client unless --redis-url is given.
+
+Usage:
+    python benchmarks/bench_cache.py [--ops 20000] [--value-bytes 4000] [--redis-url redis://...]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from shared_cache import MemoryCache, RedisCacheBackend, SQLiteCacheBackend, TwoLevelCache  # noqa: E402
+
+
+class LocalRedis:
+    """Minimal stand-in for redis.Redis (get/set with ex/delete)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item[0]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + (ex or 1e9))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+def bench_tier(label, cache, ops, value):
+    """Print set and get rates for a cache tier."""
+    keys = [f"answers:{i}" for i in range(min(ops, 1000))]
+    start = time.perf_counter()
+    for i in range(ops):
+        cache.set(keys[i % len(keys)], value, 300)
+    set_rate = ops / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(ops):
+        cache.get(keys[i % len(keys)])
+    get_rate = ops / (time.perf_counter() - start)
+    print(f"{label:<24} {set_rate:>12.0f} {get_rate:>12.0f}")
+
+
+def _worker_read(path, queue):
+    cache = TwoLevelCache(SQLiteCacheBackend(path))
+    queue.put((cache.get("answers:shared"), cache.stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--value-bytes", type=int, default=4000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    value = ("Die OptiView-Umschaltung wechselt die Kameraansicht. " * 200)[:args.value_bytes]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        redis_backend = (
+            RedisCacheBackend.from_url(args.redis_url) if args.redis_url else RedisCacheBackend(LocalRedis())
+        )
+
+        print(f"{'tier':<24} {'sets/s':>12} {'gets/s':>12}")
+        memory = MemoryCache()
+        bench_tier("L1 memory (raw bytes)", memory, args.ops, value.encode("utf-8"))
+        bench_tier("L1 only (TwoLevel)", TwoLevelCache(None), args.ops, value)
+        bench_tier("L2 sqlite (L1 off)", TwoLevelCache(SQLiteCacheBackend(path), l1_entries=0), args.ops, value)
+        bench_tier("L2 redis (L1 off)", TwoLevelCache(redis_backend, l1_entries=0), args.ops, value)
+        bench_tier("L1 + L2 sqlite", TwoLevelCache(SQLiteCacheBackend(path)), args.ops, value)
+
+        writer = TwoLevelCache(SQLiteCacheBackend(path))
+        writer.set("answers:shared", value, 300)
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_worker_read, args=(path, queue))
+        process.start()
+        shared_value, stats = queue.get()
+        process.join()
+        print()
+        print(f"cross-process L2 hit: {shared_value == value} (reader stats: {stats})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold start benchmark.
+
+Measures, in fresh interpreter processes:
+
+1. The import time of each app module and which heavy dependencies
+   (boto3, botocore, jwt, requests) it pulls in.
+2. The time until the unauthenticated login card is rendered ("first paint"),
+   using Streamlit's AppTest harness, and whether AWS clients were touched.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules imported by app.py at startup (admin and bulk_questions are imported on demand).
+MODULES = [
+    "app_logging", "metrics", "profiling", "shared_cache", "storage_backend", "search_index",
+    "conversation_storage", "conversation_model", "feedback_storage", "api_client", "auth_config",
+    "auth_streamlit",
+]
+HEAVY = ["boto3", "botocore", "jwt", "requests"]
+
+IMPORT_PROBE = """
+import json, sys, time
+import streamlit  # shared baseline, not attributed to the app modules
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PAINT_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=60).run()
+elapsed = time.perf_counter() - start
+login = any("login-card" in m.value for m in at.markdown)
+print(json.dumps({{"seconds": elapsed, "login_card": login, "exception": bool(at.exception),
+                   "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_probe(code):
+    """Run a probe in a fresh interpreter and return its JSON result."""
+    env = dict(os.environ, AWS_EC2_METADATA_DISABLED="true")
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'import ms':>10}  heavy deps loaded")
+    for module in MODULES:
+        results = [run_probe(IMPORT_PROBE.format(module=module, heavy=HEAVY)) for _ in range(args.runs)]
+        median = statistics.median(r["seconds"] for r in results) * 1000
+        print(f"{module:<22} {median:>10.1f}  {', '.join(results[-1]['heavy']) or '-'}")
+
+    results = [run_probe(PAINT_PROBE.format(heavy=HEAVY)) for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in results) * 1000
+    last = results[-1]
+    print()
+    print(f"first paint (login card): {median:.1f} ms median over {args.runs} runs")
+    print(f"  login card rendered: {last['login_card']}, exception: {last['exception']}")
+    print(f"  heavy deps loaded: {', '.join(last['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
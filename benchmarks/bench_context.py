@@ -0,0 +1,82 @@
+"""
+Context protocol benchmark.
+
+Plays --conversations conversations of --turns turns against the local stub
+backend (benchmarks/stub_backend.py), once with the full-history protocol and
+once with the incremental protocol, and compares request bytes and per-turn
+latency. In incremental mode, the context of every conversation is dropped
+once halfway through to exercise the fallback to the full payload.
+
+Usage:
+    python benchmarks/bench_context.py [--turns 20] [--conversations 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import api_client  # noqa: E402
+import metrics  # noqa: E402
+import shared_cache  # noqa: E402
+from conversation_model import Conversation  # noqa: E402
+from metrics import Histogram  # noqa: E402
+from stub_backend import StubBackend, make_server  # noqa: E402
+
+
+def run(backend, mode, conversations, turns):
+    api_client.CONTEXT_MODE = mode
+    # Start cold so first turns are not answered from the previous mode's cache.
+    shared_cache.set_cache(shared_cache.TwoLevelCache(shared_cache.MemoryCache()))
+    backend.requests = backend.bytes_received = 0
+    histogram = Histogram()
+    for c in range(conversations):
+        conversation = Conversation(str(uuid.uuid4()), max_turns=turns)
+        for turn in range(turns):
+            if mode == "incremental" and turn == turns // 2:
+                backend.expire(conversation.session_id)
+            prompt = f"Gespräch {c}, Frage {turn}: Wie funktioniert das Offroad-ABS?"
+            start = time.perf_counter()
+            answer = api_client.query_api(
+                prompt,
+                conversation.history,
+                conversation_id=conversation.session_id,
+                turn_index=len(conversation)
+            )
+            histogram.record((time.perf_counter() - start) * 1000)
+            assert answer != api_client.ERROR_MESSAGE
+            conversation.add(prompt, answer)
+    return histogram, backend.requests, backend.bytes_received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--seconds-per-kb", type=float, default=0.001,
+                        help="simulated server parse/model time per KB of context")
+    args = parser.parse_args()
+
+    backend = StubBackend(seconds_per_kb=args.seconds_per_kb)
+    server = make_server(backend)
+    api_client.API_URL = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print(f"{'mode':<12} {'requests':>9} {'KB sent':>9} {'KB/turn':>8} {'p50 ms':>8} {'p95 ms':>8} {'fallbacks':>10}")
+    for mode in ("full", "incremental"):
+        fallbacks_before = sum(metrics.registry.counts("api.context_fallbacks"))
+        histogram, requests, sent = run(backend, mode, args.conversations, args.turns)
+        fallbacks = sum(metrics.registry.counts("api.context_fallbacks")) - fallbacks_before
+        turns = args.conversations * args.turns
+        print(
+            f"{mode:<12} {requests:>9} {sent / 1024:>9.1f} {sent / 1024 / turns:>8.2f} "
+            f"{histogram.percentile(50):>8.1f} {histogram.percentile(95):>8.1f} {fallbacks:>10}"
+        )
+    print(f"server context errors: {backend.errors}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
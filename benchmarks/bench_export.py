@@ -0,0 +1,106 @@
+"""
+Bulk export benchmark.
+
+Fills the local S3 stand-in with --days daily conversation files and
+exports them:
+
+1. sequential: the previous approach, S3Backend.query() downloading the
+   files one by one and loading each fully into memory;
+2. storage_export with 1 and --workers download threads, streaming parse
+   and NDJSON output to /dev/null. With --failure-rate, a fraction of
+   downloads fails transiently to exercise the retries.
+
+Reports wall time, throughput and peak traced memory (from a separate run).
+
+Usage:
+    python benchmarks/bench_export.py [--days 60] [--per-day 300] [--latency 0.02] [--workers 16]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import storage_export  # noqa: E402
+from benchmarks.bench_storage import make_entries  # noqa: E402
+from benchmarks.local_s3 import LocalS3Client  # noqa: E402
+from storage_backend import CONVERSATIONS, S3Backend, entry_day  # noqa: E402
+
+
+class FlakyS3Client(LocalS3Client):
+    """LocalS3Client whose get_object fails with a connection error at a given rate."""
+
+    failure_rate = 0.0
+
+    def get_object(self, Bucket, Key, **kwargs):
+        if random.random() < self.failure_rate:
+            self._request()
+            raise ConnectionResetError("simulated transient failure")
+        return super().get_object(Bucket, Key, **kwargs)
+
+
+def fill(s3, days, per_day):
+    """Write `days` daily conversation files of `per_day` entries each."""
+    total = 0
+    for d in range(days):
+        entries = make_entries(per_day, users=20)
+        day = f"2025-{1 + d // 28:02d}-{1 + d % 28:02d}"
+        for entry in entries:
+            entry["timestamp"] = day + entry["timestamp"][10:]
+        body = json.dumps(entries, indent=4, ensure_ascii=False)
+        s3.put_object(Bucket="bench", Key=f"conversations/{entry_day(entries[0])}.json", Body=body)
+        total += len(body)
+    return total
+
+
+def measure(label, func, size):
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    # Memory is traced in a second run, as tracing slows the timed run down.
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<22} {count:>8} {elapsed:>8.2f} {size / elapsed / 1e6:>8.1f} {count / elapsed:>10.0f} "
+        f"{peak / 1e6:>9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--per-day", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per S3 request")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    s3 = FlakyS3Client(latency=args.latency, page_size=100)
+    size = fill(s3, args.days, args.per_day)
+    backend = S3Backend("bench", client=s3)
+    storage_export.RETRY_BACKOFF = args.latency
+    print(f"{args.days} files, {size / 1e6:.1f} MB, {args.latency * 1000:.0f} ms per request\n")
+
+    def sequential():
+        return len(backend.query(CONVERSATIONS))
+
+    def concurrent(workers):
+        with open(os.devnull, "w", encoding="utf-8") as f:
+            return storage_export.export(backend, CONVERSATIONS, f, workers=workers)
+
+    print(f"{'mode':<22} {'entries':>8} {'time s':>8} {'MB/s':>8} {'entries/s':>10} {'peak MB':>9}")
+    measure("sequential query()", sequential, size)
+    s3.failure_rate = args.failure_rate
+    measure("export, 1 worker", lambda: concurrent(1), size)
+    measure(f"export, {args.workers} workers", lambda: concurrent(args.workers), size)
+
+
+if __name__ == "__main__":
+    main()
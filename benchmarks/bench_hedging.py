@@ -0,0 +1,95 @@
+"""
+Hedged request benchmark.
+
+Runs a local HTTP server whose response times follow a heavy-tailed
+distribution (most requests take --fast seconds, a fraction --stall-rate
+stall for --stall seconds) and compares query latency percentiles with and
+without hedging, plus the extra backend load caused by hedges.
+
+Usage:
+    python benchmarks/bench_hedging.py [--requests 200] [--stall-rate 0.02]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import api_client  # noqa: E402
+from metrics import Histogram  # noqa: E402
+
+
+def make_server(fast, stall, stall_rate):
+    """Start the heavy-tailed stub server and return it."""
+    class Handler(BaseHTTPRequestHandler):
+        requests_seen = 0
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            Handler.requests_seen += 1
+            time.sleep(stall if random.random() < stall_rate else fast * random.uniform(0.5, 1.5))
+            body = json.dumps({"body": "Antwort"}).encode("utf-8")
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # client cancelled the request
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler
+
+
+def run(count, hedged):
+    histogram = Histogram()
+    for i in range(count):
+        start = time.perf_counter()
+        payload = {"prompt": f"Frage {i}", "history": []}
+        if hedged:
+            api_client._post_hedged(payload, api_client.Deadline())
+        else:
+            api_client._post(payload, api_client.Deadline())
+        histogram.record((time.perf_counter() - start) * 1000)
+    return histogram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--fast", type=float, default=0.05)
+    parser.add_argument("--stall", type=float, default=2.0)
+    parser.add_argument("--stall-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server, handler = make_server(args.fast, args.stall, args.stall_rate)
+    api_client.API_URL = f"http://127.0.0.1:{server.server_address[1]}/"
+    api_client.HEDGE_MIN_DELAY = args.fast
+    api_client.HEDGE_DEFAULT_DELAY = args.fast * 3
+    api_client.HEDGE_SHADOW_RATE = 0.0
+
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'backend req':>12}")
+    for hedged in (False, True):
+        handler.requests_seen = 0
+        histogram = run(args.requests, hedged)
+        print(
+            f"{'hedged' if hedged else 'plain':<10} {histogram.percentile(50):>8.0f} {histogram.percentile(95):>8.0f} "
+            f"{histogram.percentile(99):>8.0f} {histogram.max:>8.0f} {handler.requests_seen:>12}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
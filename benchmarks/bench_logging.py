@@ -0,0 +1,101 @@
+"""
+Logging overhead microbenchmark.
+
+Measures the per-call cost on the calling thread of:
+
+1. print() to the sink (the previous approach),
+2. a synchronous JSON StreamHandler writing to the sink,
+3. the queue-based handler from app_logging (formatting and I/O happen on
+   the listener thread),
+4. a call dropped by the sampling filter, and by log_sampled() before the
+   record is created.
+
+The sink can simulate slow stdout (e.g. a blocked container log pipe) with
+--sink-delay.
+
+Usage:
+    python benchmarks/bench_logging.py [--calls 20000] [--sink-delay 0.0001]
+"""
+
+import argparse
+import atexit
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app_logging  # noqa: E402
+
+
+class SlowSink:
+    """File-like object whose writes take a fixed time."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--sink-delay", type=float, default=0.0, help="seconds per write on the sink")
+    args = parser.parse_args()
+    sink = SlowSink(args.sink_delay)
+    extra = {"event": "storage.conversation_saved", "backend": "s3", "duration_ms": 12.5}
+
+    results = {}
+    results["print()"] = per_call_us(lambda i: print(f"[INFO] Conversation saved to s3 at {i}", file=sink), args.calls)
+
+    sync_logger = logging.getLogger("bench.sync")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    sync_handler = logging.StreamHandler(sink)
+    sync_handler.setFormatter(app_logging.JsonFormatter())
+    sync_handler.addFilter(app_logging.ContextFilter())
+    sync_logger.addHandler(sync_handler)
+    results["sync JSON handler"] = per_call_us(lambda i: sync_logger.info("Conversation saved", extra=extra), args.calls)
+
+    sink_handler = logging.StreamHandler(sink)
+    sink_handler.setFormatter(app_logging.JsonFormatter())
+    app_logging.setup_logging(sinks=[sink_handler])
+    app_logging.bind(session_id="4f1c2d3e", user_id="ab12cd34")
+    queued_logger = app_logging.get_logger("bench")
+    results["queued JSON handler"] = per_call_us(lambda i: queued_logger.info("Conversation saved", extra=extra), args.calls)
+
+    app_logging._sample_rates["bench.sampled_out"] = 0.0
+    results["sampled out (filter)"] = per_call_us(
+        lambda i: queued_logger.info("Cache hit", extra={"event": "bench.sampled_out"}), args.calls
+    )
+    results["sampled out (helper)"] = per_call_us(
+        lambda i: app_logging.log_sampled(queued_logger, "bench.sampled_out", "Cache hit"), args.calls
+    )
+
+    start = time.perf_counter()
+    atexit.unregister(app_logging._listener.stop)
+    app_logging._listener.stop()
+    drain = time.perf_counter() - start
+
+    print(f"{'variant':<22} {'us/call':>10}")
+    for name, value in results.items():
+        print(f"{name:<22} {value:>10.2f}")
+    print(f"(listener drained the backlog in {drain:.2f} s; dropped records: {app_logging._handler.dropped})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-session memory benchmark.
+
+Compares the memory held per chat session by the previous session_state
+layout (a `messages` list of dicts, a `history` list of tuples and the
+last prompt/answer strings) with the compact Conversation model, for
+sessions of increasing length.
+
+Usage:
+    python benchmarks/bench_session_memory.py [--sessions 200] [--answer-chars 1500]
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from conversation_model import Conversation  # noqa: E402
+
+
+def make_turn(session, i, answer_chars):
+    """Return a distinct (question, answer) pair, as produced by the API."""
+    question = f"Frage {i} zu OptiView in Sitzung {session}?"
+    answer = (f"Antwort {i}/{session}: " + "Die OptiView-Umschaltung wechselt die Kameraansicht. " * 40)[:answer_chars]
+    return question, answer
+
+
+def legacy_session(session, turns, answer_chars):
+    """Build the previous per-session state."""
+    state = {"messages": [{"role": "assistant", "content": "Hallo!"}], "history": []}
+    for i in range(turns):
+        question, answer = make_turn(session, i, answer_chars)
+        state["messages"].append({"role": "user", "content": question})
+        state["messages"].append({"role": "assistant", "content": answer})
+        state["last_user_prompt"] = question
+        state["last_assistant_answer"] = answer
+        state["history"].append((question, answer))
+    return state
+
+
+def compact_session(session, turns, answer_chars, max_turns):
+    """Build the Conversation-based per-session state."""
+    conversation = Conversation(f"session-{session}", max_turns=max_turns)
+    for i in range(turns):
+        question, answer = make_turn(session, i, answer_chars)
+        conversation.mark_saved(conversation.add(question, answer, "2025-12-18 12:00:00"))
+    return {"conversation": conversation}
+
+
+def measure(build, sessions):
+    """Return the bytes retained per session by the given builder."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(session) for session in range(sessions)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--answer-chars", type=int, default=1500)
+    parser.add_argument("--max-turns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'turns':>6} {'legacy KiB':>12} {'compact KiB':>12} {'capped KiB':>12}")
+    for turns in (5, 20, 50, 100):
+        legacy = measure(lambda s: legacy_session(s, turns, args.answer_chars), args.sessions)
+        compact = measure(lambda s: compact_session(s, turns, args.answer_chars, 0), args.sessions)
+        capped = measure(lambda s: compact_session(s, turns, args.answer_chars, args.max_turns), args.sessions)
+        print(f"{turns:>6} {legacy / 1024:>12.1f} {compact / 1024:>12.1f} {capped / 1024:>12.1f}")
+    print(f"(capped = Conversation with max_turns={args.max_turns}; older turns are kept as (prompt, answer) pairs)")
+
+
+if __name__ == "__main__":
+    main()
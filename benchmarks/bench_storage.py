@@ -0,0 +1,81 @@
+"""
+Storage backend throughput benchmark.
+
+Compares write and query throughput of the S3 backend (against the local
+S3 stand-in, so only the whole-file JSON cost is measured, not the network)
+and the SQLite WAL backend.
+
+Usage:
+    python benchmarks/bench_storage.py [--entries 2000] [--users 50] [--latency 0.0]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.local_s3 import LocalS3Client  # noqa: E402
+from storage_backend import CONVERSATIONS, S3Backend, SQLiteBackend  # noqa: E402
+
+
+def make_entries(count, users):
+    """Build synthetic conversation entries spread over a few days."""
+    sessions = [str(uuid.uuid4()) for _ in range(users * 2)]
+    entries = []
+    for i in range(count):
+        entries.append({
+            "username": f"user{i % users}@man.eu",
+            "userId": f"{i % users:08x}",
+            "sessionId": sessions[i % len(sessions)],
+            "timestamp": f"2025-11-{10 + i % 5:02d} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+            "question": "Wie funktioniert die OptiView-Umschaltung?",
+            "answer": "Die OptiView-Umschaltung wechselt zwischen den Kameraansichten. " * 8,
+        })
+    return entries
+
+
+def bench(backend, entries, users):
+    """Return (writes/s, user queries/s, session queries/s) for a backend."""
+    start = time.perf_counter()
+    for entry in entries:
+        backend.append(CONVERSATIONS, entry)
+    write_rate = len(entries) / (time.perf_counter() - start)
+
+    rounds = min(users, 50)
+    start = time.perf_counter()
+    for i in range(rounds):
+        backend.query(CONVERSATIONS, user_id=f"{i:08x}")
+    user_rate = rounds / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for entry in entries[:rounds]:
+        backend.query(CONVERSATIONS, session_id=entry["sessionId"])
+    session_rate = rounds / (time.perf_counter() - start)
+    return write_rate, user_rate, session_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated S3 request latency in seconds")
+    args = parser.parse_args()
+
+    entries = make_entries(args.entries, args.users)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            S3Backend("bench", client=LocalS3Client(latency=args.latency)),
+            SQLiteBackend(os.path.join(tmp, "bench.db")),
+        ]
+        print(f"{'backend':<8} {'writes/s':>12} {'user q/s':>12} {'session q/s':>12}")
+        for backend in backends:
+            write_rate, user_rate, session_rate = bench(backend, entries, args.users)
+            print(f"{backend.name:<8} {write_rate:>12.1f} {user_rate:>12.1f} {session_rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Local S3 stand-in used by the benchmarks.
+
+Implements the subset of the boto3 S3 client used by the storage modules
+(get_object, put_object, delete_object, copy_object and the
+list_objects_v2 paginator) on top of an in-process dict, with an optional
+per-request latency to approximate a remote object store.
+"""
+
+import io
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3Client:
+    """
+    In-memory object store speaking the boto3 S3 client interface.
+
+    Args:
+        latency (float): Seconds slept on every request.
+        page_size (int): Maximum number of keys per list_objects_v2 page.
+
+    Example:
+        >>> s3 = LocalS3Client()
+        >>> s3.put_object(Bucket="b", Key="k", Body="[]")
+        >>> s3.get_object(Bucket="b", Key="k")["Body"].read()
+        b'[]'
+    """
+
+    def __init__(self, latency=0.0, page_size=1000):
+        self.latency = latency
+        self.page_size = page_size
+        self.objects = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._request()
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        with self._lock:
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._request()
+        with self._lock:
+            body = self.objects.get((Bucket, Key))
+        if body is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._request()
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self._request()
+        with self._lock:
+            self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=None, **kwargs):
+        self._request()
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        size = min(MaxKeys or self.page_size, self.page_size)
+        page = keys[start:start + size]
+        response = {
+            "Contents": [{"Key": key, "Size": len(self.objects[(Bucket, key)])} for key in page],
+            "KeyCount": len(page),
+            "IsTruncated": start + size < len(keys),
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + size)
+        return response
+
+    def get_paginator(self, operation):
+        if operation != "list_objects_v2":
+            raise NotImplementedError(operation)
+        return _ListPaginator(self)
+
+
+class _ListPaginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            page = self.client.list_objects_v2(ContinuationToken=token, **kwargs)
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
@@ -0,0 +1,143 @@
+"""
+Local stub of the chatbot backend.
+
+Implements both request protocols of api_client:
+
+1. Full: {"prompt", "history"} - the whole history is parsed on every turn.
+   If a "conversation_id" is included, the server (re-)seeds its stored
+   context for that conversation.
+2. Incremental: {"prompt", "conversation_id", "turn_index"} - only the new
+   turn is sent. Unknown, expired or out-of-sync contexts are answered with
+   HTTP 409 and {"error": "unknown_context" | "context_expired" |
+   "context_mismatch"}.
+
+The server counts request bytes and simulates model time proportional to the
+context size, so bytes on the wire and latency can be compared offline.
+
+Usage:
+    python benchmarks/stub_backend.py [--port 8765] [--ttl 1800]
+    API_URL=http://127.0.0.1:8765/ API_CONTEXT_MODE=incremental streamlit run app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBackend:
+    """
+    Context store and request statistics of the stub server.
+
+    Args:
+        ttl (float): Seconds after which an unused context expires.
+        answer_chars (int): Length of the generated answers.
+        seconds_per_kb (float): Simulated processing time per KB of context.
+    """
+
+    def __init__(self, ttl=1800, answer_chars=600, seconds_per_kb=0.0):
+        self.ttl = ttl
+        self.answer_chars = answer_chars
+        self.seconds_per_kb = seconds_per_kb
+        self.contexts = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+        self.errors = {}
+
+    def answer(self, prompt, turn):
+        text = f"Antwort {turn} auf '{prompt}': "
+        return (text + "MAN TGX Fahrerhaus, OptiView, Offroad-ABS. " * 50)[:self.answer_chars]
+
+    def expire(self, conversation_id):
+        """Drop a stored context, e.g. to simulate a restart or TTL expiry."""
+        with self.lock:
+            self.contexts.pop(conversation_id, None)
+
+    def handle(self, payload, size):
+        """
+        Process one request body.
+
+        Returns:
+            tuple: (HTTP status, response dict).
+        """
+        with self.lock:
+            self.requests += 1
+            self.bytes_received += size
+            conversation_id = payload.get("conversation_id")
+            if "history" in payload:
+                history = [list(pair) for pair in payload["history"]]
+            else:
+                context = self.contexts.get(conversation_id)
+                error = None
+                if context is None:
+                    error = "unknown_context"
+                elif time.time() - context["seen"] > self.ttl:
+                    del self.contexts[conversation_id]
+                    error = "context_expired"
+                elif len(context["history"]) != payload.get("turn_index"):
+                    error = "context_mismatch"
+                if error:
+                    self.errors[error] = self.errors.get(error, 0) + 1
+                    return 409, {"error": error}
+                history = context["history"]
+
+            answer = self.answer(payload["prompt"], len(history))
+            if conversation_id:
+                self.contexts[conversation_id] = {
+                    "history": history + [[payload["prompt"], answer]],
+                    "seen": time.time(),
+                }
+            context_kb = len(json.dumps(history)) / 1024
+
+        # Model time grows with the context, whichever way it arrived.
+        time.sleep(self.seconds_per_kb * context_kb)
+        return 200, {"body": answer}
+
+
+def make_server(backend, port=0):
+    """Start a ThreadingHTTPServer for the backend in a daemon thread and return it."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers["Content-Length"]))
+            status, data = backend.handle(json.loads(raw), len(raw))
+            body = json.dumps(data).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                # The client gave up (cancelled or hedged request).
+                pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttl", type=float, default=1800)
+    parser.add_argument("--seconds-per-kb", type=float, default=0.0)
+    args = parser.parse_args()
+
+    backend = StubBackend(ttl=args.ttl, seconds_per_kb=args.seconds_per_kb)
+    server = make_server(backend, args.port)
+    print(f"Stub backend listening on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Bulk Question Module
+
+Renders the bulk question mode of the Streamlit application. A user uploads
+a CSV or text file of questions; each question is answered independently
+(without chat history) via query_api by a bounded worker pool shared by all
+sessions of the process, and a token bucket keeps the request rate below the
+backend limit. Jobs take turns in the pool: each job has at most
+BULK_WORKERS questions queued at a time and queues its next question behind
+those of the other jobs, so a large upload does not hold up everyone else. Results appear in a table while the job runs, can be
+downloaded as CSV or XLSX (via openpyxl; the Excel download is hidden if it
+is not installed), and are logged through conversation_storage with
+"source": "bulk" under a sessionId of their own, so they never mix with the
+chat's turns.
+
+Environment:
+    BULK_WORKERS: Concurrent requests per worker process (default 4).
+    BULK_RATE_LIMIT: Requests per second per worker process (default 2, 0 disables).
+    BULK_MAX_QUESTIONS: Maximum number of questions per upload (default 200).
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+
+from api_client import ERROR_MESSAGE, Deadline, query_api
+from app_logging import get_logger
+from conversation_storage import save_conversations
+
+logger = get_logger("bulk_questions")
+
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", 4))
+BULK_RATE_LIMIT = float(os.getenv("BULK_RATE_LIMIT", 2.0))
+BULK_MAX_QUESTIONS = int(os.getenv("BULK_MAX_QUESTIONS", 200))
+
+# Header names recognised as the question column of a CSV file.
+QUESTION_COLUMNS = ("frage", "fragen", "question", "questions", "prompt")
+
+STATUS_LABELS = {
+    "pending": "Wartend",
+    "running": "In Bearbeitung",
+    "done": "Fertig",
+    "error": "Fehler",
+    "cancelled": "Abgebrochen",
+}
+
+
+def parse_questions(data, filename):
+    """
+    Extract the questions from an uploaded file.
+
+    CSV files use the column named like "Frage" or "question" if there is a
+    header, otherwise the first column; the delimiter (",", ";" or tab) is
+    detected. Any other file, and a CSV file without such a header whose
+    rows differ in length (unquoted commas in the questions), is read as one
+    question per line. Empty entries are skipped.
+
+    Args:
+        data (bytes): File content.
+        filename (str): Original file name, used to detect CSV files.
+
+    Returns:
+        list: The questions in file order.
+
+    Example:
+        >>> parse_questions(b"Frage;Thema\\nWas ist OptiView?;Kabine\\n", "fragen.csv")
+        ['Was ist OptiView?']
+    """
+    text = data.decode("utf-8-sig", errors="replace")
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not filename.lower().endswith(".csv"):
+        return lines
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = [row for row in csv.reader(io.StringIO(text), dialect) if any(cell.strip() for cell in row)]
+    column = 0
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        for index, name in enumerate(header):
+            if name in QUESTION_COLUMNS:
+                column = index
+                rows = rows[1:]
+                break
+        else:
+            if len({len(row) for row in rows}) > 1:
+                return lines
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+
+class RateLimiter:
+    """
+    Blocking token bucket limiting the rate of backend requests.
+
+    Args:
+        rate (float): Requests per second; 0 or less disables the limit.
+        burst (float): Number of requests that may be sent back to back.
+
+    Example:
+        >>> limiter = RateLimiter(rate=2.0)
+        >>> limiter.acquire()  # returns immediately, the next call waits ~0.5 s
+    """
+
+    def __init__(self, rate=BULK_RATE_LIMIT, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request may be sent."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = RateLimiter()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BULK_WORKERS, thread_name_prefix="bulk")
+    return _executor
+
+
+class BulkJob:
+    """
+    A set of questions answered in the background.
+
+    Up to BULK_WORKERS tasks per job run in the shared pool; each answers
+    one question and then queues a task for the next one at the back of the
+    pool's queue, so concurrent jobs are served in turn. Results are updated
+    in place by the worker threads; the Streamlit script only reads them.
+    Finished answers are saved in batches: whichever worker finds the save
+    lock free saves everything finished so far, and the last worker saves
+    the rest.
+
+    Args:
+        questions (list): Questions to answer.
+        username (str): User e-mail, logged with each entry.
+        user_id (str): Hashed user id.
+        session_id (str): Chat session id, logged as "chatSessionId". The
+            entries themselves get a new sessionId per job.
+
+    Example:
+        >>> job = BulkJob(["Was ist OptiView?"], "alice@man.eu", "ab12cd34", "4f1c...")
+        >>> job.start()
+        >>> job.running
+        True
+    """
+
+    def __init__(self, questions, username, user_id, session_id):
+        self.username = username
+        self.user_id = user_id
+        self.session_id = str(uuid.uuid4())
+        self.chat_session_id = session_id
+        self.results = [
+            {"question": question, "answer": "", "status": "pending", "seconds": None}
+            for question in questions
+        ]
+        self.started = None
+        self.finished = 0
+        self.cancelled = False
+        self._next = 0
+        self._deadlines = set()
+        self._unsaved = []
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    @property
+    def running(self):
+        """Whether questions are still waiting or being answered."""
+        return self.started is not None and self.finished < len(self.results)
+
+    def start(self):
+        """Queue the first questions in the shared worker pool."""
+        self.started = time.time()
+        executor = _get_executor()
+        for _ in range(min(BULK_WORKERS, len(self.results))):
+            executor.submit(self._run_next)
+        logger.info("Bulk job started", extra={"event": "bulk.started", "questions": len(self.results)})
+
+    def cancel(self):
+        """Skip the questions not sent yet and abort the requests in flight."""
+        with self._lock:
+            self.cancelled = True
+            skipped = range(self._next, len(self.results))
+            self._next = len(self.results)
+            deadlines = list(self._deadlines)
+        for index in skipped:
+            self._mark_cancelled(index)
+        for deadline in deadlines:
+            deadline.cancel()
+
+    def _mark_cancelled(self, index):
+        with self._lock:
+            self.results[index]["status"] = "cancelled"
+            self.finished += 1
+            last = self.finished == len(self.results)
+        if last:
+            self.flush()
+
+    def _run_next(self):
+        with self._lock:
+            if self._next >= len(self.results):
+                return
+            index = self._next
+            self._next += 1
+        self._answer(index)
+        # Queue the next question behind the other jobs' questions.
+        if self._next < len(self.results):
+            _get_executor().submit(self._run_next)
+
+    def _answer(self, index):
+        result = self.results[index]
+        if not self.cancelled:
+            rate_limiter.acquire()
+        deadline = Deadline()
+        with self._lock:
+            cancelled = self.cancelled
+            if not cancelled:
+                self._deadlines.add(deadline)
+        if cancelled:
+            self._mark_cancelled(index)
+            return
+        result["status"] = "running"
+        start = time.perf_counter()
+        try:
+            answer = query_api(result["question"], [], deadline=deadline)
+        finally:
+            with self._lock:
+                self._deadlines.discard(deadline)
+        if deadline.cancelled:
+            self._mark_cancelled(index)
+            return
+        result["seconds"] = round(time.perf_counter() - start, 1)
+        result["answer"] = answer
+        result["status"] = "error" if answer == ERROR_MESSAGE else "done"
+
+        entry = {
+            "username": self.username,
+            "userId": self.user_id,
+            "sessionId": self.session_id,
+            "chatSessionId": self.chat_session_id,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "question": result["question"],
+            "answer": answer,
+            "source": "bulk",
+        }
+        with self._lock:
+            self._unsaved.append(entry)
+            self.finished += 1
+            last = self.finished == len(self.results)
+        self.flush(block=last)
+
+    def flush(self, block=True):
+        """
+        Save all finished answers that were not saved yet.
+
+        Args:
+            block (bool): Wait for a save in progress instead of leaving the
+                entries to it.
+
+        Returns:
+            None
+        """
+        if not self._save_lock.acquire(blocking=block):
+            return
+        try:
+            while True:
+                with self._lock:
+                    batch, self._unsaved = self._unsaved, []
+                if not batch:
+                    break
+                try:
+                    save_conversations(batch)
+                except Exception:
+                    logger.error("Saving bulk answers failed", exc_info=True, extra={
+                        "event": "bulk.save_failed", "count": len(batch),
+                    })
+        finally:
+            self._save_lock.release()
+
+    def rows(self):
+        """Return the results as table rows with German column names."""
+        return [
+            {
+                "Nr.": index + 1,
+                "Frage": result["question"],
+                "Antwort": result["answer"],
+                "Status": STATUS_LABELS[result["status"]],
+                "Dauer (s)": result["seconds"],
+            }
+            for index, result in enumerate(self.results)
+        ]
+
+
+def to_csv(rows):
+    """
+    Return table rows as CSV bytes for Excel (UTF-8 with BOM, ";" delimiter).
+
+    Args:
+        rows (list): Rows as returned by BulkJob.rows().
+
+    Returns:
+        bytes: The CSV file content.
+    """
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(rows[0]) if rows else [], delimiter=";")
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue().encode("utf-8-sig")
+
+
+def to_xlsx(rows):
+    """
+    Return table rows as an XLSX workbook, if openpyxl is installed.
+
+    Args:
+        rows (list): Rows as returned by BulkJob.rows().
+
+    Returns:
+        bytes: The XLSX file content, or None without openpyxl.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        return None
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Antworten"
+    if rows:
+        sheet.append(list(rows[0]))
+        for row in rows:
+            sheet.append(list(row.values()))
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+@st.fragment(run_every=1)
+def _render_progress(job):
+    """Render the results of a running job; refreshed every second."""
+    done = sum(result["status"] in ("done", "error") for result in job.results)
+    st.progress(job.finished / len(job.results), text=f"{done} von {len(job.results)} Fragen beantwortet")
+    st.dataframe(job.rows(), hide_index=True, use_container_width=True)
+    if st.button("⏹️ Abbrechen", key="bulk_cancel"):
+        job.cancel()
+    if not job.running:
+        st.rerun()
+
+
+def _render_results(job):
+    """Render the results and downloads of a finished job."""
+    job.flush()
+    rows = job.rows()
+    errors = sum(result["status"] == "error" for result in job.results)
+    st.success(
+        f"{len(rows)} Fragen verarbeitet in {time.time() - job.started:.0f} s"
+        + (f" ({errors} mit Fehler)" if errors else "")
+    )
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+
+    filename = f"antworten_{datetime.fromtimestamp(job.started).strftime('%Y-%m-%d_%H-%M')}"
+    col1, col2 = st.columns(2)
+    col1.download_button("⬇️ CSV herunterladen", to_csv(rows), f"{filename}.csv", "text/csv")
+    xlsx = to_xlsx(rows)
+    if xlsx is not None:
+        col2.download_button(
+            "⬇️ Excel herunterladen",
+            xlsx,
+            f"{filename}.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+
+def render_bulk_page(username, user_id, session_id):
+    """
+    Render the bulk question mode.
+
+    Args:
+        username (str): User e-mail.
+        user_id (str): Hashed user id.
+        session_id (str): Chat session id.
+
+    Returns:
+        None
+    """
+    st.markdown("<h2 class='accent'>📋 Sammelanfrage</h2>", unsafe_allow_html=True)
+    st.caption(
+        "Laden Sie eine CSV-Datei (Spalte „Frage“) oder eine Textdatei mit einer Frage pro Zeile hoch. "
+        "Die Fragen werden unabhängig voneinander beantwortet."
+    )
+
+    job = st.session_state.get("bulk_job")
+    if job is None or not job.running:
+        uploaded = st.file_uploader("Fragen hochladen", type=["csv", "txt"], key="bulk_upload")
+        questions = parse_questions(uploaded.getvalue(), uploaded.name) if uploaded else []
+        if len(questions) > BULK_MAX_QUESTIONS:
+            st.warning(f"Es werden nur die ersten {BULK_MAX_QUESTIONS} von {len(questions)} Fragen verarbeitet.")
+            questions = questions[:BULK_MAX_QUESTIONS]
+        elif uploaded:
+            st.caption(f"{len(questions)} Fragen erkannt.")
+        if st.button("▶️ Fragen beantworten", type="primary", disabled=not questions, key="bulk_start"):
+            job = BulkJob(questions, username, user_id, session_id)
+            job.start()
+            st.session_state.bulk_job = job
+            st.rerun()
+
+    if job is not None:
+        if job.running:
+            _render_progress(job)
+        else:
+            _render_results(job)
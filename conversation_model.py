@@ -0,0 +1,184 @@
+"""
+Conversation Model Module
+
+Compact per-session representation of a chat conversation. Each exchange is
+stored once as a Turn and shared by rendering, the API payload and feedback,
+instead of being kept in several session_state structures.
+
+Only the most recent turns are held as Turn objects (SESSION_MAX_TURNS,
+default 20). Older turns are "spilled" once save_conversation has persisted
+them (see Conversation.mark_saved): only their (prompt, answer) pair is kept
+for the API history, so building the payload never reads storage. Showing
+older turns reloads them from the storage backend. Saved entries carry their
+position in the conversation ("turn"), and the conversation remembers the
+days its spilled turns were saved on, so a reload reads only those days and
+picks the turns by index.
+"""
+
+import os
+
+DEFAULT_MAX_TURNS = 20
+
+
+class Turn:
+    """
+    A single user-assistant exchange.
+
+    Args:
+        question (str): The user prompt.
+        answer (str): The assistant reply.
+        timestamp (str): Time of the exchange (YYYY-MM-DD HH:MM:SS).
+        index (int, optional): Position of the turn in its conversation.
+
+    Attributes:
+        saved (bool): Whether the turn has been persisted.
+
+    Example:
+        >>> turn = Turn("Hi", "Hallo", "2025-12-18 12:00:00")
+        >>> turn.as_pair()
+        ('Hi', 'Hallo')
+    """
+
+    __slots__ = ("question", "answer", "timestamp", "index", "saved")
+
+    def __init__(self, question, answer, timestamp="", index=None):
+        self.question = question
+        self.answer = answer
+        self.timestamp = timestamp
+        self.index = index
+        self.saved = False
+
+    def as_pair(self):
+        """Return the (prompt, answer) tuple used in the API history payload."""
+        return (self.question, self.answer)
+
+
+class Conversation:
+    """
+    Turns of one chat session with a bounded in-memory window.
+
+    Args:
+        session_id (str): The sessionId under which turns are persisted.
+        max_turns (int, optional): Number of turns kept as Turn objects.
+            Defaults to the SESSION_MAX_TURNS environment variable, or 20.
+            Zero or a negative value disables spilling.
+
+    Attributes:
+        session_id (str): The session id.
+        max_turns (int): In-memory turn cap.
+        spilled (int): Number of older turns kept only as (prompt, answer).
+        spilled_days (set): Days (YYYY-MM-DD) of the spilled turns.
+
+    Example:
+        >>> conversation = Conversation("4f1c...", max_turns=2)
+        >>> turn = conversation.add("Hi", "Hallo", "2025-12-18 12:00:00")
+        >>> conversation.mark_saved(turn)
+        >>> conversation.last.answer
+        'Hallo'
+    """
+
+    __slots__ = ("session_id", "max_turns", "spilled", "spilled_days", "_turns", "_spilled_pairs")
+
+    def __init__(self, session_id, max_turns=None):
+        if max_turns is None:
+            max_turns = int(os.getenv("SESSION_MAX_TURNS", DEFAULT_MAX_TURNS))
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.spilled = 0
+        self.spilled_days = set()
+        self._turns = []
+        self._spilled_pairs = []
+
+    def __len__(self):
+        return self.spilled + len(self._turns)
+
+    @property
+    def last(self):
+        """The most recent Turn, or None for an empty conversation."""
+        return self._turns[-1] if self._turns else None
+
+    def add(self, question, answer, timestamp=""):
+        """
+        Append a turn.
+
+        Args:
+            question (str): The user prompt.
+            answer (str): The assistant reply.
+            timestamp (str): Time of the exchange.
+
+        Returns:
+            Turn: The new turn; its index is stored with the saved entry as
+                  "turn".
+        """
+        turn = Turn(question, answer, timestamp, len(self))
+        self._turns.append(turn)
+        self._spill()
+        return turn
+
+    def mark_saved(self, turn):
+        """
+        Record that a turn has been persisted, so it may be spilled.
+
+        Args:
+            turn (Turn): A turn returned by add().
+
+        Returns:
+            None
+        """
+        turn.saved = True
+        self._spill()
+
+    def _spill(self):
+        """Spill the oldest saved turns beyond the cap; unsaved turns stay in memory."""
+        while self.max_turns > 0 and len(self._turns) > self.max_turns and self._turns[0].saved:
+            old = self._turns.pop(0)
+            self._spilled_pairs.append(old.as_pair())
+            self.spilled_days.add(old.timestamp[:10])
+            self.spilled += 1
+
+    def recent(self):
+        """Return the turns held in memory, oldest first."""
+        return list(self._turns)
+
+    def load_spilled(self):
+        """
+        Reload the spilled turns from the storage backend.
+
+        Only the days in `spilled_days` are read. Entries are matched by
+        their "turn" index, so other entries of the session (cancelled
+        turns, bulk questions) are never taken for chat turns. Turns missing
+        from storage are rebuilt from the in-memory pairs, without timestamp.
+
+        Returns:
+            list: The spilled turns, oldest first.
+        """
+        if not self.spilled:
+            return []
+        from conversation_storage import load_session_conversations
+
+        turns = {}
+        for entry in load_session_conversations(self.session_id, days=self.spilled_days):
+            index = entry.get("turn")
+            if isinstance(index, int) and 0 <= index < self.spilled and entry.get("status") != "cancelled":
+                turns.setdefault(index, Turn(
+                    entry.get("question", ""), entry.get("answer", ""), entry.get("timestamp", ""), index
+                ))
+        return [
+            turns.get(index) or Turn(question, answer, "", index)
+            for index, (question, answer) in enumerate(self._spilled_pairs)
+        ]
+
+    def turns(self):
+        """Return all turns, reloading spilled ones from storage."""
+        return self.load_spilled() + self._turns
+
+    def history(self):
+        """
+        Return the conversation as (prompt, answer) pairs for the API payload.
+
+        Built from memory only; spilled turns are not reloaded from storage.
+
+        Returns:
+            list: Tuples of (prompt, answer), oldest first.
+        """
+        return self._spilled_pairs + [turn.as_pair() for turn in self._turns]
@@ -1,29 +1,29 @@
-import json
-import boto3
-from datetime import datetime
-from botocore.exceptions import ClientError
+import time
 
-# --- s3 bucket configuration ---
-BUCKET_NAME = "man-vehicle-knowledge-base"
-OBJECT_KEY = f"conversations/{datetime.now().strftime('%Y-%m-%d')}.json"
+import metrics
+import search_index
+from app_logging import get_logger, log_sampled
+from storage_backend import CONVERSATIONS, get_backend
 
-# Create the S3 client
-s3 = boto3.client("s3")
+logger = get_logger("conversation_storage")
 
 
-def load_conversations():
+def load_conversations(day=None):
     """
-    Load previous conversations from S3 for the current day.
+    Load previous conversations for a given day from the storage backend.
 
-    Attempts to retrieve the JSON file at the configured bucket/key and parse
-    it as a list of conversation entries.
+    Reads the conversation entries of the requested day (S3 file
+    conversations/<date>.json or the SQLite conversations table, depending on
+    the configured backend). On S3, days already rolled into an archive
+    segment by storage_archive are read from there.
 
     Args:
-        None
+        day (str, optional): Day in YYYY-MM-DD format. Defaults to the
+                             current day.
 
     Returns:
-        list: A list of conversation entries. Returns an empty list if no file
-              exists for the current day.
+        list: A list of conversation entries. Returns an empty list if no
+              conversations exist for the day.
 
     Raises:
         botocore.exceptions.ClientError: Propagated if the S3 get_object call
@@ -33,29 +33,53 @@ def load_conversations():
         >>> load_conversations()
         []
     """
-    try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=OBJECT_KEY)
-        content = response["Body"].read().decode("utf-8")
-        data = json.loads(content)
-        return data
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
-            # No file yet
-            return []
-        else:
-            raise e
+    return get_backend().load(CONVERSATIONS, day)
+
+
+def load_session_conversations(session_id, days=None):
+    """
+    Load the conversation entries of a chat session.
+
+    Without `days`, the whole collection is searched, which on S3 lists and
+    reads every stored day. Callers that know the days a session spans should
+    pass them, so only those days are read.
+
+    Args:
+        session_id (str): The sessionId of the conversation thread.
+        days (iterable, optional): Days (YYYY-MM-DD) to search.
+
+    Returns:
+        list: Conversation entries of the session ordered by timestamp.
+
+    Example:
+        >>> load_session_conversations("4f1c...", days=["2025-12-18"])
+        [{'sessionId': '4f1c...', 'question': 'Hi', 'answer': 'Hallo', ...}]
+    """
+    backend = get_backend()
+    if days is None:
+        return backend.query(CONVERSATIONS, session_id=session_id)
+    entries = [
+        entry
+        for day in sorted(days)
+        for entry in backend.load(CONVERSATIONS, day)
+        if entry.get("sessionId") == session_id
+    ]
+    entries.sort(key=lambda entry: str(entry.get("timestamp", "")))
+    return entries
 
 
 def save_conversation(entry):
     """
-    Save a single user-assistant exchange to the S3 bucket.
+    Save a single user-assistant exchange to the storage backend.
 
-    Loads the current day's conversations, appends the provided entry, and
-    writes the updated list back to S3 as a JSON file.
+    Appends the provided entry to the day given by its timestamp. The S3
+    backend rewrites the daily JSON file, the SQLite backend inserts one row.
 
     Args:
         entry (dict): Conversation entry to append. Expected keys typically
                       include 'username', 'timestamp', 'question', and 'answer'.
+                      Turns cancelled by the user have an empty 'answer' and
+                      'status': 'cancelled'.
 
     Returns:
         None
@@ -72,14 +96,55 @@ def save_conversation(entry):
         ...     "answer": "Hello"
         ... })
     """
-    data = load_conversations()
-    data.append(entry)
-
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=OBJECT_KEY,
-        Body=json.dumps(data, indent=4, ensure_ascii=False),
-        ContentType="application/json"
+    backend = get_backend()
+    start = time.perf_counter()
+    with metrics.timed("storage.save_conversation"):
+        backend.append(CONVERSATIONS, entry)
+
+    log_sampled(
+        logger, "storage.conversation_saved", "Conversation saved",
+        backend=backend.name,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1)
     )
 
-    print(f"[INFO] Conversation saved to S3 at {datetime.now()}")
\ No newline at end of file
+    # Keep the full-text search index in sync; a failure here must not lose the entry.
+    try:
+        search_index.index_conversation(entry)
+    except Exception:
+        logger.warning("Search index update failed", exc_info=True, extra={"event": "search_index.update_failed"})
+
+
+def save_conversations(entries):
+    """
+    Save several exchanges to the storage backend in one batch.
+
+    Used by the bulk question mode. The S3 backend rewrites each affected
+    daily file once, the SQLite backend inserts all rows in one transaction.
+
+    Args:
+        entries (list): Conversation entries as accepted by save_conversation.
+
+    Returns:
+        None
+
+    Raises:
+        botocore.exceptions.ClientError: If the S3 put_object call fails.
+    """
+    if not entries:
+        return
+    backend = get_backend()
+    start = time.perf_counter()
+    with metrics.timed("storage.save_conversations"):
+        backend.append_many(CONVERSATIONS, entries)
+
+    logger.info("Conversations saved", extra={
+        "event": "storage.conversations_saved",
+        "backend": backend.name,
+        "count": len(entries),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    })
+
+    try:
+        search_index.index_conversations(entries)
+    except Exception:
+        logger.warning("Search index update failed", exc_info=True, extra={"event": "search_index.update_failed"})
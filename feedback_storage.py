@@ -1,30 +1,49 @@
-import json
-import boto3
-from datetime import datetime
-from botocore.exceptions import ClientError
+import time
 
-# --- s3 bucket configuration ---
-BUCKET_NAME = "man-vehicle-knowledge-base"
-OBJECT_KEY = "feedback/feedback.json"
+import metrics
+import search_index
+from app_logging import get_logger, log_sampled
+from storage_backend import FEEDBACK, get_backend
 
-# Create the S3 client
-s3 = boto3.client("s3")
+logger = get_logger("feedback_storage")
+
+
+def normalize_feedback(data):
+    """
+    Convert older feedback shapes to the current key names in place.
+
+    Args:
+        data (list): Feedback entries.
+
+    Returns:
+        list: The same list, with 'relevance_*' keys renamed to 'tone_style_*'.
+
+    Example:
+        >>> normalize_feedback([{"relevance_score": 3}])
+        [{'tone_style_score': 3}]
+    """
+    for entry in data:
+        if "relevance_score" in entry and "tone_style_score" not in entry:
+            entry["tone_style_score"] = entry.pop("relevance_score")
+        if "relevance_notes" in entry and "tone_style_notes" not in entry:
+            entry["tone_style_notes"] = entry.pop("relevance_notes")
+    return data
 
 
 def load_feedback():
     """
-    Load feedback data from the S3 feedback file.
+    Load feedback data from the storage backend.
 
-    Attempts to retrieve the JSON feedback file from S3, parse it into a list
-    of entries, and perform backward-compatibility key normalization for
-    older feedback shapes.
+    Retrieves all feedback entries from the configured backend, including
+    entries moved to the S3 archive tier by storage_archive, and performs
+    backward-compatibility key normalization for older feedback shapes.
 
     Args:
         None
 
     Returns:
-        list: A list of feedback entries. Returns an empty list if the S3 key
-              does not exist yet.
+        list: A list of feedback entries. Returns an empty list if no
+              feedback has been stored yet.
 
     Raises:
         botocore.exceptions.ClientError: If the S3 get_object call fails for
@@ -34,34 +53,16 @@ def load_feedback():
         >>> load_feedback()
         []
     """
-    try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=OBJECT_KEY)
-        content = response["Body"].read().decode("utf-8")
-        data = json.loads(content)
-
-        # ✅ Backward compatibility: convert old keys if necessary
-        for entry in data:
-            if "relevance_score" in entry and "tone_style_score" not in entry:
-                entry["tone_style_score"] = entry.pop("relevance_score")
-            if "relevance_notes" in entry and "tone_style_notes" not in entry:
-                entry["tone_style_notes"] = entry.pop("relevance_notes")
-
-        return data
-
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
-            # No feedback file yet, return empty list
-            return []
-        else:
-            raise e
+    # ✅ Backward compatibility: convert old keys if necessary
+    return normalize_feedback(get_backend().load(FEEDBACK))
 
 
 def save_feedback(entry):
     """
-    Append a new feedback entry to the S3 feedback file.
+    Append a new feedback entry to the storage backend.
 
-    Loads the existing feedback list, appends the provided entry, and writes
-    the updated JSON back to the configured S3 key.
+    The S3 backend rewrites the feedback JSON file with the entry appended,
+    the SQLite backend inserts a single row.
 
     Args:
         entry (dict): Feedback entry to append. Expected keys may include
@@ -82,18 +83,19 @@ def save_feedback(entry):
         ...     "tone_style_notes": "Helpful response"
         ... })
     """
-    # Load existing feedback
-    data = load_feedback()
-
-    # Add new entry
-    data.append(entry)
-
-    # Upload updated data back to S3
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=OBJECT_KEY,
-        Body=json.dumps(data, indent=4, ensure_ascii=False),
-        ContentType="application/json"
+    backend = get_backend()
+    start = time.perf_counter()
+    with metrics.timed("storage.save_feedback"):
+        backend.append(FEEDBACK, entry)
+
+    log_sampled(
+        logger, "storage.feedback_saved", "Feedback saved",
+        backend=backend.name,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1)
     )
 
-    print(f"[INFO] Feedback saved to S3 at {datetime.now()}")
\ No newline at end of file
+    # Keep the full-text search index in sync; a failure here must not lose the entry.
+    try:
+        search_index.index_feedback(entry)
+    except Exception:
+        logger.warning("Search index update failed", exc_info=True, extra={"event": "search_index.update_failed"})
@@ -0,0 +1,300 @@
+"""
+Metrics Module
+
+Lightweight in-process metrics for the admin dashboard. Recording is a lock
+plus a few integer updates, so it can sit on the user-facing script path;
+aggregation only happens when the admin page reads the data.
+
+1. Histogram: HDR-style log-linear latency buckets (8 sub-buckets per power
+   of two, i.e. about 12% relative precision) from 1 ms to ~4.6 hours.
+2. Per-minute ring buffers (last WINDOW_MINUTES minutes) of latency
+   histograms and event counters, for requests per minute and error rates.
+3. Active sessions: last-seen timestamps per session id.
+
+Metrics are per worker process.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+WINDOW_MINUTES = 60
+ACTIVE_SESSION_SECONDS = 300
+
+SUB_BUCKETS = 8
+MAX_EXPONENT = 24  # 2**24 ms ~ 4.6 hours
+BUCKET_COUNT = (MAX_EXPONENT + 1) * SUB_BUCKETS
+
+
+def bucket_index(value_ms):
+    """
+    Return the histogram bucket for a latency in milliseconds.
+
+    Values below 1 ms share bucket 0; each power of two above is split into
+    SUB_BUCKETS linear sub-buckets.
+
+    Args:
+        value_ms (float): Latency in milliseconds.
+
+    Returns:
+        int: Bucket index.
+
+    Example:
+        >>> bucket_index(0.5), bucket_index(1.0), bucket_index(3.0)
+        (0, 0, 12)
+    """
+    if value_ms < 1:
+        return 0
+    exponent = min(int(math.log2(value_ms)), MAX_EXPONENT)
+    base = 1 << exponent
+    sub = min(int((value_ms - base) * SUB_BUCKETS / base), SUB_BUCKETS - 1)
+    return exponent * SUB_BUCKETS + sub
+
+
+def bucket_upper_bound(index):
+    """Return the upper bound in milliseconds of a histogram bucket."""
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    base = 1 << exponent
+    return base + base * (sub + 1) / SUB_BUCKETS
+
+
+class Histogram:
+    """
+    Fixed-size log-linear latency histogram.
+
+    Example:
+        >>> histogram = Histogram()
+        >>> for ms in (10, 20, 30, 1000):
+        ...     histogram.record(ms)
+        >>> histogram.count
+        4
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms):
+        """Add a latency sample in milliseconds."""
+        self.counts[bucket_index(value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other):
+        """Add the samples of another histogram to this one."""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """
+        Return the latency at percentile q (0-100), as a bucket upper bound.
+
+        Args:
+            q (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Latency in milliseconds, or 0.0 for an empty histogram.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        """Mean latency in milliseconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def buckets(self):
+        """Return (upper bound in ms, count) pairs for non-empty buckets."""
+        return [(bucket_upper_bound(index), count) for index, count in enumerate(self.counts) if count]
+
+
+class _MinuteRing:
+    """Ring buffer of per-minute slots created on demand by a factory."""
+
+    __slots__ = ("factory", "minutes", "slots")
+
+    def __init__(self, factory, minutes=WINDOW_MINUTES):
+        self.factory = factory
+        self.minutes = minutes
+        self.slots = [None] * minutes
+
+    def current(self, now):
+        minute = int(now // 60)
+        index = minute % self.minutes
+        slot = self.slots[index]
+        if slot is None or slot[0] != minute:
+            slot = (minute, self.factory())
+            self.slots[index] = slot
+        return slot[1]
+
+    def window(self, now, minutes):
+        """Return the slot values of the last `minutes` minutes, oldest first."""
+        last = int(now // 60)
+        values = []
+        for minute in range(last - minutes + 1, last + 1):
+            slot = self.slots[minute % self.minutes]
+            values.append(slot[1] if slot is not None and slot[0] == minute else None)
+        return values
+
+
+class _Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of latency histograms, event counters and sessions.
+
+    Example:
+        >>> registry = MetricsRegistry()
+        >>> with registry.timed("query_api"):
+        ...     pass
+        >>> registry.summary("query_api", minutes=5)["count"]
+        1
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counters = {}
+        self._sessions = {}
+        self._sessions_pruned = 0.0
+        self.started = time.time()
+
+    def record_latency(self, name, seconds, now=None):
+        """Record a latency sample for the named operation."""
+        now = now or time.time()
+        with self._lock:
+            ring = self._latencies.get(name)
+            if ring is None:
+                ring = self._latencies[name] = _MinuteRing(Histogram)
+            ring.current(now).record(seconds * 1000)
+
+    def increment(self, name, amount=1, now=None):
+        """Add to the named event counter."""
+        now = now or time.time()
+        with self._lock:
+            ring = self._counters.get(name)
+            if ring is None:
+                ring = self._counters[name] = _MinuteRing(_Counter)
+            ring.current(now).value += amount
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Time a block, counting calls, errors and timeouts.
+
+        Records the latency under `name` and increments `name.calls`; an
+        exception also increments `name.errors`, and `name.timeouts` if the
+        exception class name contains "Timeout". Exceptions are re-raised.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.increment(f"{name}.errors")
+            if "Timeout" in type(e).__name__:
+                self.increment(f"{name}.timeouts")
+            raise
+        finally:
+            self.record_latency(name, time.perf_counter() - start)
+            self.increment(f"{name}.calls")
+
+    def touch_session(self, session_id, now=None):
+        """Mark a session as active; expired sessions are dropped at most once a minute."""
+        now = now or time.time()
+        with self._lock:
+            self._sessions[session_id] = now
+            if now - self._sessions_pruned >= 60:
+                self._prune_sessions(ACTIVE_SESSION_SECONDS, now)
+
+    def _prune_sessions(self, seconds, now):
+        # Caller holds the lock.
+        expired = [sid for sid, seen in self._sessions.items() if now - seen > seconds]
+        for sid in expired:
+            del self._sessions[sid]
+        self._sessions_pruned = now
+
+    def active_sessions(self, seconds=ACTIVE_SESSION_SECONDS, now=None):
+        """Return the number of sessions seen within the last `seconds`."""
+        now = now or time.time()
+        with self._lock:
+            return sum(now - seen <= seconds for seen in self._sessions.values())
+
+    def histogram(self, name, minutes=WINDOW_MINUTES, now=None):
+        """Return a Histogram merged over the last `minutes` minutes."""
+        merged = Histogram()
+        with self._lock:
+            ring = self._latencies.get(name)
+            slots = ring.window(now or time.time(), minutes) if ring else []
+            for histogram in slots:
+                if histogram is not None:
+                    merged.merge(histogram)
+        return merged
+
+    def counts(self, name, minutes=WINDOW_MINUTES, now=None):
+        """Return the per-minute counts of an event over the last `minutes`, oldest first."""
+        with self._lock:
+            ring = self._counters.get(name)
+            slots = ring.window(now or time.time(), minutes) if ring else [None] * minutes
+            return [counter.value if counter is not None else 0 for counter in slots]
+
+    def summary(self, name, minutes=15, now=None):
+        """
+        Aggregate a timed operation over the last `minutes` minutes.
+
+        Returns:
+            dict: 'count', 'per_minute', 'error_rate', 'timeout_rate',
+                  'p50', 'p95', 'p99', 'max' and 'mean' (latencies in ms).
+        """
+        now = now or time.time()
+        histogram = self.histogram(name, minutes, now)
+        calls = sum(self.counts(f"{name}.calls", minutes, now))
+        errors = sum(self.counts(f"{name}.errors", minutes, now))
+        timeouts = sum(self.counts(f"{name}.timeouts", minutes, now))
+        return {
+            "count": calls,
+            "per_minute": calls / minutes,
+            "error_rate": errors / calls if calls else 0.0,
+            "timeout_rate": timeouts / calls if calls else 0.0,
+            "p50": histogram.percentile(50),
+            "p95": histogram.percentile(95),
+            "p99": histogram.percentile(99),
+            "max": histogram.max,
+            "mean": histogram.mean,
+        }
+
+    def names(self):
+        """Return the names of all timed operations."""
+        with self._lock:
+            return sorted(self._latencies)
+
+
+registry = MetricsRegistry()
+
+# Module-level shortcuts for the process-wide registry.
+record_latency = registry.record_latency
+increment = registry.increment
+timed = registry.timed
+touch_session = registry.touch_session
@@ -0,0 +1,455 @@
+"""
+Profiling Module
+
+On-demand profiling of Streamlit script reruns.
+
+An admin enables profiling for a user or session for a limited time, or for
+a sampled fraction of all reruns (see the "Profiling" tab of the admin
+area). app.py calls maybe_start() once per rerun; for a selected rerun a
+sampling thread records the stack of the script thread every
+PROFILE_INTERVAL seconds, weighted by the elapsed wall-clock time and by the
+CPU time the thread consumed since the previous sample. Sampling stops when
+the script frame is gone, so st.stop() and st.rerun() need no special
+handling.
+
+Work the rerun hands to other threads (e.g. api_client.submit_query) is
+sampled too if the callable is wrapped with propagate(): its stacks are
+prefixed with the stack that submitted it, so the worker's time appears
+below the caller in the flame graph.
+
+Each profile is written to PROFILE_DIR as:
+
+    <id>.wall.folded / <id>.cpu.folded: folded stacks ("a;b;c <microseconds>"),
+        readable by flamegraph.pl, speedscope or inferno.
+    <id>.json: metadata (time, user, hashed session, durations, samples).
+
+Targets and the sample rate are kept in the shared cache tier (see
+shared_cache), so they apply to every worker that uses the same cache; the
+profiles themselves are written by the worker that ran the rerun, to its
+local PROFILE_DIR. When nothing is enabled, maybe_start() only checks the
+locally held settings and re-reads them every PROFILE_REFRESH_SECONDS.
+
+Environment:
+    PROFILE_DIR: Output directory (default "profiles").
+    PROFILE_SAMPLE_RATE: Initial fraction of reruns to profile (default 0).
+    PROFILE_INTERVAL: Sampling interval in seconds (default 0.005).
+    PROFILE_MAX_FILES: Number of profiles kept (default 200).
+"""
+
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from app_logging import get_logger, hash_id
+from shared_cache import get_cache
+
+logger = get_logger("profiling")
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+# Profiles of reruns that do not end are cut off after this many seconds.
+PROFILE_MAX_SECONDS = 300
+
+# Targets and sample rate are shared by all workers through the shared cache
+# tier; each worker re-reads them at most every PROFILE_REFRESH_SECONDS.
+PROFILE_REFRESH_SECONDS = 5
+_STATE_KEY = "profiling:settings"
+_STATE_TTL = 30 * 24 * 3600
+
+_state = {"targets": {}, "rate": float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))}
+_state_loaded = 0.0
+_state_lock = threading.Lock()
+
+# Profile of the rerun running in the current context, for propagate().
+_active = contextvars.ContextVar("profile", default=None)
+
+
+def _load_state(force=False):
+    """
+    Return the shared profiling settings, re-reading them when they are stale.
+
+    Args:
+        force (bool): Re-read regardless of the refresh interval.
+
+    Returns:
+        dict: 'targets' (target to expiry timestamp) and 'rate'.
+    """
+    global _state, _state_loaded
+    now = time.time()
+    if not force and now - _state_loaded < PROFILE_REFRESH_SECONDS:
+        return _state
+    _state_loaded = now
+    try:
+        state = get_cache().get(_STATE_KEY, fresh=True)
+    except Exception:
+        logger.warning("Could not read profiling settings", exc_info=True, extra={"event": "profiling.state_failed"})
+        state = None
+    if state is not None:
+        _state = state
+    return _state
+
+
+def _update_state(change):
+    """
+    Apply change to the current settings and write them to the shared cache.
+
+    Args:
+        change (callable): Called with the settings dict, modifies it in place.
+
+    Returns:
+        None
+    """
+    global _state, _state_loaded
+    with _state_lock:
+        current = _load_state(force=True)
+        state = {"targets": dict(current["targets"]), "rate": current["rate"]}
+        change(state)
+        now = time.time()
+        state["targets"] = {target: expiry for target, expiry in state["targets"].items() if expiry >= now}
+        _state, _state_loaded = state, now
+        try:
+            get_cache().set(_STATE_KEY, state, _STATE_TTL)
+        except Exception:
+            logger.warning("Could not share profiling settings", exc_info=True,
+                           extra={"event": "profiling.state_failed"})
+
+
+def enable(target, minutes=15):
+    """
+    Profile all reruns of a user or session for a limited time.
+
+    Args:
+        target (str): Hashed user id (8 characters) or session id.
+        minutes (int): Duration in minutes.
+
+    Returns:
+        None
+    """
+    _update_state(lambda state: state["targets"].__setitem__(target, time.time() + minutes * 60))
+
+
+def disable(target):
+    """Stop profiling a user or session."""
+    _update_state(lambda state: state["targets"].pop(target, None))
+
+
+def targets():
+    """
+    Return the active targets.
+
+    Returns:
+        dict: Target to expiry timestamp.
+    """
+    now = time.time()
+    return {target: expiry for target, expiry in _load_state()["targets"].items() if expiry >= now}
+
+
+def set_sample_rate(rate):
+    """Set the fraction (0-1) of all reruns that are profiled."""
+    _update_state(lambda state: state.__setitem__("rate", rate))
+
+
+def sample_rate():
+    """Return the fraction of all reruns that are profiled."""
+    return _load_state()["rate"]
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _cpu_clock(thread_id):
+    """Return the CPU-time clock of a thread, or None where unsupported."""
+    if not hasattr(time, "pthread_getcpuclockid"):
+        return None
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except OSError:
+        return None
+
+
+def _read_clock(clock):
+    try:
+        return time.clock_gettime(clock)
+    except OSError:
+        # The thread has ended.
+        return None
+
+
+class _SampledThread:
+    """A thread sampled by a Profile: its root frame, stack prefix and CPU clock."""
+
+    __slots__ = ("root", "prefix", "clock", "last_cpu")
+
+    def __init__(self, thread_id, root, prefix=""):
+        self.root = root
+        self.prefix = prefix
+        self.clock = _cpu_clock(thread_id)
+        self.last_cpu = _read_clock(self.clock) if self.clock is not None else None
+
+
+class Profile:
+    """
+    Sampling profile of one script rerun.
+
+    Args:
+        thread_id (int): Ident of the script thread.
+        root (frame): The script's module frame; sampling stops when it is
+            no longer on the thread's stack.
+        meta (dict): Metadata written with the profile.
+        interval (float): Sampling interval in seconds.
+    """
+
+    def __init__(self, thread_id, root, meta, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.meta = meta
+        self.interval = interval
+        self.wall = defaultdict(int)
+        self.cpu = defaultdict(int)
+        self.samples = 0
+        self._threads = {thread_id: _SampledThread(thread_id, root)}
+        self._threads_lock = threading.Lock()
+        self._sampled_threads = 1
+
+    def start(self):
+        """Start the sampling thread."""
+        threading.Thread(target=self._run, name="profiler", daemon=True).start()
+
+    def _stack(self, thread_id, frame=None):
+        """Return the folded stack of a sampled thread, or None if its root frame is gone."""
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            return None
+        frame = frame or sys._current_frames().get(thread_id)
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame.f_code))
+            if frame is thread.root:
+                return thread.prefix + ";".join(reversed(names))
+            frame = frame.f_back
+        return None
+
+    def add_thread(self, root, prefix):
+        """
+        Sample the calling thread too, until remove_thread().
+
+        Args:
+            root (frame): Outermost frame of the work to sample.
+            prefix (str): Folded stack prepended to the thread's stacks.
+        """
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._threads[thread_id] = _SampledThread(thread_id, root, prefix)
+            self._sampled_threads += 1
+
+    def remove_thread(self):
+        """Stop sampling the calling thread."""
+        with self._threads_lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _run(self):
+        main = self._threads[self.thread_id]
+        started = last = time.perf_counter()
+        cpu_started = main.last_cpu
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._threads_lock:
+                threads = list(self._threads.items())
+            stacks = {thread_id: self._stack(thread_id) for thread_id, _ in threads}
+            if stacks[self.thread_id] is None or now - started > PROFILE_MAX_SECONDS:
+                break
+            for thread_id, thread in threads:
+                stack = stacks[thread_id]
+                if stack is None:
+                    continue
+                self.wall[stack] += int((now - last) * 1e6)
+                if thread.last_cpu is not None:
+                    cpu_now = _read_clock(thread.clock)
+                    if cpu_now is not None:
+                        self.cpu[stack] += int((cpu_now - thread.last_cpu) * 1e6)
+                        thread.last_cpu = cpu_now
+            last = now
+            self.samples += 1
+        with self._threads_lock:
+            self._threads.clear()
+
+        self.meta["wall_ms"] = round((last - started) * 1000, 1)
+        if cpu_started is not None:
+            self.meta["cpu_ms"] = round((main.last_cpu - cpu_started) * 1000, 1)
+        self.meta["samples"] = self.samples
+        self.meta["threads"] = self._sampled_threads
+        try:
+            self.write()
+        except OSError:
+            logger.warning("Writing profile failed", exc_info=True, extra={"event": "profiling.write_failed"})
+
+    def write(self, directory=None):
+        """Write the folded stacks and metadata to the profile directory."""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.meta["id"])
+        for kind, stacks in (("wall", self.wall), ("cpu", self.cpu)):
+            if stacks:
+                with open(f"{base}.{kind}.folded", "w", encoding="utf-8") as f:
+                    for stack, weight in sorted(stacks.items()):
+                        f.write(f"{stack} {weight}\n")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        logger.info("Profile written", extra={
+            "event": "profiling.written", "profile": self.meta["id"], "wall_ms": self.meta["wall_ms"],
+        })
+        _prune(directory)
+
+
+def maybe_start(session_id=None, user_id=None):
+    """
+    Start profiling the current rerun if it is selected.
+
+    Must be called from the module level of the Streamlit script.
+
+    Args:
+        session_id (str, optional): Chat session id of the rerun.
+        user_id (str, optional): Hashed user id of the rerun.
+
+    Returns:
+        Profile: The running profile, or None.
+
+    Example:
+        >>> profiling.maybe_start(st.session_state.get("session_id"), st.session_state.get("user_id"))
+    """
+    # The script thread is reused across reruns; forget the previous profile.
+    _active.set(None)
+    state = _load_state()
+    if not state["targets"] and state["rate"] <= 0:
+        return None
+    active = targets()
+    if session_id in active or user_id in active:
+        reason = "target"
+    elif state["rate"] > 0 and random.random() < state["rate"]:
+        reason = "sampled"
+    else:
+        return None
+
+    now = datetime.now()
+    meta = {
+        "id": f"{now.strftime('%Y%m%d-%H%M%S-%f')}-{hash_id(session_id) or 'anonymous'}",
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "user": user_id,
+        "session": hash_id(session_id),
+        "reason": reason,
+        "interval_ms": PROFILE_INTERVAL * 1000,
+    }
+    profile = Profile(threading.get_ident(), sys._getframe(1), meta)
+    profile.start()
+    _active.set(profile)
+    return profile
+
+
+def propagate(func):
+    """
+    Wrap a callable handed to another thread so that thread is profiled too.
+
+    If the calling thread is being profiled, the returned function samples
+    the thread that runs it while it runs, with stacks prefixed by the
+    caller's current stack. Otherwise func is returned unchanged.
+
+    Args:
+        func (callable): Work submitted to a thread pool.
+
+    Returns:
+        callable: The wrapped function.
+
+    Example:
+        >>> executor.submit(profiling.propagate(query_api), prompt, history)
+    """
+    profile = _active.get()
+    if profile is None:
+        return func
+    prefix = profile._stack(threading.get_ident(), sys._getframe(1))
+    if prefix is None:
+        return func
+
+    def run(*args, **kwargs):
+        # Pool threads are named "<pool>_<n>"; group them by pool.
+        pool = threading.current_thread().name.rsplit("_", 1)[0]
+        token = _active.set(profile)
+        profile.add_thread(sys._getframe(0), f"{prefix};[{pool}];")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.remove_thread()
+            _active.reset(token)
+
+    return run
+
+
+def list_profiles(directory=None, limit=100):
+    """
+    Return the metadata of the most recent profiles.
+
+    Args:
+        directory (str, optional): Profile directory. Defaults to PROFILE_DIR.
+        limit (int): Maximum number of profiles.
+
+    Returns:
+        list: Metadata dicts, newest first.
+    """
+    directory = directory or PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, kind, directory=None):
+    """Return the path of a profile's "wall" or "cpu" folded stacks."""
+    return os.path.join(directory or PROFILE_DIR, f"{profile_id}.{kind}.folded")
+
+
+def top_functions(path, limit=15):
+    """
+    Aggregate folded stacks to self and total time per function.
+
+    Args:
+        path (str): A .folded file.
+        limit (int): Number of functions returned.
+
+    Returns:
+        list: (function, self microseconds, total microseconds), by total time.
+    """
+    own, total = defaultdict(int), defaultdict(int)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, weight = line.rstrip("\n").rpartition(" ")
+            frames = stack.split(";")
+            own[frames[-1]] += int(weight)
+            for name in set(frames):
+                total[name] += int(weight)
+    ranked = sorted(total, key=total.get, reverse=True)[:limit]
+    return [(name, own[name], total[name]) for name in ranked]
+
+
+def _prune(directory):
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES."""
+    names = sorted(name[:-len(".json")] for name in os.listdir(directory) if name.endswith(".json"))
+    for profile_id in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+        for suffix in (".json", ".wall.folded", ".cpu.folded"):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
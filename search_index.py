@@ -0,0 +1,431 @@
+"""
+Search Index Module
+
+Maintains a full-text index over logged questions and answers so support and
+content teams can find what the bot said about a topic without downloading
+every daily conversation file.
+
+The index is a SQLite database with an FTS5 inverted index. It is fed
+incrementally from save_conversation/save_feedback and can be backfilled from
+the storage backend. Text is folded for German before tokenization
+(ä -> ae, ö -> oe, ü -> ue, ß -> ss) so "Müller" and "Mueller" match, and the
+unicode61 tokenizer splits compounds such as "Offroad-ABS" into terms.
+
+Usage:
+    python search_index.py backfill [--backend sqlite]
+    python search_index.py query "Offroad-ABS" --since 2025-11-01 --min-score 3
+    python search_index.py optimize
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from storage_backend import CONVERSATIONS, FEEDBACK, create_backend
+
+DEFAULT_INDEX_PATH = "search_index.db"
+BATCH_SIZE = 1000
+
+SCORE_KEYS = ("correctness_score", "coverage_score", "tone_style_score")
+
+_GERMAN_FOLDING = str.maketrans({
+    "ä": "ae", "ö": "oe", "ü": "ue",
+    "Ä": "Ae", "Ö": "Oe", "Ü": "Ue",
+    "ß": "ss", "ẞ": "SS",
+})
+
+
+def fold_german(text):
+    """
+    Fold German umlauts and sharp s to their ASCII transliteration.
+
+    Args:
+        text (str): Text to fold.
+
+    Returns:
+        str: Folded text.
+
+    Example:
+        >>> fold_german("Fahrerhaus-Größe")
+        'Fahrerhaus-Groesse'
+    """
+    return (text or "").translate(_GERMAN_FOLDING)
+
+
+def build_match_query(text):
+    """
+    Build an FTS5 MATCH expression from free-text user input.
+
+    Every whitespace-separated term becomes a quoted phrase, so hyphenated
+    terms like "Offroad-ABS" match as adjacent tokens and FTS5 operators in
+    user input are treated as text. A trailing "*" keeps prefix matching.
+    All terms must match.
+
+    Args:
+        text (str): Search input.
+
+    Returns:
+        str: MATCH expression, or an empty string if the input has no terms.
+
+    Example:
+        >>> build_match_query('Offroad-ABS Brems*')
+        '"Offroad-ABS" AND "Brems"*'
+    """
+    terms = []
+    for term in fold_german(text).split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', "")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+
+def feedback_score(entry):
+    """
+    Return the mean of the numeric feedback scores of an entry.
+
+    Args:
+        entry (dict): Feedback entry.
+
+    Returns:
+        float: Mean score, or None if the entry has no scores.
+
+    Example:
+        >>> feedback_score({"correctness_score": 4, "coverage_score": 2})
+        3.0
+    """
+    scores = [entry[key] for key in SCORE_KEYS if isinstance(entry.get(key), (int, float))]
+    return sum(scores) / len(scores) if scores else None
+
+
+def _row_for(kind, entry):
+    """Map a conversation or feedback entry to an index row."""
+    if kind == FEEDBACK:
+        question = entry.get("user_prompt", "")
+        answer = entry.get("assistant_answer", "")
+        score = feedback_score(entry)
+    else:
+        question = entry.get("question", "")
+        answer = entry.get("answer", "")
+        score = None
+    fingerprint = hashlib.sha1(
+        "\x1f".join(
+            str(part) for part in (kind, entry.get("sessionId"), entry.get("timestamp"), question, answer)
+        ).encode("utf-8")
+    ).hexdigest()
+    return (
+        fingerprint, kind, entry.get("userId"), entry.get("username"), entry.get("sessionId"),
+        entry.get("timestamp"), question, answer, score,
+    )
+
+
+class SearchIndex:
+    """
+    Full-text index over conversation turns and feedback entries.
+
+    Args:
+        path (str): Path of the index database, or ":memory:".
+
+    Example:
+        >>> index = SearchIndex(":memory:")
+        >>> index.add_conversation({"question": "Was ist OptiView?", "answer": "Ein Kamerasystem."})
+        >>> index.search("optiview")[0]["question"]
+        'Was ist OptiView?'
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL,
+                    userId TEXT,
+                    username TEXT,
+                    sessionId TEXT,
+                    timestamp TEXT,
+                    question TEXT,
+                    answer TEXT,
+                    score REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_turns_timestamp ON turns (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_turns_user ON turns (userId, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (sessionId, question);
+                CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+                    question, answer, tokenize = 'unicode61 remove_diacritics 2'
+                );
+            """)
+
+    def add_many(self, kind, entries):
+        """
+        Index a batch of entries. Entries that are already indexed are skipped.
+
+        Args:
+            kind (str): "conversations" or "feedback".
+            entries (list): Entries as stored by the storage backend.
+
+        Returns:
+            int: Number of newly indexed entries.
+        """
+        rows = [_row_for(kind, entry) for entry in entries]
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO turns "
+                        "(fingerprint, kind, userId, username, sessionId, timestamp, question, answer, score) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    added += 1
+                    self._conn.execute(
+                        "INSERT INTO turns_fts (rowid, question, answer) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, fold_german(row[6]), fold_german(row[7]))
+                    )
+                    if kind == FEEDBACK and row[8] is not None:
+                        # Propagate the score to the conversation turn it rates.
+                        self._conn.execute(
+                            "UPDATE turns SET score = ? WHERE kind = ? AND sessionId = ? AND question = ?",
+                            (row[8], CONVERSATIONS, row[4], row[6])
+                        )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return added
+
+    def add_conversation(self, entry):
+        """Index a single conversation entry."""
+        self.add_many(CONVERSATIONS, [entry])
+
+    def add_feedback(self, entry):
+        """Index a single feedback entry."""
+        self.add_many(FEEDBACK, [entry])
+
+    def backfill(self, backend, batch_size=BATCH_SIZE):
+        """
+        Index the full history of a storage backend.
+
+        Already indexed entries are skipped, so the backfill can be re-run.
+
+        Args:
+            backend (StorageBackend): Source of conversations and feedback.
+            batch_size (int): Number of entries indexed per transaction.
+
+        Returns:
+            int: Number of newly indexed entries.
+        """
+        from feedback_storage import normalize_feedback
+
+        added = 0
+        # Conversations first so feedback scores can be propagated to them.
+        for kind in (CONVERSATIONS, FEEDBACK):
+            batch = []
+            for entry in backend.iter_entries(kind):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    added += self.add_many(kind, normalize_feedback(batch) if kind == FEEDBACK else batch)
+                    batch = []
+            if batch:
+                added += self.add_many(kind, normalize_feedback(batch) if kind == FEEDBACK else batch)
+        return added
+
+    def search(self, text, since=None, until=None, user=None, min_score=None, kind=None, limit=50):
+        """
+        Search indexed questions and answers.
+
+        Args:
+            text (str): Free-text search input, e.g. "Offroad-ABS".
+            since (str, optional): Inclusive lower bound on the timestamp
+                                   (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS).
+            until (str, optional): Exclusive upper bound on the timestamp.
+            user (str, optional): userId or username to restrict to.
+            min_score (float, optional): Minimum mean feedback score.
+            kind (str, optional): "conversations" or "feedback".
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: Result dicts ordered by relevance, each with 'kind',
+                  'userId', 'username', 'sessionId', 'timestamp', 'question',
+                  'answer', 'score' and a highlighted 'snippet'.
+
+        Example:
+            >>> get_index().search("OptiView", since="2025-11-01")
+            [{'kind': 'conversations', 'question': 'Wie funktioniert die OptiView-Umschaltung?', ...}]
+        """
+        match = build_match_query(text)
+        if not match:
+            return []
+        clauses, params = ["turns_fts MATCH ?"], [match]
+        if since:
+            clauses.append("t.timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("t.timestamp < ?")
+            params.append(until)
+        if user:
+            clauses.append("(t.userId = ? OR t.username = ?)")
+            params.extend([user, user])
+        if min_score is not None:
+            clauses.append("t.score >= ?")
+            params.append(min_score)
+        if kind:
+            clauses.append("t.kind = ?")
+            params.append(kind)
+        params.append(int(limit))
+        sql = (
+            "SELECT t.kind, t.userId, t.username, t.sessionId, t.timestamp, t.question, t.answer, t.score, "
+            "snippet(turns_fts, 1, '**', '**', ' … ', 24) AS snippet "
+            "FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY bm25(turns_fts) LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self):
+        """Return the number of indexed entries."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    def optimize(self):
+        """Merge the FTS5 index segments to speed up queries."""
+        with self._lock:
+            self._conn.execute("INSERT INTO turns_fts (turns_fts) VALUES ('optimize')")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return the process-wide search index, or None if indexing is disabled.
+
+    The index path is read from SEARCH_INDEX_PATH (default "search_index.db").
+    Setting it to an empty string disables the index.
+
+    Returns:
+        SearchIndex: The shared index, or None.
+    """
+    global _index
+    path = os.getenv("SEARCH_INDEX_PATH", DEFAULT_INDEX_PATH)
+    if not path:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(path)
+    return _index
+
+
+def index_conversation(entry):
+    """
+    Add a saved conversation entry to the search index, if enabled.
+
+    Args:
+        entry (dict): Conversation entry passed to save_conversation.
+
+    Returns:
+        None
+    """
+    index = get_index()
+    if index is not None:
+        index.add_conversation(entry)
+
+
+def index_conversations(entries):
+    """
+    Add several saved conversation entries to the search index, if enabled.
+
+    Args:
+        entries (list): Conversation entries passed to save_conversations.
+
+    Returns:
+        None
+    """
+    index = get_index()
+    if index is not None:
+        index.add_many(CONVERSATIONS, entries)
+
+
+def index_feedback(entry):
+    """
+    Add a saved feedback entry to the search index, if enabled.
+
+    Args:
+        entry (dict): Feedback entry passed to save_feedback.
+
+    Returns:
+        None
+    """
+    index = get_index()
+    if index is not None:
+        index.add_feedback(entry)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Full-text search over logged questions and answers.")
+    parser.add_argument("--index", default=None, help="index path (default: SEARCH_INDEX_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = commands.add_parser("backfill", help="index the stored history")
+    backfill_parser.add_argument("--backend", default=None, help="s3 or sqlite (default: STORAGE_BACKEND)")
+
+    query_parser = commands.add_parser("query", help="search the index")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--since")
+    query_parser.add_argument("--until")
+    query_parser.add_argument("--user")
+    query_parser.add_argument("--min-score", type=float)
+    query_parser.add_argument("--kind", choices=[CONVERSATIONS, FEEDBACK])
+    query_parser.add_argument("--limit", type=int, default=20)
+
+    commands.add_parser("optimize", help="merge index segments")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index) if args.index else get_index()
+    if index is None:
+        parser.error("search index is disabled (SEARCH_INDEX_PATH is empty)")
+
+    if args.command == "backfill":
+        added = index.backfill(create_backend(args.backend))
+        print(f"[INFO] Indexed {added} new entries ({index.count()} total)")
+    elif args.command == "optimize":
+        index.optimize()
+        print("[INFO] Search index optimized")
+    else:
+        start = time.perf_counter()
+        results = index.search(
+            args.text, since=args.since, until=args.until, user=args.user,
+            min_score=args.min_score, kind=args.kind, limit=args.limit
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        for result in results:
+            score = "-" if result["score"] is None else f"{result['score']:.1f}"
+            print(f"{result['timestamp']}  {result['kind']:<13} {result['username'] or result['userId']}  score={score}")
+            print(f"  Q: {result['question']}")
+            print(f"  A: {result['snippet']}")
+        print(f"[INFO] {len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+Shared Cache Module
+
+Cross-process cache tier for multi-worker deployments. Several Streamlit
+processes behind a load balancer share one L2 cache, with a small in-process
+L1 in front of it:
+
+1. MemoryCache: in-process LRU with TTL (L1).
+2. SQLiteCacheBackend: a cache file shared by all workers on one host (L2).
+3. RedisCacheBackend: a Redis-protocol server shared across hosts (L2).
+
+Values are JSON-encoded and zlib-compressed above a size threshold; L2 data
+is never unpickled, so write access to the cache file or server does not
+allow running code in the workers. The backend is selected with the
+CACHE_BACKEND environment variable ("sqlite" by default, "redis" or
+"memory"). Call sites opt in with the @cached decorator; sensitive values
+(secrets) use @cached(..., shared=False) and stay in the process.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from app_logging import get_logger
+
+logger = get_logger("shared_cache")
+
+DEFAULT_CACHE_PATH = "shared_cache.db"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_L1_ENTRIES = 256
+DEFAULT_L1_TTL = 60
+COMPRESS_THRESHOLD = 1024
+
+_RAW = b"j"
+_COMPRESSED = b"J"
+
+
+def serialize(value):
+    """
+    JSON-encode a value, compressing it with zlib above COMPRESS_THRESHOLD bytes.
+
+    Args:
+        value: A JSON-serializable value (tuples come back as lists).
+
+    Returns:
+        bytes: Encoded value with a one-byte format header.
+
+    Raises:
+        TypeError: If the value is not JSON-serializable.
+
+    Example:
+        >>> deserialize(serialize({"a": 1}))
+        {'a': 1}
+    """
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(data) > COMPRESS_THRESHOLD:
+        return _COMPRESSED + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def deserialize(data):
+    """
+    Decode a value produced by serialize().
+
+    Args:
+        data (bytes): Encoded value.
+
+    Returns:
+        The original value.
+
+    Raises:
+        ValueError: If the data is not in a known format (e.g. entries
+            written by an older version) or is corrupt.
+    """
+    header = data[:1]
+    if header == _COMPRESSED:
+        try:
+            data = zlib.decompress(data[1:])
+        except zlib.error as e:
+            raise ValueError("Corrupt cache entry") from e
+    elif header == _RAW:
+        data = data[1:]
+    else:
+        raise ValueError(f"Unknown cache entry format: {header!r}")
+    return json.loads(data.decode("utf-8"))
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Args:
+        max_entries (int): Maximum number of entries before the least
+            recently used one is evicted.
+
+    Example:
+        >>> cache = MemoryCache(max_entries=2)
+        >>> cache.set("k", b"v", ttl=10)
+        >>> cache.get("k")
+        b'v'
+    """
+
+    def __init__(self, max_entries=DEFAULT_L1_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the stored bytes for key, or None if missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Store bytes under key for ttl seconds."""
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    Cache stored in a SQLite file shared by all worker processes on a host.
+
+    Expired entries are ignored on read and purged during eviction. When the
+    total stored size exceeds max_bytes, the least recently used entries are
+    evicted.
+
+    Args:
+        path (str): Path of the cache file.
+        max_bytes (int): Size budget for stored values.
+
+    Example:
+        >>> backend = SQLiteCacheBackend("/tmp/cache.db")
+        >>> backend.set("k", b"v", ttl=10)
+        >>> backend.get("k")
+        b'v'
+    """
+
+    name = "sqlite"
+
+    # Access times are refreshed at most this often per key to keep reads cheap.
+    TOUCH_INTERVAL = 30
+    # Size is checked every EVICT_EVERY writes rather than on every write.
+    EVICT_EVERY = 50
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(now)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def evict(self):
+        """Purge expired entries and enforce the size budget."""
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+
+class RedisCacheBackend:
+    """
+    Cache stored on a Redis-protocol server shared across hosts.
+
+    TTLs are enforced by the server (SET ... EX); size-based eviction is left
+    to the server's maxmemory policy (e.g. allkeys-lru). Any client object
+    with get(key), set(key, value, ex=seconds) and delete(key) can be passed,
+    so a local stand-in can replace the server in tests.
+
+    Args:
+        client: A redis.Redis-compatible client.
+        prefix (str): Prefix applied to every key.
+
+    Example:
+        >>> backend = RedisCacheBackend.from_url("redis://localhost:6379/0")
+        >>> backend.set("k", b"v", ttl=10)
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix="sa-chatbot:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """
+        Create a backend connected to the server at url.
+
+        Raises:
+            ImportError: If the optional redis package is not installed.
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class TwoLevelCache:
+    """
+    In-process L1 (MemoryCache) over a shared L2 backend.
+
+    Reads check L1, then L2 (promoting hits into L1); writes go to both. L1
+    entries live at most l1_ttl seconds so workers pick up L2 changes.
+    With shared=False, a value is kept in L1 only, for its full TTL.
+
+    Args:
+        l2: Shared backend (SQLiteCacheBackend, RedisCacheBackend) or None
+            for an L1-only cache.
+        l1_entries (int): Maximum number of L1 entries.
+        l1_ttl (int): Maximum L1 lifetime in seconds.
+
+    Example:
+        >>> cache = TwoLevelCache(SQLiteCacheBackend("/tmp/cache.db"))
+        >>> cache.set("answers:abc", "Hallo", ttl=60)
+        >>> cache.get("answers:abc")
+        'Hallo'
+    """
+
+    def __init__(self, l2=None, l1_entries=DEFAULT_L1_ENTRIES, l1_ttl=DEFAULT_L1_TTL):
+        self.l1 = MemoryCache(l1_entries)
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key, default=None, shared=True, fresh=False):
+        """
+        Return the cached value for key, or default on a miss.
+
+        L2 failures and undecodable L2 entries are counted and treated as
+        misses so the cache never breaks the caller. With fresh=True, L1 is
+        skipped so a change written by another worker is seen immediately.
+        """
+        data = None if fresh and self.l2 is not None and shared else self.l1.get(key)
+        if data is not None:
+            self._count("l1_hits")
+            return deserialize(data)
+        if self.l2 is not None and shared:
+            try:
+                data = self.l2.get(key)
+                value = deserialize(data) if data is not None else None
+            except Exception:
+                self._count("errors")
+                logger.warning("Shared cache read failed", exc_info=True, extra={"event": "cache.read_failed"})
+                data = None
+            if data is not None:
+                self._count("l2_hits")
+                self.l1.set(key, data, self.l1_ttl)
+                return value
+        self._count("misses")
+        return default
+
+    def set(self, key, value, ttl, shared=True):
+        """Store value under key for ttl seconds in L1 and, if shared, in L2."""
+        data = serialize(value)
+        if not shared:
+            self.l1.set(key, data, ttl)
+            return
+        self.l1.set(key, data, min(ttl, self.l1_ttl))
+        if self.l2 is not None:
+            try:
+                self.l2.set(key, data, ttl)
+            except Exception:
+                self._count("errors")
+                logger.warning("Shared cache write failed", exc_info=True, extra={"event": "cache.write_failed"})
+
+    def delete(self, key):
+        """Remove key from both levels."""
+        self.l1.delete(key)
+        if self.l2 is not None:
+            self.l2.delete(key)
+
+    def stats(self):
+        """
+        Return hit/miss counters and the overall hit rate.
+
+        Returns:
+            dict: 'l1_hits', 'l2_hits', 'misses', 'errors' and 'hit_rate'.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["l1_hits"] + stats["l2_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def create_cache(name=None):
+    """
+    Create a TwoLevelCache from its backend name and environment configuration.
+
+    Environment:
+        CACHE_BACKEND: "sqlite" (default), "redis" or "memory".
+        CACHE_PATH: SQLite cache file (default "shared_cache.db").
+        CACHE_MAX_BYTES: SQLite size budget in bytes.
+        REDIS_URL: Redis server URL (default "redis://localhost:6379/0").
+
+    Args:
+        name (str, optional): Backend name, overriding CACHE_BACKEND.
+
+    Returns:
+        TwoLevelCache: A new cache.
+
+    Raises:
+        ValueError: If the backend name is not supported.
+    """
+    name = (name or os.getenv("CACHE_BACKEND", "sqlite")).lower()
+    if name == "memory":
+        return TwoLevelCache(None)
+    if name == "sqlite":
+        return TwoLevelCache(SQLiteCacheBackend(
+            os.getenv("CACHE_PATH", DEFAULT_CACHE_PATH),
+            int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        ))
+    if name == "redis":
+        return TwoLevelCache(RedisCacheBackend.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    raise ValueError(f"Unsupported cache backend: {name!r}")
+
+
+def get_cache():
+    """
+    Return the process-wide cache, creating it on first use.
+
+    Returns:
+        TwoLevelCache: The configured cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+
+def set_cache(cache):
+    """
+    Replace the process-wide cache.
+
+    Args:
+        cache (TwoLevelCache): Cache used by subsequent @cached calls.
+
+    Returns:
+        None
+    """
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+_MISSING = object()
+
+
+def cached(namespace, ttl, unless=None, shared=True, key=None):
+    """
+    Decorator caching a function's results in the shared cache.
+
+    The key is derived from the namespace, the function name and the repr of
+    the arguments (or of what `key` returns for them). Exceptions are not
+    cached, so functions should raise rather than return error values.
+    Results must be JSON-serializable. If the cache cannot be created or
+    used, the failure is logged and the function is called uncached.
+
+    Args:
+        namespace (str): Key prefix, e.g. "answers" or "secrets".
+        ttl (int): Lifetime in seconds. A value <= 0 disables caching.
+        unless (callable, optional): Called with the function's arguments;
+            if it returns True, the cache is bypassed for that call.
+        shared (bool): Store results in the shared L2 tier. Use False for
+            values that must not leave the process, such as secrets.
+        key (callable, optional): Called with the function's arguments;
+            returns the part of them that identifies the result. Arguments
+            that do not change the result (e.g. request metadata) can be
+            left out this way.
+
+    Returns:
+        callable: The decorator.
+
+    Example:
+        >>> @cached("secrets", ttl=3600, shared=False)
+        ... def fetch_secret(secret_id):
+        ...     ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if ttl <= 0 or (unless is not None and unless(*args, **kwargs)):
+                return func(*args, **kwargs)
+            identity = key(*args, **kwargs) if key is not None else (args, sorted(kwargs.items()))
+            digest = hashlib.sha256(repr(identity).encode("utf-8")).hexdigest()
+            cache_key = f"{namespace}:{func.__qualname__}:{digest}"
+            try:
+                cache = get_cache()
+                value = cache.get(cache_key, _MISSING, shared=shared)
+            except Exception:
+                logger.warning("Cache unavailable, calling uncached", exc_info=True, extra={
+                    "event": "cache.unavailable", "namespace": namespace,
+                })
+                return func(*args, **kwargs)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                try:
+                    cache.set(cache_key, value, ttl, shared=shared)
+                except Exception:
+                    logger.warning("Caching result failed", exc_info=True, extra={
+                        "event": "cache.write_failed", "namespace": namespace,
+                    })
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,312 @@
+"""
+Storage Archive Job
+
+Compacts and expires stored conversations and feedback. Meant to run once a
+day, e.g. from cron or a scheduled container task:
+
+    python storage_archive.py
+    python storage_archive.py --dry-run
+
+For the S3 backend:
+
+1. Closed days (older than ARCHIVE_AFTER_DAYS) of conversations/<date>.json
+   are rolled into one gzip-compressed NDJSON segment per month
+   (archive/conversations/<YYYY-MM>-<version>.ndjson.gz) and listed in a
+   small manifest. Feedback entries older than ARCHIVE_AFTER_DAYS move from
+   feedback/feedback.json into archive/feedback/ segments the same way;
+   feedback.json is rewritten with a conditional put (If-Match), so
+   feedback saved during the run is kept.
+2. The original daily files are deleted, or with ARCHIVE_ORIGINALS=tier
+   copied to cold/conversations/<date>.json in ARCHIVE_STORAGE_CLASS first.
+3. Entries older than CONVERSATION_RETENTION_DAYS / FEEDBACK_RETENTION_DAYS
+   are removed from all tiers (0 keeps them forever).
+
+A new segment version and the manifest are written before the originals
+and the previous segment version are removed, so an interrupted run loses
+nothing; the next run finishes it, and readers skip the duplicates in
+between (see storage_backend.merge_entries).
+
+For the SQLite backend only the retention windows apply.
+
+Environment:
+    ARCHIVE_AFTER_DAYS: Days kept in the hot tier (default 7).
+    ARCHIVE_ORIGINALS: "delete" (default) or "tier".
+    ARCHIVE_STORAGE_CLASS: S3 storage class for tiered originals (default "GLACIER_IR").
+    CONVERSATION_RETENTION_DAYS / FEEDBACK_RETENTION_DAYS: Retention windows (default 0, unlimited).
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from app_logging import get_logger
+from storage_backend import (
+    CONVERSATIONS,
+    DAY_FORMAT,
+    FEEDBACK,
+    S3Backend,
+    SQLiteBackend,
+    create_backend,
+    entry_day,
+    merge_entries,
+)
+
+logger = get_logger("storage_archive")
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 7))
+ARCHIVE_ORIGINALS = os.getenv("ARCHIVE_ORIGINALS", "delete")
+ARCHIVE_STORAGE_CLASS = os.getenv("ARCHIVE_STORAGE_CLASS", "GLACIER_IR")
+CONVERSATION_RETENTION_DAYS = int(os.getenv("CONVERSATION_RETENTION_DAYS", 0))
+FEEDBACK_RETENTION_DAYS = int(os.getenv("FEEDBACK_RETENTION_DAYS", 0))
+
+# Attempts of the conditional feedback rewrite, and the S3 error codes of a
+# lost race.
+WRITE_RETRIES = 5
+WRITE_CONFLICTS = ("PreconditionFailed", "ConditionalRequestConflict")
+
+COLD_PREFIX = "cold/conversations/"
+
+
+def _cutoff(today, days):
+    """Return the first day (YYYY-MM-DD) that is not older than `days` days."""
+    return (today - timedelta(days=days)).strftime(DAY_FORMAT)
+
+
+def _by_month(days):
+    months = {}
+    for day in days:
+        months.setdefault(day[:7], []).append(day)
+    return months
+
+
+def _replace_segment(backend, collection, manifest, month, days):
+    """Write a new segment version for a month, update the manifest and drop the old version."""
+    previous = manifest["segments"].get(month)
+    if days:
+        manifest["segments"][month] = backend.write_segment(collection, month, days)
+    else:
+        del manifest["segments"][month]
+    backend.write_manifest(collection, manifest)
+    if previous and previous["key"] != manifest["segments"].get(month, {}).get("key"):
+        backend.delete(previous["key"])
+
+
+def _retire_original(backend, day, originals):
+    """Delete a daily conversations object, copying it to the cold tier first if requested."""
+    key = backend.key_for(CONVERSATIONS, day)
+    if originals == "tier":
+        cold_key = f"{COLD_PREFIX}{day}.json"
+        if backend.s3.list_objects_v2(Bucket=backend.bucket, Prefix=cold_key, MaxKeys=1).get("KeyCount"):
+            # Late writes to an already archived day; keep the first copy.
+            cold_key = f"{COLD_PREFIX}{day}-{time.time_ns()}.json"
+        backend.s3.copy_object(
+            Bucket=backend.bucket,
+            Key=cold_key,
+            CopySource={"Bucket": backend.bucket, "Key": key},
+            StorageClass=ARCHIVE_STORAGE_CLASS
+        )
+    backend.delete(key)
+
+
+def compact_conversations(backend, today, archive_after=None, originals=None, dry_run=False):
+    """
+    Roll closed conversation days into monthly archive segments.
+
+    Args:
+        backend (S3Backend): The backend to compact.
+        today (date): Reference day.
+        archive_after (int, optional): Days kept in the hot tier. Defaults
+            to ARCHIVE_AFTER_DAYS.
+        originals (str, optional): "delete" or "tier". Defaults to
+            ARCHIVE_ORIGINALS.
+        dry_run (bool): Only report what would be archived.
+
+    Returns:
+        dict: 'days' and 'entries' archived, 'segments' written.
+
+    Example:
+        >>> compact_conversations(S3Backend(), date(2025, 12, 1))
+        {'days': 14, 'entries': 1830, 'segments': 1}
+    """
+    cutoff = _cutoff(today, ARCHIVE_AFTER_DAYS if archive_after is None else archive_after)
+    originals = originals or ARCHIVE_ORIGINALS
+    closed = [day for day in backend.hot_days() if day < cutoff]
+    stats = {"days": len(closed), "entries": 0, "segments": 0}
+    if dry_run or not closed:
+        return stats
+
+    manifest = backend.load_manifest(CONVERSATIONS)
+    for month, days in sorted(_by_month(closed).items()):
+        record = manifest["segments"].get(month)
+        segment = dict(backend.read_segment(record)) if record else {}
+        for day in days:
+            hot = backend.load_hot(CONVERSATIONS, day)
+            segment[day] = merge_entries(segment.get(day, []), hot)
+            stats["entries"] += len(hot)
+        _replace_segment(backend, CONVERSATIONS, manifest, month, segment)
+        stats["segments"] += 1
+        for day in days:
+            _retire_original(backend, day, originals)
+    return stats
+
+
+def compact_feedback(backend, today, archive_after=None, dry_run=False):
+    """
+    Move feedback entries older than `archive_after` days into monthly archive segments.
+
+    Args:
+        backend (S3Backend): The backend to compact.
+        today (date): Reference day.
+        archive_after (int, optional): Days kept in the hot tier. Defaults
+            to ARCHIVE_AFTER_DAYS.
+        dry_run (bool): Only report what would be archived.
+
+    Returns:
+        dict: 'entries' archived, 'segments' written.
+    """
+    cutoff = _cutoff(today, ARCHIVE_AFTER_DAYS if archive_after is None else archive_after)
+    hot = backend.load_hot(FEEDBACK)
+    old = [entry for entry in hot if entry_day(entry) < cutoff]
+    stats = {"entries": len(old), "segments": 0}
+    if dry_run or not old:
+        return stats
+
+    by_day = {}
+    for entry in old:
+        by_day.setdefault(entry_day(entry), []).append(entry)
+
+    manifest = backend.load_manifest(FEEDBACK)
+    for month, days in sorted(_by_month(by_day).items()):
+        record = manifest["segments"].get(month)
+        segment = dict(backend.read_segment(record)) if record else {}
+        for day in days:
+            segment[day] = merge_entries(segment.get(day, []), by_day[day])
+        _replace_segment(backend, FEEDBACK, manifest, month, segment)
+        stats["segments"] += 1
+
+    # Feedback saved since the first read must not be overwritten: write
+    # only if the object is unchanged, otherwise re-read and try again.
+    from botocore.exceptions import ClientError
+
+    archived = {json.dumps(entry, sort_keys=True) for entry in old}
+    for _ in range(WRITE_RETRIES):
+        hot, etag = backend.load_hot_versioned(FEEDBACK)
+        try:
+            backend.write_hot(FEEDBACK, [
+                entry for entry in hot if json.dumps(entry, sort_keys=True) not in archived
+            ], if_match=etag)
+            return stats
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in WRITE_CONFLICTS:
+                raise
+        logger.info("Feedback changed during compaction, retrying", extra={"event": "archive.write_conflict"})
+    # The archived entries stay in the hot object until the next run;
+    # readers skip the duplicates.
+    logger.warning("Feedback kept changing, compaction left unfinished", extra={"event": "archive.write_conflict"})
+    return stats
+
+
+def expire(backend, collection, today, retention_days, dry_run=False):
+    """
+    Remove entries older than the retention window from all tiers.
+
+    Args:
+        backend (StorageBackend): S3 or SQLite backend.
+        collection (str): "conversations" or "feedback".
+        today (date): Reference day.
+        retention_days (int): Retention window in days; 0 keeps everything.
+        dry_run (bool): Only report what would be removed.
+
+    Returns:
+        dict: Number of 'entries' removed (S3: 'days' and 'segments' touched).
+    """
+    if not retention_days:
+        return {}
+    cutoff = _cutoff(today, retention_days)
+
+    if isinstance(backend, SQLiteBackend):
+        if dry_run:
+            return {"entries": len(backend.query(collection, until=cutoff))}
+        return {"entries": backend.delete_before(collection, cutoff)}
+
+    stats = {"entries": 0, "days": 0, "segments": 0}
+    manifest = backend.load_manifest(collection)
+    for month, record in sorted(manifest["segments"].items()):
+        if month > cutoff[:7]:
+            break
+        segment = backend.read_segment(record)
+        kept = {day: entries for day, entries in segment.items() if day >= cutoff}
+        stats["entries"] += sum(len(entries) for day, entries in segment.items() if day < cutoff)
+        if len(kept) == len(segment) or dry_run:
+            continue
+        _replace_segment(backend, collection, manifest, month, kept)
+        stats["segments"] += 1
+
+    if collection == FEEDBACK:
+        hot = backend.load_hot(FEEDBACK)
+        kept = [entry for entry in hot if entry_day(entry) >= cutoff]
+        stats["entries"] += len(hot) - len(kept)
+        if len(kept) != len(hot) and not dry_run:
+            backend.write_hot(FEEDBACK, kept)
+        return stats
+
+    for day in backend.hot_days():
+        if day >= cutoff:
+            break
+        stats["entries"] += len(backend.load_hot(CONVERSATIONS, day))
+        stats["days"] += 1
+        if not dry_run:
+            backend.delete(backend.key_for(CONVERSATIONS, day))
+    if not dry_run:
+        paginator = backend.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=backend.bucket, Prefix=COLD_PREFIX):
+            for obj in page.get("Contents", []):
+                if obj["Key"][len(COLD_PREFIX):][:10] < cutoff:
+                    backend.delete(obj["Key"])
+    return stats
+
+
+def run(backend=None, today=None, dry_run=False):
+    """
+    Run compaction and retention for both collections.
+
+    Args:
+        backend (StorageBackend, optional): Defaults to create_backend().
+        today (date, optional): Reference day. Defaults to today.
+        dry_run (bool): Only report what would change.
+
+    Returns:
+        dict: Statistics per step.
+    """
+    backend = backend or create_backend()
+    today = today or date.today()
+    summary = {}
+    if isinstance(backend, S3Backend):
+        summary["archive_conversations"] = compact_conversations(backend, today, dry_run=dry_run)
+        summary["archive_feedback"] = compact_feedback(backend, today, dry_run=dry_run)
+    summary["expire_conversations"] = expire(backend, CONVERSATIONS, today, CONVERSATION_RETENTION_DAYS, dry_run)
+    summary["expire_feedback"] = expire(backend, FEEDBACK, today, FEEDBACK_RETENTION_DAYS, dry_run)
+    logger.info("Archive run completed", extra={
+        "event": "archive.completed", "backend": backend.name, "dry_run": dry_run, "summary": summary,
+    })
+    return summary
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Archive and expire chatbot storage.")
+    parser.add_argument("--backend", default=None, help="s3 or sqlite (default: STORAGE_BACKEND)")
+    parser.add_argument("--today", default=None, help="Reference day YYYY-MM-DD (default: today)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    today = date.fromisoformat(args.today) if args.today else None
+    summary = run(create_backend(args.backend), today=today, dry_run=args.dry_run)
+    for step, stats in summary.items():
+        print(f"[INFO] {step}: {stats or 'disabled'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,793 @@
+"""
+Storage Backend Module
+
+This module defines the storage interface used by conversation_storage and
+feedback_storage, together with two implementations:
+
+1. S3Backend: the original whole-file JSON layout in the S3 bucket
+   (conversations/<date>.json and feedback/feedback.json), plus the
+   compressed monthly archive segments written by storage_archive
+   (archive/<collection>/<YYYY-MM>-<version>.ndjson.gz with a manifest.json). Reads
+   resolve entries across the hot and the archived tier.
+2. SQLiteBackend: a local SQLite database in WAL mode with one table per
+   collection and indexes on userId, sessionId and timestamp, so appends are
+   O(1) and queries by user or session do not scan the whole history.
+
+The active backend is selected with the STORAGE_BACKEND environment variable
+("s3" by default, or "sqlite").
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# --- collection configuration ---
+CONVERSATIONS = "conversations"
+FEEDBACK = "feedback"
+COLLECTIONS = (CONVERSATIONS, FEEDBACK)
+
+DEFAULT_BUCKET = "man-vehicle-knowledge-base"
+DEFAULT_SQLITE_PATH = "chat_storage.db"
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAY_FORMAT = "%Y-%m-%d"
+
+# Number of decompressed archive segments kept in memory per S3Backend.
+SEGMENT_CACHE_SIZE = 4
+# Rows fetched per query by SQLiteBackend.iter_entries.
+ITER_BATCH_SIZE = 1000
+
+
+def entry_day(entry):
+    """
+    Return the day (YYYY-MM-DD) an entry belongs to.
+
+    The day is the first ten characters of the entry's 'timestamp'. Both
+    backends reject entries without one on append, so an entry is found
+    under the same day in either of them.
+
+    Args:
+        entry (dict): Conversation or feedback entry.
+
+    Returns:
+        str: Day string in YYYY-MM-DD format.
+
+    Raises:
+        ValueError: If the timestamp does not start with a YYYY-MM-DD date.
+
+    Example:
+        >>> entry_day({"timestamp": "2025-11-17 10:15:59"})
+        '2025-11-17'
+    """
+    timestamp = str(entry.get("timestamp") or "")
+    try:
+        datetime.strptime(timestamp[:10], DAY_FORMAT)
+    except ValueError:
+        raise ValueError(f"Entry without a valid timestamp: {entry.get('timestamp')!r}") from None
+    return timestamp[:10]
+
+
+def entry_matches(entry, user_id=None, session_id=None, since=None, until=None):
+    """
+    Return whether an entry passes the query filters.
+
+    Args:
+        entry (dict): Conversation or feedback entry.
+        user_id (str, optional): Only entries with this userId.
+        session_id (str, optional): Only entries with this sessionId.
+        since (str, optional): Inclusive lower bound on the timestamp.
+        until (str, optional): Exclusive upper bound on the timestamp.
+
+    Returns:
+        bool: True if the entry matches all given filters.
+    """
+    timestamp = str(entry.get("timestamp", ""))
+    return (
+        (user_id is None or entry.get("userId") == user_id)
+        and (session_id is None or entry.get("sessionId") == session_id)
+        and (since is None or timestamp >= since)
+        and (until is None or timestamp < until)
+    )
+
+
+def _next_day(day):
+    """Return the day following the given YYYY-MM-DD string."""
+    return (datetime.strptime(day, DAY_FORMAT) + timedelta(days=1)).strftime(DAY_FORMAT)
+
+
+def merge_entries(archived, hot):
+    """
+    Combine the archived and hot entries of one day.
+
+    Hot entries that are already archived (left behind by an interrupted
+    archive run) are skipped; entries written after archiving are kept.
+
+    Args:
+        archived (list): Entries from the archive segment.
+        hot (list): Entries from the hot object.
+
+    Returns:
+        list: Archived entries followed by the new hot entries.
+
+    Example:
+        >>> merge_entries([{"a": 1}], [{"a": 1}, {"a": 2}])
+        [{'a': 1}, {'a': 2}]
+    """
+    if not archived or not hot:
+        return archived + hot
+    seen = {json.dumps(entry, sort_keys=True) for entry in archived}
+    return archived + [entry for entry in hot if json.dumps(entry, sort_keys=True) not in seen]
+
+
+def _check_collection(collection):
+    """Raise ValueError for unknown collection names."""
+    if collection not in COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection!r}")
+
+
+class StorageBackend:
+    """
+    Interface shared by all storage backends.
+
+    A backend stores JSON-serializable entries in named collections
+    ("conversations" and "feedback"). Conversations are partitioned by day,
+    feedback is a single collection.
+
+    Example:
+        >>> backend = SQLiteBackend(":memory:")
+        >>> backend.append("feedback", {"userId": "ab12cd34"})
+        >>> len(backend.load("feedback"))
+        1
+    """
+
+    name = "base"
+
+    def append(self, collection, entry):
+        """
+        Append a single entry to a collection.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            entry (dict): Entry to store.
+
+        Returns:
+            None
+        """
+        self.append_many(collection, [entry])
+
+    def append_many(self, collection, entries):
+        """
+        Append several entries to a collection in one batch.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            entries (list): Entries to store.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If an entry has no valid timestamp (see entry_day);
+                nothing is stored then.
+        """
+        raise NotImplementedError
+
+    def load(self, collection, day=None):
+        """
+        Load the entries of a collection.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            day (str, optional): For conversations, the day to load in
+                YYYY-MM-DD format. Defaults to the current day. Ignored for
+                feedback, which is returned in full.
+
+        Returns:
+            list: Entries in insertion order.
+        """
+        raise NotImplementedError
+
+    def query(self, collection, user_id=None, session_id=None, since=None, until=None, limit=None):
+        """
+        Return entries matching the given filters.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            user_id (str, optional): Only entries with this userId.
+            session_id (str, optional): Only entries with this sessionId.
+            since (str, optional): Inclusive lower bound on the timestamp.
+            until (str, optional): Exclusive upper bound on the timestamp.
+            limit (int, optional): Maximum number of entries to return.
+
+        Returns:
+            list: Matching entries ordered by timestamp.
+        """
+        raise NotImplementedError
+
+    def iter_entries(self, collection, user_id=None, session_id=None, since=None, until=None):
+        """
+        Iterate over the entries of a collection, across all days.
+
+        Unlike query(), entries are produced batch by batch, so memory does
+        not grow with the size of the collection.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            user_id (str, optional): Only entries with this userId.
+            session_id (str, optional): Only entries with this sessionId.
+            since (str, optional): Inclusive lower bound on the timestamp.
+            until (str, optional): Exclusive upper bound on the timestamp.
+
+        Yields:
+            dict: Matching entries.
+        """
+        raise NotImplementedError
+
+
+class S3Backend(StorageBackend):
+    """
+    Stores collections as whole-file JSON documents in an S3 bucket.
+
+    Conversations are written to conversations/<YYYY-MM-DD>.json, feedback to
+    feedback/feedback.json. Each append reads the file, extends it and writes
+    it back, so write cost grows with the size of the file.
+
+    Older entries may have been moved to gzip-compressed NDJSON segments, one
+    per collection and month (see storage_archive). A manifest per collection
+    lists the segments and, for each day, the line range of its entries. All
+    reads combine both tiers.
+
+    boto3 is imported and the client created on first access, so importing
+    this module does not pay for botocore.
+
+    Args:
+        bucket (str): Bucket name.
+        client (optional): A boto3 S3 client. Created on demand if omitted.
+
+    Example:
+        >>> backend = S3Backend("man-vehicle-knowledge-base")
+        >>> backend.key_for("conversations", "2025-11-17")
+        'conversations/2025-11-17.json'
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket=DEFAULT_BUCKET, client=None):
+        self.bucket = bucket
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._segments = OrderedDict()
+        self._segments_lock = threading.Lock()
+
+    @property
+    def s3(self):
+        """The S3 client, created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+
+                    self._client = boto3.client("s3")
+        return self._client
+
+    def key_for(self, collection, day=None):
+        """
+        Return the object key storing a collection (and day, for conversations).
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            day (str, optional): Day in YYYY-MM-DD format. Defaults to today.
+
+        Returns:
+            str: The S3 object key.
+        """
+        _check_collection(collection)
+        if collection == FEEDBACK:
+            return "feedback/feedback.json"
+        return f"conversations/{day or datetime.now().strftime(DAY_FORMAT)}.json"
+
+    def _get_object(self, key):
+        """Return the get_object response of an object, or None if it does not exist."""
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise e
+
+    def _get(self, key):
+        """Return the bytes of an object, or None if it does not exist."""
+        response = self._get_object(key)
+        return response["Body"].read() if response is not None else None
+
+    def _read(self, key):
+        body = self._get(key)
+        return json.loads(body.decode("utf-8")) if body is not None else []
+
+    def _write(self, key, data, **conditions):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(data, indent=4, ensure_ascii=False),
+            ContentType="application/json",
+            **conditions
+        )
+
+    def delete(self, key):
+        """Delete an object."""
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+    def hot_days(self):
+        """Return the sorted list of days that have a conversations object."""
+        days = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix="conversations/"):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len("conversations/"):]
+                if name.endswith(".json") and "/" not in name:
+                    days.append(name[:-len(".json")])
+        return sorted(days)
+
+    def _conversation_days(self, manifest):
+        """Return the sorted list of days stored in either tier."""
+        days = set(self.hot_days())
+        for segment in manifest["segments"].values():
+            days.update(segment["days"])
+        return sorted(days)
+
+    # --- archive tier ---
+
+    def manifest_key(self, collection):
+        """Return the key of a collection's archive manifest."""
+        _check_collection(collection)
+        return f"archive/{collection}/manifest.json"
+
+    def segment_key(self, collection, month, version):
+        """
+        Return the key of an archive segment.
+
+        Rewriting a segment creates a new version, so readers holding the
+        previous manifest never read a segment that does not match it.
+        """
+        _check_collection(collection)
+        return f"archive/{collection}/{month}-{version}.ndjson.gz"
+
+    def load_hot(self, collection, day=None):
+        """Return the entries of the hot object only (no archived entries)."""
+        return self._read(self.key_for(collection, day))
+
+    def load_hot_versioned(self, collection, day=None):
+        """
+        Return the entries of the hot object together with its ETag.
+
+        Returns:
+            tuple: (entries, ETag), the ETag being None if the object does
+                   not exist.
+        """
+        response = self._get_object(self.key_for(collection, day))
+        if response is None:
+            return [], None
+        return json.loads(response["Body"].read().decode("utf-8")), response.get("ETag")
+
+    def write_hot(self, collection, entries, day=None, if_match=None):
+        """
+        Replace the entries of the hot object.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            entries (list): The new content.
+            day (str, optional): Day of a conversations object.
+            if_match (str, optional): ETag from load_hot_versioned; the
+                object is only replaced if it has not changed since.
+
+        Raises:
+            botocore.exceptions.ClientError: With code "PreconditionFailed"
+                (or "ConditionalRequestConflict") if the object changed.
+        """
+        conditions = {"IfMatch": if_match} if if_match else {}
+        self._write(self.key_for(collection, day), entries, **conditions)
+
+    def load_manifest(self, collection):
+        """
+        Load the archive manifest of a collection.
+
+        Returns:
+            dict: {"segments": {month: {"key", "days", "entries", "bytes",
+                  "created"}}}, where "days" maps each day to its
+                  [first line, line count] in the segment.
+        """
+        body = self._get(self.manifest_key(collection))
+        return json.loads(body.decode("utf-8")) if body is not None else {"segments": {}}
+
+    def write_manifest(self, collection, manifest):
+        """Store the archive manifest of a collection."""
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.manifest_key(collection),
+            Body=json.dumps(manifest, ensure_ascii=False, separators=(",", ":")),
+            ContentType="application/json"
+        )
+
+    def write_segment(self, collection, month, days):
+        """
+        Write a compressed archive segment and return its manifest record.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            month (str): Month in YYYY-MM format.
+            days (dict): Day (YYYY-MM-DD) to list of entries.
+
+        Returns:
+            dict: The segment record for the manifest.
+        """
+        lines, ranges = [], {}
+        for day in sorted(days):
+            ranges[day] = [len(lines), len(days[day])]
+            lines.extend(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) for entry in days[day])
+        body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8") if lines else b"")
+        created = time.time()
+        key = self.segment_key(collection, month, time.time_ns() // 1000)
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/x-ndjson"
+        )
+        return {"key": key, "days": ranges, "entries": len(lines), "bytes": len(body), "created": created}
+
+    def read_segment(self, record):
+        """
+        Return the entries of an archive segment, grouped by day.
+
+        Decompressed segments are cached by key (segments are never
+        modified in place), so reading several days of one month downloads
+        the segment once.
+
+        Args:
+            record (dict): The segment record from the manifest.
+
+        Returns:
+            dict: Day to list of entries.
+        """
+        cache_key = record["key"]
+        with self._segments_lock:
+            if cache_key in self._segments:
+                self._segments.move_to_end(cache_key)
+                return self._segments[cache_key]
+
+        body = self._get(record["key"])
+        if body is None:
+            # Replaced by a newer version since the manifest was read.
+            return {}
+        lines = gzip.decompress(body).decode("utf-8").splitlines()
+        days = {
+            day: [json.loads(line) for line in lines[start:start + count]]
+            for day, (start, count) in record["days"].items()
+        }
+        with self._segments_lock:
+            self._segments[cache_key] = days
+            while len(self._segments) > SEGMENT_CACHE_SIZE:
+                self._segments.popitem(last=False)
+        return days
+
+    def _archived_day(self, day, manifest):
+        """Return the archived conversations of a day, or an empty list."""
+        record = manifest["segments"].get(day[:7])
+        if record is None or day not in record["days"]:
+            return []
+        return list(self.read_segment(record).get(day, []))
+
+    def _load_day(self, day, manifest):
+        """Return the conversations of a day from both tiers."""
+        return merge_entries(
+            self._archived_day(day, manifest),
+            self._read(self.key_for(CONVERSATIONS, day))
+        )
+
+    def _load_feedback(self):
+        """Return all feedback, archived segments first."""
+        archived = []
+        for _, record in sorted(self.load_manifest(FEEDBACK)["segments"].items()):
+            for _, entries in sorted(self.read_segment(record).items()):
+                archived.extend(entries)
+        return merge_entries(archived, self._read(self.key_for(FEEDBACK)))
+
+    def append_many(self, collection, entries):
+        _check_collection(collection)
+        groups = {}
+        for entry in entries:
+            # Also validates the timestamp of feedback entries.
+            day = entry_day(entry)
+            key = self.key_for(collection, day if collection == CONVERSATIONS else None)
+            groups.setdefault(key, []).append(entry)
+
+        for key, new_entries in groups.items():
+            data = self._read(key)
+            data.extend(new_entries)
+            self._write(key, data)
+
+    def load(self, collection, day=None):
+        _check_collection(collection)
+        if collection == FEEDBACK:
+            return self._load_feedback()
+        return self._load_day(day or datetime.now().strftime(DAY_FORMAT), self.load_manifest(CONVERSATIONS))
+
+    def query(self, collection, user_id=None, session_id=None, since=None, until=None, limit=None):
+        _check_collection(collection)
+        if collection == FEEDBACK:
+            candidates = self._load_feedback()
+        else:
+            candidates = []
+            manifest = self.load_manifest(CONVERSATIONS)
+            for day in self._conversation_days(manifest):
+                if since and day < since[:10]:
+                    continue
+                if until and day > until[:10]:
+                    continue
+                candidates.extend(self._load_day(day, manifest))
+
+        results = [
+            entry for entry in candidates
+            if entry_matches(entry, user_id=user_id, session_id=session_id, since=since, until=until)
+        ]
+        results.sort(key=lambda entry: str(entry.get("timestamp", "")))
+        return results[:limit] if limit is not None else results
+
+    def iter_entries(self, collection, user_id=None, session_id=None, since=None, until=None):
+        _check_collection(collection)
+        filters = {"user_id": user_id, "session_id": session_id, "since": since, "until": until}
+        if collection == FEEDBACK:
+            groups = [self._load_feedback()]
+        else:
+            manifest = self.load_manifest(CONVERSATIONS)
+            # One day is loaded at a time.
+            groups = (
+                self._load_day(day, manifest)
+                for day in self._conversation_days(manifest)
+                if not (since and day < since[:10]) and not (until and day > until[:10])
+            )
+        for entries in groups:
+            for entry in entries:
+                if entry_matches(entry, **filters):
+                    yield entry
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores collections in a local SQLite database.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    collection is a table holding the indexed columns (userId, sessionId,
+    timestamp) next to the full JSON entry. Batches are inserted with a single
+    executemany inside one transaction.
+
+    Args:
+        path (str): Path of the database file, or ":memory:".
+
+    Example:
+        >>> backend = SQLiteBackend(":memory:")
+        >>> backend.append("conversations", {"sessionId": "s1", "timestamp": "2025-11-17 10:00:00"})
+        >>> backend.query("conversations", session_id="s1")[0]["sessionId"]
+        's1'
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            for table in COLLECTIONS:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "userId TEXT, "
+                    "sessionId TEXT, "
+                    "timestamp TEXT, "
+                    "data TEXT NOT NULL)"
+                )
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (userId, timestamp)")
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_session ON {table} (sessionId, timestamp)")
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)")
+
+    def append_many(self, collection, entries):
+        _check_collection(collection)
+        for entry in entries:
+            # Same validation as S3Backend, which files entries by day.
+            entry_day(entry)
+        rows = [
+            (
+                entry.get("userId"),
+                entry.get("sessionId"),
+                entry.get("timestamp"),
+                json.dumps(entry, ensure_ascii=False),
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO {collection} (userId, sessionId, timestamp, data) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _select(self, collection, where="", params=(), order="id", limit=None):
+        sql = f"SELECT data FROM {collection}"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = tuple(params) + (int(limit),)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load(self, collection, day=None):
+        _check_collection(collection)
+        if collection == FEEDBACK:
+            return self._select(FEEDBACK)
+        day = day or datetime.now().strftime(DAY_FORMAT)
+        return self._select(
+            CONVERSATIONS, "timestamp >= ? AND timestamp < ?", (day, _next_day(day))
+        )
+
+    @staticmethod
+    def _filters(user_id=None, session_id=None, since=None, until=None):
+        """Return the WHERE clauses and parameters for the query filters."""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("userId = ?")
+            params.append(user_id)
+        if session_id is not None:
+            clauses.append("sessionId = ?")
+            params.append(session_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return clauses, params
+
+    def query(self, collection, user_id=None, session_id=None, since=None, until=None, limit=None):
+        _check_collection(collection)
+        clauses, params = self._filters(user_id, session_id, since, until)
+        return self._select(collection, " AND ".join(clauses), params, order="timestamp, id", limit=limit)
+
+    def iter_entries(self, collection, user_id=None, session_id=None, since=None, until=None):
+        _check_collection(collection)
+        clauses, params = self._filters(user_id, session_id, since, until)
+        # Keyset pagination in query() order keeps memory constant, uses the
+        # (userId/sessionId,) timestamp indexes and does not hold the lock
+        # while the caller processes a batch. Rows without a timestamp sort
+        # first and are paged by id.
+        if since is None and until is None:
+            yield from self._iter_batches(
+                collection, clauses + ["timestamp IS NULL", "id > ?"], params, "id", (0,),
+                lambda row: (row[0],)
+            )
+        yield from self._iter_batches(
+            collection, clauses + ["(timestamp, id) > (?, ?)"], params, "timestamp, id", ("", 0),
+            lambda row: (row[2], row[0])
+        )
+
+    def _iter_batches(self, collection, clauses, params, order, start, position):
+        """Yield the rows matching clauses in batches, continuing after position(last row)."""
+        last = start
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, data, timestamp FROM {collection} WHERE {' AND '.join(clauses)} "
+                    f"ORDER BY {order} LIMIT ?",
+                    (*params, *last, ITER_BATCH_SIZE)
+                ).fetchall()
+            for row in rows:
+                yield json.loads(row[1])
+            if len(rows) < ITER_BATCH_SIZE:
+                return
+            last = position(rows[-1])
+
+    def delete_before(self, collection, timestamp):
+        """
+        Delete the entries older than a timestamp.
+
+        Args:
+            collection (str): "conversations" or "feedback".
+            timestamp (str): Exclusive upper bound, e.g. "2025-01-01".
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        _check_collection(collection)
+        with self._lock:
+            return self._conn.execute(f"DELETE FROM {collection} WHERE timestamp < ?", (timestamp,)).rowcount
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    """
+    Create a storage backend from its name and environment configuration.
+
+    Args:
+        name (str, optional): "s3" or "sqlite". Defaults to the STORAGE_BACKEND
+            environment variable, or "s3" if it is not set.
+
+    Returns:
+        StorageBackend: A new backend instance.
+
+    Raises:
+        ValueError: If the backend name is not supported.
+
+    Example:
+        >>> create_backend("sqlite").name
+        'sqlite'
+    """
+    name = (name or os.getenv("STORAGE_BACKEND", "s3")).lower()
+    if name == "s3":
+        return S3Backend(os.getenv("STORAGE_BUCKET", DEFAULT_BUCKET))
+    if name == "sqlite":
+        return SQLiteBackend(os.getenv("STORAGE_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    raise ValueError(f"Unsupported storage backend: {name!r}")
+
+
+def get_backend():
+    """
+    Return the process-wide storage backend, creating it on first use.
+
+    Returns:
+        StorageBackend: The configured backend.
+
+    Example:
+        >>> get_backend() is get_backend()
+        True
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Replace the process-wide storage backend.
+
+    Args:
+        backend (StorageBackend): Backend used by subsequent storage calls.
+
+    Returns:
+        None
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,440 @@
+"""
+Storage Export Tool
+
+Exports conversations or feedback into a single merged NDJSON or CSV file,
+e.g. a month of conversations for an audit.
+
+For the S3 backend, the objects are listed page by page and downloaded
+concurrently by a bounded thread pool, with retries and exponential backoff
+on transient errors. Each object is parsed incrementally from the response
+stream and its matching entries are handed to the writer through a bounded
+queue, and at most a fixed number of objects is in flight, so memory stays
+constant regardless of the export and object sizes. Archived months (see storage_archive) are read from their compressed
+segments, followed by the hot daily objects, so output is in day order. Hot
+entries that are also in a segment (left behind by an interrupted archive
+run) are skipped, as in S3Backend reads.
+Other backends are exported through their batched iter_entries().
+
+Usage:
+    python storage_export.py conversations audit.ndjson --since 2025-11-01 --until 2025-12-01
+    python storage_export.py conversations audit.csv --format csv --user ab12cd34
+    python storage_export.py feedback - --format csv --backend sqlite
+"""
+
+import argparse
+import codecs
+import csv
+import gzip
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app_logging import get_logger
+from feedback_storage import normalize_feedback
+from storage_backend import (
+    COLLECTIONS, CONVERSATIONS, FEEDBACK, S3Backend, create_backend, entry_day, entry_matches
+)
+
+logger = get_logger("storage_export")
+
+FORMATS = ("ndjson", "csv")
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+CHUNK_SIZE = 64 * 1024
+# Entries buffered per object between a download thread and the writer.
+QUEUE_SIZE = 100
+
+_DONE = object()
+
+CSV_COLUMNS = {
+    CONVERSATIONS: ["timestamp", "username", "userId", "sessionId", "question", "answer"],
+    FEEDBACK: [
+        "timestamp", "username", "userId", "sessionId", "user_prompt", "assistant_answer",
+        "correctness_score", "correctness_notes", "coverage_score", "coverage_notes",
+        "tone_style_score", "tone_style_notes",
+    ],
+}
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally parse a JSON array from a binary stream.
+
+    Only one chunk plus the element being decoded is held in memory, instead
+    of the whole document and the fully parsed list.
+
+    Args:
+        stream: Binary file-like object with read(size), e.g. an S3 response body.
+        chunk_size (int): Number of bytes read at a time.
+
+    Yields:
+        The elements of the array.
+
+    Raises:
+        ValueError: If the stream does not contain a JSON array.
+
+    Example:
+        >>> list(iter_json_array(io.BytesIO(b'[{"a": 1}, {"a": 2}]')))
+        [{'a': 1}, {'a': 2}]
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators.
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(buffer) or eof:
+                    yield value
+                    position = end
+                    continue
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + text_decoder.decode(chunk or b"", final=eof)
+        position = 0
+
+
+def list_keys(backend, collection, since=None, until=None, manifest=None):
+    """
+    List the S3 keys holding a collection, page by page.
+
+    Archive segments come first, then the hot objects. Segments are filtered
+    on their month and conversation keys on the day in their name, so
+    objects outside the date range are never downloaded.
+
+    Args:
+        backend (S3Backend): Source backend.
+        collection (str): "conversations" or "feedback".
+        since (str, optional): Inclusive lower bound on the timestamp.
+        until (str, optional): Exclusive upper bound on the timestamp.
+        manifest (dict, optional): The collection's archive manifest, if
+            already loaded.
+
+    Yields:
+        str: Object keys in day order.
+    """
+    manifest = manifest or backend.load_manifest(collection)
+    for month, record in sorted(manifest["segments"].items()):
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        yield record["key"]
+    if collection == FEEDBACK:
+        yield backend.key_for(FEEDBACK)
+        return
+    paginator = backend.s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=backend.bucket, Prefix="conversations/"):
+        for obj in page.get("Contents", []):
+            name = obj["Key"][len("conversations/"):]
+            if not name.endswith(".json") or "/" in name:
+                continue
+            day = name[:-len(".json")]
+            if (since and day < since[:10]) or (until and day > until[:10]):
+                continue
+            yield obj["Key"]
+
+
+def iter_object_entries(backend, key, filters, retries=DEFAULT_RETRIES, backoff=None):
+    """
+    Yield the entries of one object matching the filters, parsed from the response stream.
+
+    Transient errors (connection and read errors, S3 and botocore errors)
+    are retried with exponential backoff and jitter. A retry after entries
+    were already yielded skips that many matching entries, so each entry is
+    produced once. A missing object yields no entries.
+
+    Args:
+        backend (S3Backend): Source backend.
+        key (str): Object key.
+        filters (dict): Keyword arguments for entry_matches (user_id,
+            session_id, since, until).
+        retries (int): Number of retries after the first attempt.
+        backoff (float, optional): Initial backoff in seconds, doubled per
+            retry. Defaults to RETRY_BACKOFF.
+
+    Yields:
+        dict: Matching entries.
+
+    Raises:
+        Exception: The last error if all attempts fail.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    backoff = RETRY_BACKOFF if backoff is None else backoff
+    produced = 0
+    for attempt in range(retries + 1):
+        try:
+            body = backend.s3.get_object(Bucket=backend.bucket, Key=key)["Body"]
+            try:
+                if key.endswith(".ndjson.gz"):
+                    entries = (json.loads(line) for line in gzip.GzipFile(fileobj=body) if line.strip())
+                else:
+                    entries = iter_json_array(body)
+                skip = produced
+                for entry in entries:
+                    if not entry_matches(entry, **filters):
+                        continue
+                    if skip:
+                        skip -= 1
+                        continue
+                    produced += 1
+                    yield entry
+                return
+            finally:
+                body.close()
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return
+            error = e
+        except (OSError, EOFError, ValueError, BotoCoreError) as e:
+            error = e
+        if attempt < retries:
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning("Retrying object download", extra={
+                "event": "export.retry", "key": key, "attempt": attempt + 1, "error_class": type(error).__name__,
+            })
+            time.sleep(delay)
+    raise error
+
+
+def drop_archived(backend, manifest, entries):
+    """
+    Skip hot entries that are already stored in an archive segment.
+
+    Only days listed in a segment are checked, so the segment is read only
+    when an archive run was interrupted between writing it and removing the
+    originals.
+
+    Args:
+        backend (S3Backend): Source backend.
+        manifest (dict): The collection's archive manifest.
+        entries (iterable): Entries read from a hot object.
+
+    Yields:
+        dict: The entries not in the archive, in their original order.
+    """
+    archived = {}
+    for entry in entries:
+        day = entry_day(entry)
+        record = manifest["segments"].get(day[:7])
+        if record is not None and day in record["days"]:
+            if day not in archived:
+                archived[day] = {
+                    json.dumps(other, sort_keys=True) for other in backend.read_segment(record).get(day, [])
+                }
+            if json.dumps(entry, sort_keys=True) in archived[day]:
+                continue
+        yield entry
+
+
+def _produce(entries, out, stop):
+    """Put entries and then _DONE (or the error) into out until stop is set."""
+    if stop.is_set():
+        return
+    try:
+        for entry in entries:
+            if not _put(out, entry, stop):
+                return
+        item = _DONE
+    except Exception as e:
+        item = e
+    _put(out, item, stop)
+
+
+def _put(out, item, stop):
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _consume(out):
+    """Yield the entries put into out by _produce, re-raising its error."""
+    while True:
+        item = out.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def iter_s3_entries(backend, collection, filters, workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    """
+    Yield the matching entries of a collection, downloading objects concurrently.
+
+    Each download thread parses its object from the response stream and
+    hands the entries over through a queue of QUEUE_SIZE entries, so memory
+    is bounded by the number of objects in flight (at most 2 * workers), not
+    by their size. Entries are yielded in key (day) order.
+
+    Args:
+        backend (S3Backend): Source backend.
+        collection (str): "conversations" or "feedback".
+        filters (dict): user_id, session_id, since and until filters.
+        workers (int): Number of download threads.
+        retries (int): Retries per object.
+
+    Yields:
+        dict: Matching entries.
+    """
+    manifest = backend.load_manifest(collection)
+    keys = list_keys(backend, collection, filters.get("since"), filters.get("until"), manifest)
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as executor:
+        try:
+            window = deque()
+            for key in keys:
+                entries = iter_object_entries(backend, key, filters, retries)
+                if not key.startswith("archive/"):
+                    entries = drop_archived(backend, manifest, entries)
+                out = queue.Queue(QUEUE_SIZE)
+                # Objects are started in key order, so the head of the window
+                # is always being downloaded while later ones wait.
+                executor.submit(_produce, entries, out, stop)
+                window.append(out)
+                if len(window) >= 2 * workers:
+                    yield from _consume(window.popleft())
+            while window:
+                yield from _consume(window.popleft())
+        finally:
+            # Release download threads blocked on a full queue if the caller
+            # stops early or an object failed.
+            stop.set()
+
+
+class _NdjsonWriter:
+    def __init__(self, f, collection):
+        self.f = f
+
+    def write(self, entry):
+        self.f.write(json.dumps(entry, ensure_ascii=False))
+        self.f.write("\n")
+
+
+class _CsvWriter:
+    def __init__(self, f, collection):
+        self.writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS[collection], extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, entry):
+        self.writer.writerow(entry)
+
+
+def export(backend, collection, f, fmt="ndjson", user_id=None, session_id=None, since=None, until=None,
+           workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    """
+    Export the matching entries of a collection to an open text file.
+
+    Args:
+        backend (StorageBackend): Source backend.
+        collection (str): "conversations" or "feedback".
+        f: Text file opened for writing (newline="" for CSV).
+        fmt (str): "ndjson" or "csv".
+        user_id (str, optional): Only entries with this userId.
+        session_id (str, optional): Only entries with this sessionId.
+        since (str, optional): Inclusive lower bound on the timestamp, e.g. "2025-11-01".
+        until (str, optional): Exclusive upper bound on the timestamp.
+        workers (int): Download threads (S3 backend only).
+        retries (int): Retries per object (S3 backend only).
+
+    Returns:
+        int: Number of exported entries.
+
+    Raises:
+        ValueError: If the collection or format is not supported.
+
+    Example:
+        >>> with open("audit.ndjson", "w", encoding="utf-8") as f:
+        ...     export(get_backend(), "conversations", f, since="2025-11-01", until="2025-12-01")
+        1234
+    """
+    if collection not in COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+
+    filters = {"user_id": user_id, "session_id": session_id, "since": since, "until": until}
+    if isinstance(backend, S3Backend):
+        entries = iter_s3_entries(backend, collection, filters, workers=workers, retries=retries)
+    else:
+        entries = backend.iter_entries(collection, **filters)
+
+    writer = (_CsvWriter if fmt == "csv" else _NdjsonWriter)(f, collection)
+    count = 0
+    for entry in entries:
+        if collection == FEEDBACK:
+            normalize_feedback([entry])
+        writer.write(entry)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Export chatbot storage as NDJSON or CSV.")
+    parser.add_argument("collection", choices=COLLECTIONS)
+    parser.add_argument("path", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Default: from the file extension")
+    parser.add_argument("--since", help="Inclusive start, e.g. 2025-11-01")
+    parser.add_argument("--until", help="Exclusive end, e.g. 2025-12-01")
+    parser.add_argument("--user", help="userId filter")
+    parser.add_argument("--session", help="sessionId filter")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--backend", default=None, help="s3 or sqlite (default: STORAGE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    backend = create_backend(args.backend)
+    options = dict(
+        fmt=fmt, user_id=args.user, session_id=args.session, since=args.since, until=args.until,
+        workers=args.workers, retries=args.retries
+    )
+    start = time.perf_counter()
+    if args.path == "-":
+        count = export(backend, args.collection, sys.stdout, **options)
+    else:
+        with open(args.path, "w", encoding="utf-8", newline="") as f:
+            count = export(backend, args.collection, f, **options)
+    print(
+        f"[INFO] Exported {count} {args.collection} entries from {backend.name} "
+        f"in {time.perf_counter() - start:.1f} s",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
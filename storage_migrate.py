@@ -0,0 +1,121 @@
+"""
+Storage Migration Tool
+
+Imports the existing JSON files (daily conversations/<date>.json files and
+feedback.json) into a storage backend and exports a backend back to the same
+JSON layout.
+
+Usage:
+    python storage_migrate.py import feedback feedback.json --backend sqlite
+    python storage_migrate.py import conversations ./conversations --backend sqlite
+    python storage_migrate.py export feedback feedback.json --backend sqlite
+    python storage_migrate.py export conversations ./conversations --backend sqlite
+"""
+
+import argparse
+import json
+import os
+
+from storage_backend import COLLECTIONS, CONVERSATIONS, create_backend, entry_day
+
+BATCH_SIZE = 500
+
+
+def _json_files(path):
+    """Return the JSON files at path (a single file or a directory)."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json")
+        )
+    return [path]
+
+
+def import_json(backend, collection, path, batch_size=BATCH_SIZE):
+    """
+    Import entries from JSON files into a backend.
+
+    Args:
+        backend (StorageBackend): Target backend.
+        collection (str): "conversations" or "feedback".
+        path (str): A JSON file containing a list of entries, or a directory
+                    of such files (e.g. the daily conversation files).
+        batch_size (int): Number of entries written per batch.
+
+    Returns:
+        int: Number of imported entries.
+
+    Raises:
+        ValueError: If a file does not contain a JSON list.
+
+    Example:
+        >>> import_json(SQLiteBackend(":memory:"), "feedback", "feedback.json")
+        12
+    """
+    count = 0
+    for file_path in _json_files(path):
+        with open(file_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{file_path} does not contain a list of entries")
+        for start in range(0, len(data), batch_size):
+            backend.append_many(collection, data[start:start + batch_size])
+        count += len(data)
+    return count
+
+
+def export_json(backend, collection, path):
+    """
+    Export a backend collection to the JSON file layout used on S3.
+
+    Feedback is written to a single file at path. Conversations are written
+    to one <YYYY-MM-DD>.json file per day inside the directory at path.
+
+    Args:
+        backend (StorageBackend): Source backend.
+        collection (str): "conversations" or "feedback".
+        path (str): Target file (feedback) or directory (conversations).
+
+    Returns:
+        int: Number of exported entries.
+
+    Example:
+        >>> export_json(backend, "conversations", "./conversations")
+        42
+    """
+    if collection != CONVERSATIONS:
+        data = list(backend.iter_entries(collection))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        return len(data)
+
+    days = {}
+    for entry in backend.iter_entries(collection):
+        days.setdefault(entry_day(entry), []).append(entry)
+
+    os.makedirs(path, exist_ok=True)
+    for day, data in days.items():
+        with open(os.path.join(path, f"{day}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+    return sum(len(data) for data in days.values())
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Import/export chatbot storage as JSON files.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("collection", choices=COLLECTIONS)
+    parser.add_argument("path", help="JSON file, or directory of daily conversation files")
+    parser.add_argument("--backend", default=None, help="s3 or sqlite (default: STORAGE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend)
+    if args.action == "import":
+        count = import_json(backend, args.collection, args.path)
+        print(f"[INFO] Imported {count} {args.collection} entries into {backend.name}")
+    else:
+        count = export_json(backend, args.collection, args.path)
+        print(f"[INFO] Exported {count} {args.collection} entries from {backend.name} to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
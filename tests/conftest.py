@@ -0,0 +1,89 @@
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import storage_backend  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path, monkeypatch):
+    """Use a fresh SQLite database as the process-wide storage backend, without search index."""
+    monkeypatch.setenv("SEARCH_INDEX_PATH", "")
+    backend = storage_backend.SQLiteBackend(str(tmp_path / "storage.db"))
+    storage_backend.set_backend(backend)
+    yield backend
+    storage_backend.set_backend(None)
+    backend.close()
+
+
+class LocalS3Client:
+    """
+    In-memory stand-in for the boto3 S3 client calls of the storage modules.
+
+    Objects are kept in `objects`, keyed by (bucket, key). get_object returns
+    an ETag and put_object honours IfMatch, like S3 conditional writes.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = 0
+
+    @staticmethod
+    def _etag(body):
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def _error(self, code, operation):
+        return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, **kwargs):
+        self.requests += 1
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        current = self.objects.get((Bucket, Key))
+        if IfMatch is not None and (current is None or self._etag(current) != IfMatch):
+            raise self._error("PreconditionFailed", "PutObject")
+        self.objects[(Bucket, Key)] = bytes(Body)
+        return {"ETag": self._etag(Body)}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.requests += 1
+        body = self.objects.get((Bucket, Key))
+        if body is None:
+            raise self._error("NoSuchKey", "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "ETag": self._etag(body)}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self.requests += 1
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self.requests += 1
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, **kwargs):
+        self.requests += 1
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        contents = [{"Key": key, "Size": len(self.objects[(Bucket, key)])} for key in keys[:MaxKeys]]
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": len(keys) > MaxKeys}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2", operation
+        return self
+
+    def paginate(self, Bucket, Prefix=""):
+        # Everything on one page.
+        yield self.list_objects_v2(Bucket, Prefix, MaxKeys=len(self.objects))
+
+
+@pytest.fixture
+def s3_client():
+    """An empty in-memory S3 client."""
+    return LocalS3Client()
@@ -0,0 +1,103 @@
+"""Tests for request hedging and deadlines in api_client, against the local stub backend."""
+
+import threading
+import time
+
+import pytest
+
+import api_client
+import metrics
+from benchmarks.stub_backend import StubBackend, make_server
+
+PAYLOAD = {"prompt": "Was kostet ein TGX?", "history": []}
+
+
+class SlowStubBackend(StubBackend):
+    """StubBackend that delays each request by the next value from `delays` (0 when empty)."""
+
+    def __init__(self, delays=()):
+        super().__init__(answer_chars=40)
+        self.delays = list(delays)
+        self.received = 0
+
+    def handle(self, payload, size):
+        with self.lock:
+            self.received += 1
+            delay = self.delays.pop(0) if self.delays else 0.0
+        time.sleep(delay)
+        return super().handle(payload, size)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    backend = SlowStubBackend()
+    server = make_server(backend)
+    monkeypatch.setattr(api_client, "API_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(api_client, "hedge_budget", api_client.HedgeBudget(ratio=0.1, burst=5))
+    yield backend
+    server.shutdown()
+    server.server_close()
+
+
+def total(name):
+    return sum(metrics.registry.counts(name))
+
+
+def test_hedge_answers_when_primary_is_slow(stub):
+    stub.delays = [2.0]
+    hedges = total("api.hedges")
+
+    start = time.perf_counter()
+    body = api_client._post_hedged(PAYLOAD, api_client.Deadline(5), delay=0.1)
+
+    assert body.startswith("Antwort")
+    assert time.perf_counter() - start < 1.0
+    assert stub.received == 2
+    assert total("api.hedges") == hedges + 1
+
+
+def test_no_hedge_when_budget_is_exhausted(stub, monkeypatch):
+    monkeypatch.setattr(api_client, "hedge_budget", api_client.HedgeBudget(ratio=0, burst=0))
+    stub.delays = [0.4]
+
+    start = time.perf_counter()
+    body = api_client._post_hedged(PAYLOAD, api_client.Deadline(5), delay=0.1)
+
+    assert body.startswith("Antwort")
+    assert time.perf_counter() - start >= 0.4
+    assert stub.received == 1
+
+
+def test_deadline_expiry_raises_timeout(stub):
+    stub.delays = [2.0, 2.0]
+
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        api_client._post_hedged(PAYLOAD, api_client.Deadline(0.3), delay=0.1)
+
+    assert time.perf_counter() - start < 1.0
+
+
+def test_expired_deadline_closes_the_session():
+    deadline = api_client.Deadline(0)
+    attempt = api_client._Attempt(PAYLOAD, deadline)
+    closed = threading.Event()
+    close = attempt.session.close
+    attempt.session.close = lambda: (closed.set(), close())
+
+    with pytest.raises(TimeoutError):
+        attempt.run()
+
+    assert closed.is_set()
+
+
+def test_cancel_aborts_the_request_in_flight(stub):
+    stub.delays = [5.0]
+    deadline = api_client.Deadline(10)
+    threading.Timer(0.2, deadline.cancel).start()
+
+    start = time.perf_counter()
+    with pytest.raises(api_client.Cancelled):
+        api_client._post(PAYLOAD, deadline)
+
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,119 @@
+"""Tests for the incremental context protocol of api_client, against the local stub backend."""
+
+import pytest
+
+import api_client
+import metrics
+from benchmarks.stub_backend import StubBackend, make_server
+
+
+class RecordingStubBackend(StubBackend):
+    """StubBackend that keeps the request payloads and can answer with a forced error status."""
+
+    def __init__(self):
+        super().__init__(answer_chars=40)
+        self.payloads = []
+        self.forced = []
+
+    def handle(self, payload, size):
+        with self.lock:
+            self.payloads.append(payload)
+            forced = self.forced.pop(0) if self.forced and "history" not in payload else None
+        if forced:
+            return forced
+        return super().handle(payload, size)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    backend = RecordingStubBackend()
+    server = make_server(backend)
+    monkeypatch.setattr(api_client, "API_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(api_client, "CONTEXT_MODE", "incremental")
+    monkeypatch.setattr(api_client, "HEDGING_ENABLED", False)
+    monkeypatch.setattr(api_client, "ANSWER_CACHE_TTL", 0)
+    yield backend
+    server.shutdown()
+    server.server_close()
+
+
+def fallbacks():
+    return sum(metrics.registry.counts("api.context_fallbacks"))
+
+
+def ask(stub, prompt, history, conversation_id="conv-1"):
+    """Ask through query_api and return the answer and the history it would have next."""
+    calls = []
+
+    def history_fn():
+        calls.append(prompt)
+        return history
+
+    answer = api_client.query_api(prompt, history_fn, conversation_id, turn_index=len(history))
+    return answer, history + [(prompt, answer)], calls
+
+
+def test_first_turn_seeds_the_context(stub):
+    answer, history, calls = ask(stub, "Was ist OptiView?", [])
+
+    assert answer.startswith("Antwort 0")
+    assert stub.payloads == [{"prompt": "Was ist OptiView?", "history": [], "conversation_id": "conv-1"}]
+    assert len(stub.contexts["conv-1"]["history"]) == 1
+
+    answer, history, calls = ask(stub, "Und beim TGX?", history)
+
+    assert answer.startswith("Antwort 1")
+    assert stub.payloads[-1] == {"prompt": "Und beim TGX?", "conversation_id": "conv-1", "turn_index": 1}
+    assert calls == []
+
+
+def test_expired_context_falls_back_to_full_history(stub):
+    _, history, _ = ask(stub, "Frage 1", [])
+    _, history, _ = ask(stub, "Frage 2", history)
+    stub.expire("conv-1")
+    before = fallbacks()
+
+    answer, history, calls = ask(stub, "Frage 3", history)
+
+    assert answer.startswith("Antwort 2")
+    assert calls == ["Frage 3"]
+    assert stub.errors == {"unknown_context": 1}
+    assert fallbacks() == before + 1
+    assert [list(pair) for pair in stub.payloads[-1]["history"]] == [list(pair) for pair in history[:2]]
+    # The fallback re-seeded the context, so the next turn is incremental again.
+    ask(stub, "Frage 4", history)
+    assert "history" not in stub.payloads[-1]
+
+
+def test_turn_mismatch_falls_back(stub):
+    _, history, _ = ask(stub, "Frage 1", [])
+
+    answer, _, calls = ask(stub, "Frage 3", history + [("Frage 2", "Antwort aus anderem Tab")])
+
+    assert answer.startswith("Antwort 2")
+    assert calls == ["Frage 3"]
+    assert stub.errors == {"context_mismatch": 1}
+
+
+@pytest.mark.parametrize("status, error", [(404, "unknown_context"), (409, "context_mismatch"), (410, "context_expired")])
+def test_context_errors_fall_back(stub, status, error):
+    _, history, _ = ask(stub, "Frage 1", [])
+    stub.forced = [(status, {"error": error})]
+
+    answer, _, calls = ask(stub, "Frage 2", history)
+
+    assert answer.startswith("Antwort 1")
+    assert calls == ["Frage 2"]
+    assert "history" in stub.payloads[-1]
+
+
+@pytest.mark.parametrize("status, data", [(409, {"error": "conflict"}), (500, {"error": "unknown_context"})])
+def test_other_errors_do_not_fall_back(stub, status, data):
+    _, history, _ = ask(stub, "Frage 1", [])
+    stub.forced = [(status, data)]
+
+    answer, _, calls = ask(stub, "Frage 2", history)
+
+    assert answer == api_client.ERROR_MESSAGE
+    assert calls == []
+    assert len(stub.payloads) == 2
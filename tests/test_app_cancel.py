@@ -0,0 +1,98 @@
+"""Tests for cancelling an answer in app.py when the rerun is interrupted."""
+
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import api_client
+import shared_cache
+from storage_backend import CONVERSATIONS
+
+APP_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+class FakePending:
+    """Stands in for api_client.PendingAnswer; wait() runs the given action once."""
+
+    def __init__(self, action):
+        self.action = action
+        self.cancelled = False
+
+    def wait(self, timeout=None):
+        self.action()
+        return True
+
+    def elapsed(self):
+        return 1.5
+
+    def result(self):
+        return "Antwort"
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def app(sqlite_storage, monkeypatch):
+    monkeypatch.chdir(APP_DIR)
+    shared_cache.set_cache(shared_cache.TwoLevelCache(None))
+    pending = []
+
+    def submit(action):
+        def submit_query(*args, **kwargs):
+            pending.append(FakePending(action))
+            return pending[-1]
+
+        monkeypatch.setattr(api_client, "submit_query", submit_query)
+
+    at = AppTest.from_file("app.py", default_timeout=30)
+    at.session_state.authenticated = True
+    at.session_state.user = {"email": "test@man.eu"}
+    at.session_state.username = "test@man.eu"
+    at.session_state.user_id = "abcd1234"
+    at.session_state.session_id = "sess-1"
+    at.run()
+    yield at, submit, pending
+    shared_cache.set_cache(None)
+
+
+def test_rerun_while_waiting_saves_cancelled_turn(app, sqlite_storage):
+    at, submit, pending = app
+    submit(st.rerun)
+
+    at.chat_input[0].set_value("Frage").run()
+
+    assert not at.exception
+    assert pending[0].cancelled
+    entries = list(sqlite_storage.iter_entries(CONVERSATIONS))
+    assert [(entry["question"], entry["status"]) for entry in entries] == [("Frage", "cancelled")]
+    assert any("abgebrochen" in caption.value for caption in at.caption)
+
+
+def test_error_while_waiting_is_not_saved_as_cancelled(app, sqlite_storage):
+    at, submit, pending = app
+
+    def fail():
+        raise RuntimeError("boom")
+
+    submit(fail)
+
+    at.chat_input[0].set_value("Frage").run()
+
+    assert at.exception
+    assert pending[0].cancelled
+    assert list(sqlite_storage.iter_entries(CONVERSATIONS)) == []
+
+
+def test_answer_is_saved_when_not_interrupted(app, sqlite_storage):
+    at, submit, pending = app
+    submit(lambda: None)
+
+    at.chat_input[0].set_value("Frage").run()
+
+    assert not at.exception
+    assert not pending[0].cancelled
+    entries = list(sqlite_storage.iter_entries(CONVERSATIONS))
+    assert [(entry["answer"], entry["turn"]) for entry in entries] == [("Antwort", 0)]
@@ -0,0 +1,90 @@
+"""Tests for structured logging: sampling, context binding and the non-blocking queue handler."""
+
+import contextvars
+import logging
+import queue
+
+import pytest
+
+import app_logging
+from app_logging import ContextFilter, NonBlockingQueueHandler, SamplingFilter, bind, hash_id, log_sampled
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def capture(monkeypatch):
+    monkeypatch.setattr(app_logging, "_sample_rates", {"test.sampled": 0.25, "test.dropped": 0.0})
+    logger = logging.getLogger("test_app_logging")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = ListHandler()
+    handler.addFilter(SamplingFilter(app_logging._sample_rates))
+    logger.addHandler(handler)
+    yield logger, handler.records
+    logger.removeHandler(handler)
+
+
+def test_log_sampled_decides_before_creating_the_record(capture, monkeypatch):
+    logger, records = capture
+    monkeypatch.setattr(logger, "makeRecord", lambda *args, **kwargs: pytest.fail("record created"))
+
+    log_sampled(logger, "test.dropped", "Dropped")
+
+    assert records == []
+
+
+def test_log_sampled_keeps_the_sampled_fraction(capture, monkeypatch):
+    logger, records = capture
+    values = iter([0.1, 0.9])
+    monkeypatch.setattr(app_logging.random, "random", lambda: next(values))
+
+    log_sampled(logger, "test.sampled", "Kept", duration_ms=3)
+    log_sampled(logger, "test.sampled", "Dropped")
+
+    assert [(record.msg, record.event, record.sample_rate, record.duration_ms) for record in records] == [
+        ("Kept", "test.sampled", 0.25, 3)
+    ]
+
+
+def test_warnings_and_unlisted_events_are_not_sampled(capture):
+    logger, records = capture
+
+    log_sampled(logger, "test.dropped", "Warning", level=logging.WARNING)
+    log_sampled(logger, "test.other", "Info")
+    logger.info("Filtered", extra={"event": "test.dropped"})
+
+    assert [record.msg for record in records] == ["Warning", "Info"]
+
+
+def test_bind_adds_hashed_session_and_user():
+    def log():
+        bind(session_id="session-1", user_id="ab12cd34")
+        record = logging.makeLogRecord({"msg": "Hallo"})
+        ContextFilter().filter(record)
+        return record
+
+    record = contextvars.Context().run(log)
+
+    assert (record.session, record.user) == (hash_id("session-1"), "ab12cd34")
+    # Binding is per context, so other reruns are unaffected.
+    other = logging.makeLogRecord({"msg": "Hallo"})
+    contextvars.Context().run(ContextFilter().filter, other)
+    assert (other.session, other.user) == (None, None)
+
+
+def test_full_queue_drops_and_counts_records():
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+
+    for i in range(5):
+        handler.handle(logging.makeLogRecord({"msg": "Nachricht %d", "args": (i,)}))
+
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == ["Nachricht 0", "Nachricht 1"]
@@ -0,0 +1,131 @@
+"""Tests for the bulk question mode: parsing, rate limiting, downloads and job scheduling."""
+
+import csv
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_questions
+from bulk_questions import BulkJob, RateLimiter, parse_questions, to_csv, to_xlsx
+
+
+@pytest.mark.parametrize("data, filename, expected", [
+    (b"Frage;Thema\nWas ist OptiView?;Kabine\n\nWie hoch ist der TGX?;Ma\xc3\x9fe\n", "fragen.csv",
+     ["Was ist OptiView?", "Wie hoch ist der TGX?"]),
+    (b"\xef\xbb\xbfNr,Question\n1,\"Preis, netto?\"\n2,Reichweite?\n", "fragen.csv", ["Preis, netto?", "Reichweite?"]),
+    (b"Was ist OptiView?\nWie hoch ist der TGX?\n", "fragen.csv", ["Was ist OptiView?", "Wie hoch ist der TGX?"]),
+    (b"Was kostet ein TGX, netto?\nReichweite?\n", "fragen.csv", ["Was kostet ein TGX, netto?", "Reichweite?"]),
+    (b"  Erste Frage \n\nZweite Frage\n", "fragen.txt", ["Erste Frage", "Zweite Frage"]),
+])
+def test_parse_questions(data, filename, expected):
+    assert parse_questions(data, filename) == expected
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=20, burst=1)
+
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+
+    assert time.monotonic() - start >= 0.14
+
+
+def test_rate_limiter_disabled():
+    limiter = RateLimiter(rate=0)
+
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire()
+
+    assert time.monotonic() - start < 0.05
+
+
+ROWS = [
+    {"Nr.": 1, "Frage": "Was ist OptiView?", "Antwort": "Ein Spiegelersatzsystem; digital.", "Status": "Fertig"},
+    {"Nr.": 2, "Frage": "Größe?", "Antwort": "", "Status": "Fehler"},
+]
+
+
+def test_to_csv_for_excel():
+    data = to_csv(ROWS)
+
+    assert data.startswith(b"\xef\xbb\xbf")
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig")), delimiter=";"))
+    assert rows == [{key: str(value) for key, value in row.items()} for row in ROWS]
+
+
+def test_to_xlsx_round_trip():
+    openpyxl = pytest.importorskip("openpyxl")
+
+    sheet = openpyxl.load_workbook(io.BytesIO(to_xlsx(ROWS))).active
+
+    assert [list(row) for row in sheet.iter_rows(values_only=True)] == [
+        list(ROWS[0]), *[[value if value != "" else None for value in row.values()] for row in ROWS]
+    ]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-thread bulk pool without rate limit; saved entries are collected instead of stored."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-test")
+    saved = []
+    monkeypatch.setattr(bulk_questions, "_executor", executor)
+    monkeypatch.setattr(bulk_questions, "rate_limiter", RateLimiter(rate=0))
+    monkeypatch.setattr(bulk_questions, "save_conversations", saved.extend)
+    yield saved
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def wait_until_finished(*jobs, timeout=5):
+    end = time.monotonic() + timeout
+    while any(job.running for job in jobs):
+        assert time.monotonic() < end, "bulk jobs did not finish"
+        time.sleep(0.01)
+
+
+def test_jobs_take_turns_in_the_pool(pool, monkeypatch):
+    answered = []
+    gate = threading.Event()
+
+    def query_api(prompt, history, deadline=None):
+        gate.wait()
+        answered.append(prompt)
+        return f"Antwort auf {prompt}"
+
+    monkeypatch.setattr(bulk_questions, "query_api", query_api)
+    large = BulkJob([f"A{i}" for i in range(6)], "a@man.eu", "aaaa1111", "session-a")
+    small = BulkJob(["B0", "B1"], "b@man.eu", "bbbb2222", "session-b")
+    large.start()
+    small.start()
+    gate.set()
+    wait_until_finished(large, small)
+
+    # The small job is not queued behind all questions of the large one.
+    assert answered.index("B1") < answered.index("A5")
+    assert sorted(entry["question"] for entry in pool) == sorted(answered)
+    assert {entry["sessionId"] for entry in pool} == {large.session_id, small.session_id}
+
+
+def test_cancel_aborts_requests_in_flight(pool, monkeypatch):
+    started = threading.Event()
+
+    def query_api(prompt, history, deadline=None):
+        started.set()
+        while not deadline.cancelled:
+            time.sleep(0.01)
+        return bulk_questions.ERROR_MESSAGE
+
+    monkeypatch.setattr(bulk_questions, "query_api", query_api)
+    job = BulkJob(["Frage 1", "Frage 2", "Frage 3"], "a@man.eu", "aaaa1111", "session-a")
+    job.start()
+    assert started.wait(2)
+
+    job.cancel()
+    wait_until_finished(job, timeout=2)
+
+    assert [result["status"] for result in job.results] == ["cancelled"] * 3
+    assert pool == []
@@ -0,0 +1,107 @@
+"""Tests for the capped Conversation model."""
+
+from conversation_model import Conversation
+from conversation_storage import save_conversation
+
+
+def entry(session_id, turn, timestamp="2025-01-02 10:00:00"):
+    return {
+        "sessionId": session_id,
+        "timestamp": timestamp,
+        "question": turn.question,
+        "answer": turn.answer,
+        "turn": turn.index,
+    }
+
+
+def play(conversation, count, save=True, day="2025-01-02"):
+    for i in range(count):
+        turn = conversation.add(f"q{i}", f"a{i}", f"{day} 10:00:{i:02d}")
+        if save:
+            save_conversation(entry(conversation.session_id, turn, turn.timestamp))
+            conversation.mark_saved(turn)
+
+
+def test_saved_turns_spill_beyond_cap(sqlite_storage):
+    conversation = Conversation("s1", max_turns=2)
+    play(conversation, 5)
+
+    assert len(conversation) == 5
+    assert conversation.spilled == 3
+    assert [turn.question for turn in conversation.recent()] == ["q3", "q4"]
+    assert conversation.spilled_days == {"2025-01-02"}
+
+
+def test_unsaved_turns_are_not_spilled():
+    conversation = Conversation("s1", max_turns=2)
+    play(conversation, 4, save=False)
+
+    assert conversation.spilled == 0
+    assert len(conversation.recent()) == 4
+
+    for turn in conversation.recent():
+        conversation.mark_saved(turn)
+    assert conversation.spilled == 2
+
+
+def test_history_after_spill_does_not_read_storage(sqlite_storage, monkeypatch):
+    conversation = Conversation("s1", max_turns=2)
+    play(conversation, 5)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("storage read")
+
+    monkeypatch.setattr(sqlite_storage, "query", fail)
+    monkeypatch.setattr(sqlite_storage, "load", fail)
+    assert conversation.history() == [(f"q{i}", f"a{i}") for i in range(5)]
+
+
+def test_reload_picks_turns_by_index(sqlite_storage):
+    conversation = Conversation("s1", max_turns=2)
+    play(conversation, 5)
+    # Other entries under the same session id must not shift the turns.
+    sqlite_storage.append_many("conversations", [
+        {"sessionId": "s1", "timestamp": "2025-01-02 09:00:00", "question": "BULK", "answer": "b"},
+        {"sessionId": "s1", "timestamp": "2025-01-02 10:00:01", "question": "q1", "answer": "",
+         "status": "cancelled"},
+    ])
+
+    turns = conversation.load_spilled()
+
+    assert [(turn.index, turn.question, turn.answer) for turn in turns] == [
+        (0, "q0", "a0"), (1, "q1", "a1"), (2, "q2", "a2"),
+    ]
+    assert turns[0].timestamp == "2025-01-02 10:00:00"
+    assert [turn.question for turn in conversation.turns()] == ["q0", "q1", "q2", "q3", "q4"]
+
+
+def test_reload_reads_only_spilled_days(sqlite_storage, monkeypatch):
+    conversation = Conversation("s1", max_turns=1)
+    play(conversation, 2, day="2025-01-02")
+    days_read = []
+    load = sqlite_storage.load
+
+    def tracking_load(collection, day=None):
+        days_read.append(day)
+        return load(collection, day)
+
+    monkeypatch.setattr(sqlite_storage, "load", tracking_load)
+    conversation.load_spilled()
+
+    assert days_read == ["2025-01-02"]
+
+
+def test_reload_fills_turns_missing_from_storage(sqlite_storage):
+    conversation = Conversation("s1", max_turns=1)
+    for i in range(3):
+        turn = conversation.add(f"q{i}", f"a{i}", f"2025-01-02 10:00:0{i}")
+        if i != 1:
+            save_conversation(entry("s1", turn, turn.timestamp))
+        # The save of q1 "succeeded" from the caller's view but the entry is gone.
+        conversation.mark_saved(turn)
+
+    turns = conversation.load_spilled()
+
+    assert [(turn.question, turn.answer, turn.timestamp) for turn in turns] == [
+        ("q0", "a0", "2025-01-02 10:00:00"), ("q1", "a1", ""),
+    ]
@@ -0,0 +1,86 @@
+"""Tests for the in-process metrics: histograms, per-minute rings and active sessions."""
+
+import pytest
+
+from metrics import ACTIVE_SESSION_SECONDS, BUCKET_COUNT, WINDOW_MINUTES, Histogram, MetricsRegistry, bucket_index
+
+T = 28_333_333 * 60  # start of a minute
+
+
+@pytest.mark.parametrize("value_ms, expected", [(0.2, 0), (1, 0), (1.9, 7), (2, 8), (3, 12), (2 ** 30, BUCKET_COUNT - 1)])
+def test_bucket_index(value_ms, expected):
+    assert bucket_index(value_ms) == expected
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.record(ms)
+
+    assert histogram.count == 100
+    assert histogram.mean == 50.5
+    # Bucket upper bounds, within 12.5% above the exact value, capped at the maximum.
+    assert histogram.percentile(50) == 52
+    assert histogram.percentile(95) == 96
+    assert histogram.percentile(99) == 100
+    assert histogram.percentile(0) == 1.125
+    assert Histogram().percentile(50) == 0.0
+
+
+def test_histogram_merge():
+    first, second = Histogram(), Histogram()
+    for ms in (10, 20):
+        first.record(ms)
+    second.record(5000)
+
+    first.merge(second)
+
+    assert (first.count, first.max, first.total) == (3, 5000, 5030)
+    assert first.percentile(100) == 5000
+
+
+def test_minute_ring_rolls_over():
+    registry = MetricsRegistry()
+    registry.increment("calls", now=T)
+    registry.increment("calls", now=T + 30)
+    registry.increment("calls", 3, now=T + 60)
+
+    assert registry.counts("calls", minutes=3, now=T + 60) == [0, 2, 3]
+
+    # One window later the first minute's slot is reused, not added to.
+    later = T + WINDOW_MINUTES * 60
+    registry.increment("calls", now=later)
+    counts = registry.counts("calls", now=later)
+    assert len(counts) == WINDOW_MINUTES
+    assert (counts[0], counts[-1], sum(counts)) == (3, 1, 4)
+
+    # A slot that fell out of the window is ignored even before it is reused.
+    assert sum(registry.counts("calls", now=later + 60)) == 1
+    assert registry.counts("unknown", minutes=2, now=T) == [0, 0]
+
+
+def test_latency_window():
+    registry = MetricsRegistry()
+    registry.record_latency("query_api", 0.010, now=T)
+    registry.record_latency("query_api", 2.0, now=T + 120)
+
+    assert registry.histogram("query_api", minutes=1, now=T + 120).count == 1
+    assert registry.histogram("query_api", minutes=3, now=T + 120).max == 2000
+    assert registry.histogram("query_api", now=T + WINDOW_MINUTES * 60).count == 1
+    assert registry.names() == ["query_api"]
+
+
+def test_touch_session_prunes_expired_sessions():
+    registry = MetricsRegistry()
+    registry.touch_session("a", now=T)
+    registry.touch_session("b", now=T + 30)
+
+    registry.touch_session("c", now=T + ACTIVE_SESSION_SECONDS + 30)
+
+    assert set(registry._sessions) == {"b", "c"}
+    assert registry.active_sessions(now=T + ACTIVE_SESSION_SECONDS + 30) == 2
+
+    # Pruning runs at most once a minute; active_sessions still skips expired ones.
+    registry.touch_session("d", now=T + ACTIVE_SESSION_SECONDS + 40)
+    assert set(registry._sessions) == {"b", "c", "d"}
+    assert registry.active_sessions(now=T + ACTIVE_SESSION_SECONDS + 40) == 2
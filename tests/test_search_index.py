@@ -0,0 +1,103 @@
+"""Tests for the full-text search index (search_index)."""
+
+import pytest
+
+from search_index import SearchIndex, build_match_query, feedback_score, fold_german
+from storage_backend import CONVERSATIONS, FEEDBACK
+
+TURN = {
+    "timestamp": "2025-11-17 10:15:59",
+    "sessionId": "s1",
+    "userId": "ab12cd34",
+    "username": "alice@man.eu",
+    "question": "Wie groß ist das Fahrerhaus des TGX?",
+    "answer": "Das GX-Fahrerhaus bietet Stehhöhe; Offroad-ABS ist optional.",
+}
+FEEDBACK_ENTRY = {
+    "timestamp": "2025-11-17 10:17:00",
+    "sessionId": "s1",
+    "userId": "ab12cd34",
+    "user_prompt": TURN["question"],
+    "assistant_answer": TURN["answer"],
+    "correctness_score": 4,
+    "coverage_score": 2,
+    "tone_style_score": "n/a",
+}
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(":memory:")
+
+
+def questions(results):
+    return [result["question"] for result in results]
+
+
+def test_fold_german():
+    assert fold_german("Größe Ärger Übel Straße") == "Groesse Aerger Uebel Strasse"
+    assert fold_german(None) == ""
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Offroad-ABS Brems*", '"Offroad-ABS" AND "Brems"*'),
+    ('"OptiView" OR NOT', '"OptiView" AND "OR" AND "NOT"'),
+    ("Größe", '"Groesse"'),
+    ("  * \"\" ", ""),
+])
+def test_build_match_query(text, expected):
+    assert build_match_query(text) == expected
+
+
+@pytest.mark.parametrize("text", ["groß", "gross", "GROSS", "stehhoehe", "Stehhöhe", "Fahrer*"])
+def test_search_folds_german_spellings(index, text):
+    index.add_conversation(TURN)
+
+    assert questions(index.search(text)) == [TURN["question"]]
+
+
+def test_hyphenated_and_quoted_terms_match_as_phrases(index):
+    index.add_conversation(TURN)
+    index.add_conversation(TURN | {"sessionId": "s2", "question": "ABS im Offroad-Einsatz?", "answer": "Ja."})
+
+    assert questions(index.search("Offroad-ABS")) == [TURN["question"]]
+    assert questions(index.search('"Offroad-ABS" OR Einsatz')) == []
+    assert index.search("") == []
+
+
+def test_fingerprint_skips_duplicates(index):
+    assert index.add_many(CONVERSATIONS, [TURN, dict(TURN)]) == 1
+    assert index.add_many(CONVERSATIONS, [TURN, TURN | {"timestamp": "2025-11-18 09:00:00"}]) == 1
+
+    assert index.count() == 2
+
+
+def test_feedback_score_is_propagated_to_the_turn(index):
+    index.add_conversation(TURN)
+    index.add_feedback(FEEDBACK_ENTRY)
+
+    results = index.search("Fahrerhaus", kind=CONVERSATIONS, min_score=3)
+    assert [(result["kind"], result["score"]) for result in results] == [(CONVERSATIONS, 3.0)]
+    assert index.search("Fahrerhaus", kind=CONVERSATIONS, min_score=3.5) == []
+    assert feedback_score({"tone_style_score": None}) is None
+
+
+def test_backfill_propagates_scores_and_can_be_rerun(index, sqlite_storage):
+    sqlite_storage.append(FEEDBACK, FEEDBACK_ENTRY)
+    sqlite_storage.append(CONVERSATIONS, TURN)
+
+    assert index.backfill(sqlite_storage, batch_size=1) == 2
+    assert index.backfill(sqlite_storage) == 0
+
+    results = index.search("TGX", kind=CONVERSATIONS)
+    assert [result["score"] for result in results] == [3.0]
+
+
+def test_search_filters(index):
+    index.add_conversation(TURN)
+    index.add_conversation(TURN | {"timestamp": "2025-12-01 08:00:00", "userId": "ef56ab78", "username": "bob@man.eu"})
+
+    assert len(index.search("TGX", since="2025-12-01")) == 1
+    assert len(index.search("TGX", until="2025-12-01")) == 1
+    assert [result["userId"] for result in index.search("TGX", user="bob@man.eu")] == ["ef56ab78"]
+    assert "**Offroad-ABS**" in index.search("offroad-abs")[0]["snippet"]
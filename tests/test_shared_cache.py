@@ -0,0 +1,190 @@
+"""Tests for the two-level shared cache and the @cached decorator."""
+
+import pickle
+
+import pytest
+
+import shared_cache
+from shared_cache import MemoryCache, SQLiteCacheBackend, TwoLevelCache, cached, deserialize, serialize
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def l2(tmp_path):
+    return SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+
+@pytest.fixture
+def cache(l2):
+    cache = TwoLevelCache(l2)
+    shared_cache.set_cache(cache)
+    yield cache
+    shared_cache.set_cache(None)
+
+
+@pytest.mark.parametrize("value", ["Hallo", {"a": [1, 2], "b": None}, "ä" * 5000])
+def test_serialize_round_trip(value):
+    data = serialize(value)
+    assert deserialize(data) == value
+    assert data[:1] == (b"J" if len(value) > shared_cache.COMPRESS_THRESHOLD else b"j")
+
+
+def test_deserialize_rejects_pickle():
+    with pytest.raises(ValueError):
+        deserialize(b"p" + pickle.dumps({"a": 1}))
+
+
+def test_serialize_rejects_non_json_values():
+    with pytest.raises(TypeError):
+        serialize(object())
+
+
+def test_l2_round_trip_between_workers(l2, tmp_path):
+    writer = TwoLevelCache(l2)
+    reader = TwoLevelCache(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    writer.set("answers:k", {"body": "Antwort"}, ttl=60)
+
+    assert reader.get("answers:k") == {"body": "Antwort"}
+    assert reader.get("answers:k") == {"body": "Antwort"}
+    stats = reader.stats()
+    assert (stats["l2_hits"], stats["l1_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_fresh_read_skips_stale_l1(l2, tmp_path):
+    writer = TwoLevelCache(l2)
+    reader = TwoLevelCache(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    writer.set("profiling:settings", {"rate": 0.0}, ttl=60)
+    assert reader.get("profiling:settings") == {"rate": 0.0}
+
+    writer.set("profiling:settings", {"rate": 0.5}, ttl=60)
+
+    assert reader.get("profiling:settings") == {"rate": 0.0}
+    assert reader.get("profiling:settings", fresh=True) == {"rate": 0.5}
+
+
+def test_legacy_pickled_l2_entry_is_a_miss(cache, l2):
+    l2.set("answers:old", b"p" + pickle.dumps("boom"), ttl=60)
+
+    assert cache.get("answers:old", "miss") == "miss"
+    assert cache.stats()["errors"] == 1
+
+
+def test_ttl_expiry(clock, l2):
+    cache = TwoLevelCache(l2, l1_ttl=10)
+    cache.set("k", "v", ttl=30)
+
+    clock.now += 15  # L1 expired, L2 still valid
+    assert cache.get("k") == "v"
+    assert cache.stats()["l2_hits"] == 1
+
+    clock.now += 20
+    assert cache.get("k") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1", ttl=60)
+    cache.set("b", b"2", ttl=60)
+    cache.get("a")
+    cache.set("c", b"3", ttl=60)
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+
+
+def test_cached_calls_once_per_key(cache):
+    calls = []
+
+    @cached("test", ttl=60)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    assert [double(1), double(1), double(2)] == [2, 2, 4]
+    assert calls == [1, 2]
+
+
+def test_cached_unless_bypasses_cache(cache):
+    calls = []
+
+    @cached("test", ttl=60, unless=lambda prompt, history: bool(history))
+    def answer(prompt, history):
+        calls.append(prompt)
+        return prompt.upper()
+
+    answer("a", [("q", "a")])
+    answer("a", [("q", "a")])
+    assert calls == ["a", "a"]
+    assert cache.stats()["misses"] == 0
+
+
+def test_cached_key_ignores_other_arguments(cache):
+    calls = []
+
+    @cached("test", ttl=60, key=lambda prompt, conversation_id=None: prompt)
+    def answer(prompt, conversation_id=None):
+        calls.append(conversation_id)
+        return prompt
+
+    answer("a", "c1")
+    answer("a", "c2")
+    assert calls == ["c1"]
+
+
+def test_cached_not_shared_stays_out_of_l2(cache, l2):
+    @cached("secrets", ttl=60, shared=False)
+    def secret(secret_id):
+        return {"client_secret": "s3cr3t"}
+
+    assert secret("id") == {"client_secret": "s3cr3t"}
+    assert secret("id") == {"client_secret": "s3cr3t"}
+    assert l2._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+    assert cache.stats()["l1_hits"] == 1
+
+
+def test_cached_falls_back_when_cache_cannot_be_created(monkeypatch):
+    def broken():
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(shared_cache, "get_cache", broken)
+
+    @cached("test", ttl=60)
+    def answer(prompt):
+        return prompt
+
+    assert answer("a") == "a"
+
+
+def test_cached_returns_result_when_caching_fails(cache):
+    @cached("test", ttl=60)
+    def answer(prompt):
+        return {prompt}  # not JSON-serializable
+
+    assert answer("a") == {"a"}
+
+
+def test_cached_disabled_with_zero_ttl(cache):
+    calls = []
+
+    @cached("test", ttl=0)
+    def answer(prompt):
+        calls.append(prompt)
+        return prompt
+
+    answer("a")
+    answer("a")
+    assert calls == ["a", "a"]
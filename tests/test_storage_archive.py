@@ -0,0 +1,196 @@
+"""
+Tests for the archive job (storage_archive) and the archive-aware S3 reads
+and exports, against the in-memory S3 stand-in.
+"""
+
+import io
+import json
+from datetime import date
+
+import pytest
+
+import storage_archive
+import storage_export
+from storage_backend import CONVERSATIONS, FEEDBACK, S3Backend
+
+TODAY = date(2025, 1, 12)
+DAYS = [f"2025-01-{day:02d}" for day in range(1, 11)]
+
+
+def make_entries(day, count=3):
+    return [
+        {
+            "timestamp": f"{day} 10:00:{i:02d}",
+            "sessionId": f"session-{day}",
+            "userId": "ab12cd34",
+            "question": f"Frage {i} am {day}",
+            "answer": "Antwort",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def backend(s3_client):
+    backend = S3Backend("test", client=s3_client)
+    for day in DAYS:
+        backend.append_many(CONVERSATIONS, make_entries(day))
+    return backend
+
+
+def all_entries():
+    return [entry for day in DAYS for entry in make_entries(day)]
+
+
+def export_entries(backend, collection):
+    output = io.StringIO()
+    storage_export.export(backend, collection, output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def fail_on_first_delete(backend, monkeypatch, prefix):
+    """Make the first delete of a key under prefix fail, as if the job was killed."""
+    delete = backend.delete
+    state = {"failed": False}
+
+    def flaky_delete(key):
+        if key.startswith(prefix) and not state["failed"]:
+            state["failed"] = True
+            raise ConnectionError("simulated crash")
+        delete(key)
+
+    monkeypatch.setattr(backend, "delete", flaky_delete)
+
+
+def test_compact_conversations_moves_closed_days(backend):
+    stats = storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+
+    assert stats == {"days": 4, "entries": 12, "segments": 1}
+    assert backend.hot_days() == DAYS[4:]
+    assert list(backend.load_manifest(CONVERSATIONS)["segments"]) == ["2025-01"]
+    assert backend.load(CONVERSATIONS, "2025-01-02") == make_entries("2025-01-02")
+    assert backend.query(CONVERSATIONS) == all_entries()
+    assert backend.query(CONVERSATIONS, session_id="session-2025-01-03") == make_entries("2025-01-03")
+    assert export_entries(backend, CONVERSATIONS) == all_entries()
+
+
+def test_compact_conversations_is_idempotent(backend):
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+    objects = dict(backend.s3.objects)
+
+    stats = storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+
+    assert stats["days"] == 0
+    assert backend.s3.objects == objects
+
+
+def test_late_writes_to_archived_day_are_kept(backend):
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+    late = make_entries("2025-01-02", count=1)[0] | {"question": "Nachzügler"}
+    backend.append_many(CONVERSATIONS, [late])
+
+    assert backend.load(CONVERSATIONS, "2025-01-02") == make_entries("2025-01-02") + [late]
+
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+    assert backend.load(CONVERSATIONS, "2025-01-02") == make_entries("2025-01-02") + [late]
+    assert "2025-01-02" not in backend.hot_days()
+
+
+def test_tier_copies_originals_to_cold_storage(backend):
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="tier")
+
+    cold = sorted(key for _, key in backend.s3.objects if key.startswith(storage_archive.COLD_PREFIX))
+    assert cold == [f"{storage_archive.COLD_PREFIX}{day}.json" for day in DAYS[:4]]
+    assert backend.query(CONVERSATIONS) == all_entries()
+
+
+def test_interrupted_run_leaves_no_duplicates(backend, monkeypatch):
+    fail_on_first_delete(backend, monkeypatch, "conversations/")
+    with pytest.raises(ConnectionError):
+        storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+
+    # The segment is written but all originals are still there.
+    assert backend.hot_days() == DAYS
+    assert backend.query(CONVERSATIONS) == all_entries()
+    assert export_entries(backend, CONVERSATIONS) == all_entries()
+
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="delete")
+    assert backend.hot_days() == DAYS[4:]
+    assert backend.query(CONVERSATIONS) == all_entries()
+    segments = [key for _, key in backend.s3.objects if key.endswith(".ndjson.gz")]
+    assert len(segments) == 1
+
+
+def test_compact_feedback(backend):
+    feedback = [entry | {"correctness_score": 4} for day in DAYS for entry in make_entries(day, count=1)]
+    backend.append_many(FEEDBACK, feedback)
+
+    stats = storage_archive.compact_feedback(backend, TODAY, archive_after=7)
+
+    assert stats == {"entries": 4, "segments": 1}
+    assert backend.load_hot(FEEDBACK) == feedback[4:]
+    assert backend.load(FEEDBACK) == feedback
+    assert export_entries(backend, FEEDBACK) == feedback
+
+
+def test_interrupted_feedback_run_leaves_no_duplicates(backend, monkeypatch):
+    feedback = [entry | {"correctness_score": 4} for day in DAYS for entry in make_entries(day, count=1)]
+    backend.append_many(FEEDBACK, feedback)
+
+    def crash(*args, **kwargs):
+        raise ConnectionError("simulated crash")
+
+    monkeypatch.setattr(backend, "write_hot", crash)
+    with pytest.raises(ConnectionError):
+        storage_archive.compact_feedback(backend, TODAY, archive_after=7)
+
+    assert backend.load_hot(FEEDBACK) == feedback
+    assert backend.load(FEEDBACK) == feedback
+    assert export_entries(backend, FEEDBACK) == feedback
+
+
+def test_feedback_saved_during_compaction_is_kept(backend, monkeypatch):
+    feedback = [entry | {"correctness_score": 4} for day in DAYS for entry in make_entries(day, count=1)]
+    backend.append_many(FEEDBACK, feedback)
+    late = make_entries("2025-01-11", count=1)[0] | {"correctness_score": 5}
+    load_hot_versioned = backend.load_hot_versioned
+
+    def save_in_between(collection, day=None):
+        # Another worker saves feedback after the compaction read the object.
+        result = load_hot_versioned(collection, day)
+        if late not in backend.load_hot(FEEDBACK):
+            backend.append(FEEDBACK, late)
+        return result
+
+    monkeypatch.setattr(backend, "load_hot_versioned", save_in_between)
+    stats = storage_archive.compact_feedback(backend, TODAY, archive_after=7)
+
+    assert stats == {"entries": 4, "segments": 1}
+    assert backend.load_hot(FEEDBACK) == feedback[4:] + [late]
+    assert backend.load(FEEDBACK) == feedback + [late]
+
+
+def test_expire_removes_old_entries_from_all_tiers(backend):
+    storage_archive.compact_conversations(backend, TODAY, archive_after=7, originals="tier")
+
+    stats = storage_archive.expire(backend, CONVERSATIONS, TODAY, retention_days=9)
+
+    # Cutoff 2025-01-03: two archived days are dropped from the segment.
+    assert stats == {"entries": 6, "days": 0, "segments": 1}
+    assert backend.query(CONVERSATIONS) == [entry for day in DAYS[2:] for entry in make_entries(day)]
+    cold = sorted(key for _, key in backend.s3.objects if key.startswith(storage_archive.COLD_PREFIX))
+    assert cold == [f"{storage_archive.COLD_PREFIX}{day}.json" for day in DAYS[2:4]]
+
+    stats = storage_archive.expire(backend, CONVERSATIONS, TODAY, retention_days=5)
+    assert backend.query(CONVERSATIONS) == [entry for day in DAYS[6:] for entry in make_entries(day)]
+    assert backend.load_manifest(CONVERSATIONS)["segments"] == {}
+    assert backend.hot_days() == DAYS[6:]
+
+
+def test_dry_run_changes_nothing(backend):
+    objects = dict(backend.s3.objects)
+
+    summary = storage_archive.run(backend, TODAY, dry_run=True)
+
+    assert summary["archive_conversations"]["days"] == 4
+    assert backend.s3.objects == objects
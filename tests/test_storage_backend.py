@@ -0,0 +1,63 @@
+"""Parity tests: the S3 and SQLite backends store, find and expire the same entries."""
+
+from datetime import date
+
+import pytest
+
+import storage_archive
+from storage_backend import CONVERSATIONS, FEEDBACK, S3Backend, SQLiteBackend
+
+TODAY = date(2025, 3, 10)
+DAYS = ["2025-03-01", "2025-03-02", "2025-03-05", "2025-03-09"]
+
+
+def make_entries(day):
+    return [
+        {"timestamp": f"{day} 08:{i:02d}:00", "sessionId": f"s-{i}", "userId": f"u-{i % 2}", "question": f"Frage {i}"}
+        for i in range(3)
+    ]
+
+
+@pytest.fixture(params=["sqlite", "s3"])
+def backend(request, tmp_path, s3_client):
+    if request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "storage.db"))
+        yield backend
+        backend.close()
+    else:
+        yield S3Backend("test", client=s3_client)
+
+
+@pytest.mark.parametrize("collection", [CONVERSATIONS, FEEDBACK])
+def test_backend_parity(backend, collection):
+    entries = [entry for day in DAYS for entry in make_entries(day)]
+    backend.append_many(collection, entries[:3])
+    for entry in entries[3:]:
+        backend.append(collection, entry)
+
+    if collection == CONVERSATIONS:
+        assert backend.load(collection, "2025-03-02") == make_entries("2025-03-02")
+        assert backend.load(collection, "2025-03-03") == []
+    else:
+        assert backend.load(collection) == entries
+    assert list(backend.iter_entries(collection)) == entries
+    assert list(backend.iter_entries(collection, user_id="u-1", since="2025-03-02", until="2025-03-09")) == [
+        entry for entry in entries if entry["userId"] == "u-1" and "2025-03-02" <= entry["timestamp"] < "2025-03-09"
+    ]
+    assert backend.query(collection, session_id="s-0") == [entry for entry in entries if entry["sessionId"] == "s-0"]
+
+    # Retention cuts at 2025-03-05 on both backends (delete_before on SQLite).
+    stats = storage_archive.expire(backend, collection, TODAY, retention_days=5)
+
+    assert stats["entries"] == 6
+    assert list(backend.iter_entries(collection)) == make_entries("2025-03-05") + make_entries("2025-03-09")
+
+
+@pytest.mark.parametrize("timestamp", [None, "", "gestern", "18.12.2025 12:00"])
+def test_entries_without_valid_timestamp_are_rejected(backend, timestamp):
+    valid = make_entries("2025-03-01")[0]
+
+    with pytest.raises(ValueError):
+        backend.append_many(CONVERSATIONS, [valid, {"timestamp": timestamp, "question": "Ohne Zeit"}])
+
+    assert list(backend.iter_entries(CONVERSATIONS)) == []
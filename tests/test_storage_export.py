@@ -0,0 +1,118 @@
+"""Tests for the streaming export (storage_export) from S3 and SQLite."""
+
+import io
+import json
+import threading
+
+import pytest
+
+import storage_export
+from storage_backend import CONVERSATIONS, S3Backend
+
+DAYS = [f"2025-02-{day:02d}" for day in range(1, 6)]
+
+
+def make_entries(day, count=4):
+    return [
+        {
+            "timestamp": f"{day} 09:00:{i:02d}",
+            "sessionId": f"session-{day}",
+            "userId": "ab12cd34" if i % 2 else "ef56ab78",
+            "question": f"Frage {i}",
+            "answer": "Antwort",
+        }
+        for i in range(count)
+    ]
+
+
+def all_entries():
+    return [entry for day in DAYS for entry in make_entries(day)]
+
+
+def export_entries(backend, **options):
+    output = io.StringIO()
+    storage_export.export(backend, CONVERSATIONS, output, **options)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class BrokenBody(io.BytesIO):
+    """Response body that fails after `limit` bytes, like a dropped connection."""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() >= self.limit:
+            raise ConnectionResetError("simulated connection reset")
+        return super().read(min(size, self.limit - self.tell()) if size >= 0 else self.limit - self.tell())
+
+
+def break_first_downloads(s3_client, monkeypatch):
+    """Make the first download of each key break off mid-stream."""
+    get_object = s3_client.get_object
+    broken = set()
+
+    def flaky_get_object(Bucket, Key, **kwargs):
+        response = get_object(Bucket, Key, **kwargs)
+        if Key not in broken:
+            broken.add(Key)
+            data = response["Body"].read()
+            response["Body"] = BrokenBody(data, len(data) // 2)
+        return response
+
+    monkeypatch.setattr(s3_client, "get_object", flaky_get_object)
+    return broken
+
+
+@pytest.fixture
+def s3_backend(s3_client):
+    backend = S3Backend("test", client=s3_client)
+    for day in DAYS:
+        backend.append_many(CONVERSATIONS, make_entries(day))
+    return backend
+
+
+@pytest.mark.parametrize("data", [b'[{"a": 1}, {"a": 2.5}, 3]', b"  [ ]", b'[{"text": "\xc3\xa4" }]'])
+def test_iter_json_array_small_chunks(data):
+    assert list(storage_export.iter_json_array(io.BytesIO(data), chunk_size=1)) == json.loads(data)
+
+
+def test_export_in_day_order(s3_backend):
+    assert export_entries(s3_backend, workers=2) == all_entries()
+
+
+def test_export_filters(s3_backend):
+    exported = export_entries(s3_backend, user_id="ab12cd34", since="2025-02-02", until="2025-02-04")
+
+    assert exported == [
+        entry for entry in all_entries()
+        if entry["userId"] == "ab12cd34" and "2025-02-02" <= entry["timestamp"] < "2025-02-04"
+    ]
+
+
+def test_retry_after_partial_download_does_not_duplicate(s3_backend, s3_client, monkeypatch):
+    monkeypatch.setattr(storage_export, "RETRY_BACKOFF", 0)
+    broken = break_first_downloads(s3_client, monkeypatch)
+
+    assert export_entries(s3_backend, workers=2) == all_entries()
+    assert len(broken) == len(DAYS)
+
+
+def test_stopping_early_releases_download_threads(s3_backend, monkeypatch):
+    monkeypatch.setattr(storage_export, "QUEUE_SIZE", 1)
+    entries = storage_export.iter_s3_entries(s3_backend, CONVERSATIONS, {}, workers=2)
+
+    assert next(entries) == all_entries()[0]
+    entries.close()
+
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("export")]
+
+
+def test_sqlite_export_uses_filters(sqlite_storage, monkeypatch):
+    monkeypatch.setattr("storage_backend.ITER_BATCH_SIZE", 3)
+    sqlite_storage.append_many(CONVERSATIONS, list(reversed(all_entries())))
+
+    assert export_entries(sqlite_storage) == all_entries()
+    assert export_entries(sqlite_storage, session_id="session-2025-02-03") == make_entries("2025-02-03")
+    assert export_entries(sqlite_storage, since="2025-02-02", until="2025-02-03") == make_entries("2025-02-02")